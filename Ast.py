@@ -78,6 +78,33 @@ class Instruction( Node ):
     
     def set_next_instruction(self, next_instruction):
         self.__next_instruction = next_instruction
+    
+    """
+        The instructions that follow are pickled as one list, pickling them
+        link by link would nest one level deeper for every instruction
+    """
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        following = []
+        instruction = state.pop('_Instruction__next_instruction')
+        while instruction != None:
+            link_state = instruction.__dict__.copy()
+            following.append((type(instruction), link_state))
+            instruction = link_state.pop('_Instruction__next_instruction')
+        state['_Instruction__following'] = following
+        return state
+    
+    def __setstate__(self, state):
+        following = state.pop('_Instruction__following')
+        self.__dict__.update(state)
+        self.__next_instruction = None
+        last_instruction = self
+        for instruction_type, link_state in following:
+            instruction = instruction_type.__new__(instruction_type)
+            instruction.__dict__.update(link_state)
+            instruction.__next_instruction = None
+            last_instruction.__next_instruction = instruction
+            last_instruction = instruction
         
     def print_string(self):
         pass
@@ -882,7 +909,7 @@ class ProcedureCall( Instruction ):
         #print 'interpret ProcedureCall starts'
         
         #create a new environment first
-        current_environment = {}
+        current_environment = [None] * self.__table_entry.get_scope().get_slot_count()
         dictionary = self.__table_entry.get_scope().get_table()
         parameter_number = 0
         for key, value in dictionary.items():
@@ -894,34 +921,32 @@ class ProcedureCall( Instruction ):
                 variable_type.accept(self._visitor)
                 #if it is a local variable, we just need to initialize it 
                 if type(value) == LocalVariable:
-                    current_environment[key] = variable_type.to_environment()
-                
-                #if it is a global variable, we need to set the global environemt box to the new environment
-                elif type(value) == GlobalVariable:
-                    current_environment[key] = self._visitor.get_global_environment_box(key)
+                    current_environment[value.get_slot()] = variable_type.to_environment()
                     
                 #if it is a formal variable, if the type of the variable is an integer, we need to copy it
                 #if the type of the variable is a Record or Array, it is passed by reference
                 elif type(value) == FormalVariable:
+                    #value is replaced by the value of the actual below
+                    value_slot = value.get_slot()
                     if type(value.get_type()) == Integer:
                         if type(self.__formal_node_array[parameter_number-1]) == AstNumber:
                             value = self.__formal_node_array[parameter_number-1].get_constant_value()
-                            current_environment[key] = variable_type.to_environment()
-                            current_environment[key].set_value(value)
+                            current_environment[value_slot] = variable_type.to_environment()
+                            current_environment[value_slot].set_value(value)
                         elif type(self.__formal_node_array[parameter_number-1]) == AstBinary:
                             self.__formal_node_array[parameter_number-1].accept(self._visitor)
                             self.__formal_node_array[parameter_number-1].to_interpret()
                             value = self._visitor.pop_stack()
-                            current_environment[key] = variable_type.to_environment()
-                            current_environment[key].set_value(value)
+                            current_environment[value_slot] = variable_type.to_environment()
+                            current_environment[value_slot].set_value(value)
                         else:
                             variable_name = self.get_parameter_name(parameter_number)
-                            current_environment[key] = copy.copy(self._visitor.get_global_environment_box(variable_name))
+                            current_environment[value_slot] = copy.copy(self._visitor.get_global_environment_box(variable_name))
                     else:
                         #find the reference box in global scope
                         variable_name = self.get_parameter_name(parameter_number)
                         reference_box = self._visitor.get_global_environment_box(variable_name)
-                        current_environment[key] = DereferenceBox(reference_box)
+                        current_environment[value_slot] = DereferenceBox(reference_box)
 
         self._visitor.create_environment(current_environment)
         
@@ -1191,13 +1216,13 @@ class AstBinary( Expression ):
         elif self.__operator == 'DIV':
             if value_right == 0:
                 print 'error: the expression on the right-hand side of the DIV cannot evaluate to zero at line: ' + str(self.__expression_right.get_line()) + ' position: (' \
-                + str(self.__expression_right.get_start_position()) + ', ' + str(self.__expression_right.get_end_position()) + ')'
+                + str(self.__expression_right.get_start_position()) + ', ' + str(self.__expression_right.get_end_position()) + ')' + self._visitor.locate(self.__expression_right.get_start_position())
                 exit()
             binary_value = value_left / value_right 
         elif self.__operator == 'MOD':
             if value_right == 0:
                 print 'error: the expression on the right-hand side of the MOD cannot evaluate to zero at line: ' + str(self.__expression_right.get_line()) + ' position: (' \
-                + str(self.__expression_right.get_start_position()) + ', ' + str(self.__expression_right.get_end_position()) + ')'
+                + str(self.__expression_right.get_start_position()) + ', ' + str(self.__expression_right.get_end_position()) + ')' + self._visitor.locate(self.__expression_right.get_start_position())
                 exit()
             binary_value = value_left % value_right 
             
@@ -1413,7 +1438,7 @@ class AstBinary( Expression ):
                 self._visitor.add_main_code('\tmov\tr1, #' + str(right_value) + '\n')
                 if right_value == 0:
                     print 'error: the expression on the right-hand side of the DIV cannot evaluate to zero at line: ' + str(self.__expression_right.get_line()) + ' position: (' \
-                    + str(self.__expression_right.get_start_position()) + ', ' + str(self.__expression_right.get_end_position()) + ')'
+                    + str(self.__expression_right.get_start_position()) + ', ' + str(self.__expression_right.get_end_position()) + ')' + self._visitor.locate(self.__expression_right.get_start_position())
                     exit()
             else:
                 self._visitor.add_main_code('\tmov\tr0, ' + expression_value_left_register + '\n')
@@ -1487,7 +1512,7 @@ class AstBinary( Expression ):
                 self._visitor.add_main_code('\tmov\tr1, #' + str(right_value) + '\n')
                 if right_value == 0:
                     print 'error: the expression on the right-hand side of the MOD cannot evaluate to zero at line: ' + str(self.__expression_right.get_line()) + ' position: (' \
-                    + str(self.__expression_right.get_start_position()) + ', ' + str(self.__expression_right.get_end_position()) + ')'
+                    + str(self.__expression_right.get_start_position()) + ', ' + str(self.__expression_right.get_end_position()) + ')' + self._visitor.locate(self.__expression_right.get_start_position())
                     exit()
             else:
                 self._visitor.add_main_code('\tmov\tr0, ' + expression_value_left_register + '\n')
@@ -1578,7 +1603,7 @@ class FunctionCall( Expression ):
         #print 'interpret Function Call starts'
         
         #create a new environment first
-        current_environment = {}
+        current_environment = [None] * self.__table_entry.get_scope().get_slot_count()
         dictionary = self.__table_entry.get_scope().get_table()
         parameter_number = 0
         for key, value in dictionary.items():
@@ -1590,34 +1615,32 @@ class FunctionCall( Expression ):
                 variable_type.accept(self._visitor)
                 #if it is a local variable, we just need to initialize it 
                 if type(value) == LocalVariable:
-                    current_environment[key] = variable_type.to_environment()
-                
-                #if it is a global variable, we need to set the global environemt box to the new environment
-                elif type(value) == GlobalVariable:
-                    current_environment[key] = self._visitor.get_global_environment_box(key)
+                    current_environment[value.get_slot()] = variable_type.to_environment()
                     
                 #if it is a formal variable, if the type of the variable is an integer, we need to copy it
                 #if the type of the variable is a Record or Array, it is passed by reference
                 elif type(value) == FormalVariable:
+                    #value is replaced by the value of the actual below
+                    value_slot = value.get_slot()
                     if type(value.get_type()) == Integer:
                         if type(self.__formal_node_array[parameter_number-1]) == AstNumber:
                             value = self.__formal_node_array[parameter_number-1].get_constant_value()
-                            current_environment[key] = variable_type.to_environment()
-                            current_environment[key].set_value(value)
+                            current_environment[value_slot] = variable_type.to_environment()
+                            current_environment[value_slot].set_value(value)
                         elif type(self.__formal_node_array[parameter_number-1]) == AstBinary:
                             self.__formal_node_array[parameter_number-1].accept(self._visitor)
                             self.__formal_node_array[parameter_number-1].to_interpret()
                             value = self._visitor.pop_stack()
-                            current_environment[key] = variable_type.to_environment()
-                            current_environment[key].set_value(value)
+                            current_environment[value_slot] = variable_type.to_environment()
+                            current_environment[value_slot].set_value(value)
                         else:
                             variable_name = self.get_parameter_name(parameter_number)
-                            current_environment[key] = copy.copy(self._visitor.get_global_environment_box(variable_name))
+                            current_environment[value_slot] = copy.copy(self._visitor.get_global_environment_box(variable_name))
                     else:
                         #find the reference box in global scope
                         variable_name = self.get_parameter_name(parameter_number)
                         reference_box = self._visitor.get_global_environment_box(variable_name)
-                        current_environment[key] = DereferenceBox(reference_box)
+                        current_environment[value_slot] = DereferenceBox(reference_box)
 
         self._visitor.create_environment(current_environment)
         
@@ -1766,14 +1789,38 @@ class Location( Expression ):
 class AstVariable( Location ):
     def __init__(self, table_entry, variable_name):
         self.__table_entry = table_entry
-        self.__variable_name = variable_name
+        self.__variable_name = intern(variable_name)
+        #the environment and the index of the box in it, see set_address
+        self.__depth = None
+        self.__slot = None
         super(AstVariable, self).__init__()
         
     def get_variable_name(self):
         return self.__variable_name
-        
+    
+    """
+        A loaded name is a new string, it is interned again so that it is
+        shared with the names of the tokens and the symbol table
+    """
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__variable_name = intern(self.__variable_name)
+
     def get_location_entry(self):
         return self.__table_entry
+
+    """
+        The AstFactory resolves the variable to the slot of its box in the
+        global environment, the environment of the running procedure or
+        the record of a field, the depth is one of global_depth,
+        local_depth and field_depth
+    """
+    def set_address(self, depth, slot):
+        self.__depth = depth
+        self.__slot = slot
+
+    def get_address(self):
+        return self.__depth, self.__slot
     
     def to_asc_output(self):
         indentation = self._visitor.get_indentation()
@@ -1793,7 +1840,10 @@ class AstVariable( Location ):
         
     def to_interpret(self):
         #print 'interpret variable ' + str(self.__variable_name) + ' starts'
-        self._visitor.push_stack(self._visitor.get_environment_box(self.__variable_name))
+        if self.__slot == None:
+            self._visitor.push_stack(self._visitor.get_environment_box(self.__variable_name))
+        else:
+            self._visitor.push_slot_box(self.__depth, self.__slot)
         #print 'interpret variable ' + str(self.__variable_name) + ' ends'
         
     """
@@ -1878,7 +1928,7 @@ class AstIndex( Location ):
         
         if current_box.is_valid_index(index) == False:
             print 'error: the index value ' + str(index) + ' is out of bounds at Line: ' + str(self.__expression_node.get_line()) + ' position: (' + str(self.__expression_node.get_start_position()) \
-             + ', ' + str(self.__expression_node.get_end_position()) + ')'
+             + ', ' + str(self.__expression_node.get_end_position()) + ')' + self._visitor.locate(self.__expression_node.get_start_position())
             exit()
             
         new_box = current_box.get_element(index)
@@ -1981,7 +2031,7 @@ class AstIndex( Location ):
             element_size = self.get_type().get_size()
             if index_value < 0 or index_value >= max_num:
                 print 'error: the index value ' + str(index_value) + ' is out of bounds at Line: ' + str(self.__expression_node.get_line()) + ' position: (' + str(self.__expression_node.get_start_position()) \
-                + ', ' + str(self.__expression_node.get_end_position()) + ')'
+                + ', ' + str(self.__expression_node.get_end_position()) + ')' + self._visitor.locate(self.__expression_node.get_start_position())
                 exit()
             address_offset += element_size * index_value;
             self._visitor.free_register(start_address_register)
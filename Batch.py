@@ -0,0 +1,233 @@
+#!/usr/bin/python
+
+########################################################################
+# author:  Shiliang Wang
+# Email:   wangshiliang@jhu.edu
+#########################################################################
+##  Batch.py - This file scans and parses many SIMPLE programs with a
+##            pool of processes.
+##            "python Batch.py [-j jobs] [-o directory] [-c directory]
+##            (file|directory)..."
+##            A directory stands for all the files below it. Every program
+##            is compiled like "./sc --lines filename" up to the symbol
+##            table and the abstract syntax tree. The diagnostics of every program
+##            are printed, followed by the number of files and tokens per
+##            second. With "-o" the serialized abstract syntax tree and
+##            symbol table of every program are written to the directory
+##            as "filename.ast", below the same subdirectories as the
+##            program. With "-c" the programs are kept in a ParseCache in
+##            the directory, the processes share it and an unchanged
+##            program is loaded instead of compiled. The exit status is 1
+##            if any program has an error.
+#########################################################################
+
+import sys
+import os
+import time
+import multiprocessing
+from Scanner import create_scanner
+from Parser import Parser
+from Visitor import Output
+from Factory import AstFactory
+from Serializer import serialize
+from Cache import ParseCache
+
+
+#########################################################################
+## BatchResult - This class holds what the batch front end found out
+##               about one file
+##
+#########################################################################
+class BatchResult( object ):
+    def __init__(self, file_name, token_count, error_message, payload, from_cache = False):
+        self.__file_name = file_name
+        self.__token_count = token_count
+        self.__error_message = error_message
+        self.__payload = payload
+        self.__from_cache = from_cache
+
+    def get_file_name(self):
+        return self.__file_name
+
+    def get_token_count(self):
+        return self.__token_count
+
+    def have_error(self):
+        return self.__error_message != ''
+
+    def get_error_message(self):
+        return self.__error_message
+
+    """
+        Return the serialized abstract syntax tree and symbol table, or
+        None if the scanner found an error
+    """
+    def get_payload(self):
+        return self.__payload
+
+    """
+        A program from the cache was neither scanned nor parsed, its
+        tokens are not counted
+    """
+    def is_from_cache(self):
+        return self.__from_cache
+
+
+# the cache of this process, see open_cache
+parse_cache = None
+
+
+#########################################################################
+##   open_cache  - every process opens the cache directory by itself
+## ######################################################################
+def open_cache(directory):
+    global parse_cache
+    if directory != None:
+        parse_cache = ParseCache(directory)
+
+
+#########################################################################
+##   compile_file  - scan and parse one file, this runs in the worker
+##                   processes
+## ######################################################################
+def compile_file(file_name):
+    try:
+        source_file = open(file_name)
+        #the same text as "./sc --lines filename" compiles
+        source = source_file.read() + '\n'
+        source_file.close()
+        if parse_cache != None:
+            payload = parse_cache.load_payload(source)
+            if payload != None:
+                return BatchResult(file_name, 0, '', payload, True)
+        scanner = create_scanner(source)
+        token_array = scanner.all()
+        if scanner.have_error():
+            return BatchResult(file_name, len(token_array), scanner.get_error_message(), None)
+
+        output = Output()
+        factory = AstFactory(output)
+        parser = Parser(token_array, output, factory)
+        parser.set_line_index(scanner.get_line_index())
+        parser.parse()
+        payload = serialize(factory.get_ast_root(), factory.get_symbol_table())
+        #only programs without errors are cached, the errors must be reported every time
+        if parse_cache != None and parser.get_error_message() == '':
+            parse_cache.store_payload(source, payload)
+        return BatchResult(file_name, len(token_array), parser.get_error_message(), payload)
+    except Exception, exception:
+        #one broken program must not stop the batch
+        return BatchResult(file_name, 0, 'error: ' + exception.__class__.__name__ + ': ' + str(exception) + '\n', None)
+
+
+#########################################################################
+##   find_files  - replace every directory by the files below it
+## ######################################################################
+def find_files(paths):
+    file_names = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, directory_names, names in os.walk(path):
+                directory_names[:] = sorted([name for name in directory_names if not name.startswith('.')])
+                file_names.extend([os.path.join(directory, name) for name in sorted(names) if not name.startswith('.')])
+        else:
+            file_names.append(path)
+    return file_names
+
+
+#########################################################################
+##   compile_files  - compile the files with the given number of
+##                    processes and return their results in order
+## ######################################################################
+def compile_files(file_names, jobs = None, cache_directory = None):
+    if jobs == None:
+        jobs = multiprocessing.cpu_count()
+    if jobs <= 1 or len(file_names) <= 1:
+        open_cache(cache_directory)
+        return map(compile_file, file_names)
+
+    pool = multiprocessing.Pool(jobs, open_cache, (cache_directory,))
+    try:
+        #hand out several files at once, a single program is usually too small to be worth a message
+        chunk_size = max(1, len(file_names) / (jobs * 4))
+        return pool.map(compile_file, file_names, chunk_size)
+    finally:
+        pool.terminate()
+
+
+#########################################################################
+##   common_directory  - the deepest directory that holds all the files
+## ######################################################################
+def common_directory(file_names):
+    directories = [os.path.dirname(os.path.abspath(name)).split(os.sep) for name in file_names]
+    return os.sep.join(os.path.commonprefix(directories)) or os.sep
+
+
+#########################################################################
+##   write_payload  - store the serialized program as "filename.ast" in
+##                    the output directory, below the same path as the
+##                    file has below base_directory
+## ######################################################################
+def write_payload(output_directory, base_directory, result):
+    relative_name = os.path.relpath(os.path.abspath(result.get_file_name()), base_directory)
+    payload_name = os.path.join(output_directory, relative_name + '.ast')
+    if not os.path.isdir(os.path.dirname(payload_name)):
+        os.makedirs(os.path.dirname(payload_name))
+    payload_file = open(payload_name, 'wb')
+    payload_file.write(result.get_payload())
+    payload_file.close()
+
+
+if __name__ == '__main__':
+    jobs = None
+    output_directory = None
+    cache_directory = None
+    arguments = []
+    #the options may appear anywhere
+    index = 1
+    try:
+        while index < len(sys.argv):
+            if sys.argv[index] == '-j':
+                jobs = int(sys.argv[index + 1])
+                index += 2
+            elif sys.argv[index] == '-o':
+                output_directory = sys.argv[index + 1]
+                index += 2
+            elif sys.argv[index] == '-c':
+                cache_directory = sys.argv[index + 1]
+                index += 2
+            else:
+                arguments.append(sys.argv[index])
+                index += 1
+    except (IndexError, ValueError):
+        arguments = []
+    if len(arguments) == 0:
+        print 'usage: python Batch.py [-j jobs] [-o directory] [-c directory] (file|directory)...'
+        exit(-1)
+
+    file_names = find_files(arguments)
+    start_time = time.time()
+    results = compile_files(file_names, jobs, cache_directory)
+    elapsed_time = max(time.time() - start_time, 1e-6)
+
+    token_count = 0
+    error_count = 0
+    cached_count = 0
+    base_directory = common_directory(file_names)
+    for result in results:
+        token_count += result.get_token_count()
+        if result.is_from_cache():
+            cached_count += 1
+        if result.have_error():
+            error_count += 1
+            print result.get_file_name() + ':'
+            print result.get_error_message()
+        if output_directory != None and result.get_payload() != None:
+            write_payload(output_directory, base_directory, result)
+
+    print '%d files, %d tokens in %.3f s: %.1f files/s, %.0f tokens/s, %d files with errors' % \
+          (len(results), token_count, elapsed_time, len(results) / elapsed_time, token_count / elapsed_time, error_count)
+    if cache_directory != None:
+        print 'cache: %d hits, %d misses' % (cached_count, len(results) - cached_count)
+    if error_count > 0:
+        exit(1)
@@ -0,0 +1,744 @@
+#!/usr/bin/python
+
+########################################################################
+# author:  Shiliang Wang
+# Email:   wangshiliang@jhu.edu
+#########################################################################
+##  Benchmark.py - This file measures the speed of the compiler phases
+##            on large generated SIMPLE programs.
+##            "python Benchmark.py scanner [megabytes]" compares the
+##            scanners and checks that they produce the same tokens.
+##            "python Benchmark.py tokens [megabytes]" compares the token
+##            list with the TokenBuffer in memory and parse time.
+##            "python Benchmark.py incremental [megabytes]" compares
+##            rescanning after small edits with the IncrementalScanner.
+##            "python Benchmark.py throughput [megabytes] [--mix=...] [--json]"
+##            measures every scanner in tokens/s, MB/s and peak memory on
+##            a program made of the given mix of pieces, for example
+##            "--mix=identifiers:2,comments:1". "--json" prints the
+##            results as one JSON object, to be kept across commits.
+##            "python Benchmark.py tracing [megabytes]" compares parsing
+##            with and without an observer that traces the parse.
+##            "python Benchmark.py expressions [megabytes]" parses long
+##            operator chains and deeply parenthesized expressions.
+##            "python Benchmark.py statements [megabytes]" parses many
+##            short statements and declarations of every kind.
+##            "python Benchmark.py declarations [megabytes]" parses VAR
+##            and CONST sections of 10000, 100000 and 1000000
+##            declarations, as many of them as megabytes * 250000 allow.
+##            "python Benchmark.py nesting [megabytes]" parses procedures
+##            with records inside records up to 64 deep, with the chained
+##            and the flat symbol table.
+##            "python Benchmark.py check [megabytes]" compares the memory
+##            and the tokens/s of "./sc -c" and "./sc -c --check" on
+##            programs of growing size.
+##            "python Benchmark.py errors [megabytes]" parses programs in
+##            which more and more statements have a syntax error.
+##            "python Benchmark.py cache [megabytes]" compares compiling a
+##            program with loading it from the ParseCache.
+##            "python Benchmark.py reparse [megabytes]" compares parsing
+##            a program of many procedures again after an edit in one of
+##            them with the IncrementalParser.
+##            Check.py compares the results of the compiler phases.
+#########################################################################
+
+import sys
+import time
+import random
+import resource
+import json
+import subprocess
+import multiprocessing
+import tempfile
+import shutil
+from Scanner import Scanner
+from Scanner import TableScanner
+from Scanner import RegexScanner
+from Scanner import IncrementalScanner
+from Scanner import create_scanner
+from Scanner import scanner_backends
+from Token import TokenBuffer
+from Token import TokenStream
+from Parser import Parser
+from Parser import check_syntax
+from IncrementalParser import IncrementalParser
+from Visitor import Output
+from Visitor import ParserAscOutput
+from Factory import AstFactory
+from Interpreter import Interpreter
+from Factory import ParserFactory
+from SymbolTable import scope_stacks
+from Cache import ParseCache
+
+
+#########################################################################
+##   generate_program  - produce a SIMPLE program of roughly the given
+##                       size in bytes
+## ######################################################################
+def generate_program(size):
+    declarations = 'PROGRAM Generated;\nCONST\n  size = 47;\nVAR\n  a: ARRAY size OF INTEGER;\n  i, total: INTEGER;\nBEGIN\n'
+    body = '  (* accumulate the squares *)\n' + \
+           '  i := 0;\n' + \
+           '  WHILE i < size DO\n' + \
+           '    a[i] := i * i + 64738 DIV 3;\n' + \
+           '    total := total + a[i] MOD 7;\n' + \
+           '    i := i + 1\n' + \
+           '  END;\n' + \
+           '  IF total >= 1000 THEN WRITE total ELSE WRITE 0 END;\n'
+    count = max(1, (size - len(declarations)) / len(body))
+    return declarations + body * count + '  WRITE total\nEND Generated.\n'
+
+
+#########################################################################
+##   The pieces that generate_mixed_program puts together, each one
+##   returns a few lines of SIMPLE text that stress one part of the scanner
+## ######################################################################
+def statements_piece(generator):
+    return '  i := 0;\n  WHILE i < size DO a[i] := i * i + 64738 DIV 3; i := i + 1 END;\n' + \
+           '  IF total >= 1000 THEN WRITE total ELSE WRITE 0 END;\n'
+
+def identifiers_piece(generator):
+    name = 'identifier' + 'WithAVeryLongName' * generator.randint(1, 8) + str(generator.randint(0, 99999))
+    return '  ' + name + ' := ' + name + 'x + ' + name[::-1] + ';\n'
+
+def comments_piece(generator):
+    lines = ['  (* a comment that ( looks * like ) code: x := (y * z) (* again']
+    for index in range(generator.randint(1, 6)):
+        lines.append('     ' + '* ( ) ' * generator.randint(1, 10))
+    return '\n'.join(lines) + ' *)\n'
+
+def integers_piece(generator):
+    return '  x := ' + ' + '.join([str(generator.randint(1, 9)) + str(generator.getrandbits(200)) for index in range(3)]) + ';\n'
+
+def symbols_piece(generator):
+    # no "(" before "*", that would start a comment
+    symbols = ';:,.+-=#)[]<>'
+    return '  ' + ''.join([generator.choice(symbols) for index in range(60)]) + ':=(a[i].b)*(c#d);\n'
+
+program_pieces = {'statements': statements_piece, 'identifiers': identifiers_piece,
+                  'comments': comments_piece, 'integers': integers_piece, 'symbols': symbols_piece}
+
+
+#########################################################################
+##   generate_mixed_program  - produce about size bytes of SIMPLE text,
+##                             the pieces are chosen at random with the
+##                             weights in mix, a dictionary from piece
+##                             name to weight. The text only has to scan,
+##                             it does not have to parse.
+## ######################################################################
+def generate_mixed_program(size, mix, seed = 64738):
+    generator = random.Random(seed)
+    names = []
+    for name, weight in sorted(mix.items()):
+        names.extend([name] * weight)
+    pieces = ['PROGRAM Generated;\nBEGIN\n']
+    length = len(pieces[0])
+    while length < size:
+        piece = program_pieces[generator.choice(names)](generator)
+        pieces.append(piece)
+        length += len(piece)
+    pieces.append('END Generated.\n')
+    return ''.join(pieces)
+
+
+"""
+    Turn "identifiers:2,comments:1" into {'identifiers': 2, 'comments': 1},
+    a piece without a weight has the weight 1
+"""
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        name, separator, weight = item.partition(':')
+        if name not in program_pieces:
+            raise ValueError('unknown piece "' + name + '", choose from ' + ', '.join(sorted(program_pieces.keys())))
+        mix[name] = int(weight or 1)
+    return mix
+
+
+#########################################################################
+##   time_scanner  - scan the source with the given scanner class and
+##                   return the elapsed time and the token list
+## ######################################################################
+def time_scanner(scanner_class, source):
+    start_time = time.time()
+    scanner = scanner_class(source)
+    token_array = scanner.all()
+    return time.time() - start_time, token_array, scanner.get_error_message()
+
+
+def same_tokens(first_array, second_array):
+    if len(first_array) != len(second_array):
+        return False
+    for index in range(len(first_array)):
+        first = first_array[index]
+        second = second_array[index]
+        if first.get_display_string() != second.get_display_string() or \
+           first.get_line_number() != second.get_line_number():
+            return False
+    return True
+
+
+#########################################################################
+##   benchmark_scanner  - compare every scanner against Scanner
+## ######################################################################
+def benchmark_scanner(megabytes):
+    source = generate_program(int(megabytes * 1024 * 1024))
+    print 'source: ' + str(len(source)) + ' bytes'
+    base_time, base_tokens, base_errors = time_scanner(Scanner, source)
+    print 'Scanner: ' + str(len(base_tokens)) + ' tokens in %.3f s' % base_time
+    for scanner_class in [TableScanner, RegexScanner]:
+        current_time, current_tokens, current_errors = time_scanner(scanner_class, source)
+        identical = same_tokens(base_tokens, current_tokens) and base_errors == current_errors
+        print scanner_class.__name__ + ': ' + str(len(current_tokens)) + ' tokens in %.3f s' % current_time + \
+              ', speedup %.2fx' % (base_time / current_time) + ', identical: ' + str(identical)
+
+
+#########################################################################
+##   token_list_size  - bytes used by a list of Token objects
+##   token_buffer_size  - bytes used by a TokenBuffer
+## ######################################################################
+def token_list_size(token_array):
+    size = sys.getsizeof(token_array)
+    values = {}
+    for token in token_array:
+        size += sys.getsizeof(token) + sys.getsizeof(token.__dict__)
+        values[id(token.get_token_value())] = token.get_token_value()
+    for value in values.values():
+        size += sys.getsizeof(value)
+    return size
+
+def token_buffer_size(token_buffer):
+    size = sys.getsizeof(token_buffer)
+    for column in [token_buffer._kinds, token_buffer._lines, token_buffer._starts, token_buffer._ends, token_buffer._value_indices]:
+        size += sys.getsizeof(column)
+    size += sys.getsizeof(token_buffer._values) + sys.getsizeof(token_buffer._value_ids)
+    for value in token_buffer._values:
+        size += sys.getsizeof(value)
+    return size
+
+
+#########################################################################
+##   time_parse  - parse the tokens with the AST factory and return the
+##                 elapsed time
+## ######################################################################
+def time_parse(token_array):
+    start_time = time.time()
+    output = Output()
+    parser = Parser(token_array, output, AstFactory(output))
+    parser.parse()
+    return time.time() - start_time
+
+
+#########################################################################
+##   time_walk  - read the name and line of every token, as the parser does
+## ######################################################################
+def time_walk(token_array):
+    start_time = time.time()
+    for index in xrange(len(token_array)):
+        token = token_array[index]
+        token.get_token_name()
+        token.get_line_number()
+    return time.time() - start_time
+
+
+#########################################################################
+##   benchmark_tokens  - compare the token list with the TokenBuffer
+## ######################################################################
+def benchmark_tokens(megabytes):
+    source = generate_program(int(megabytes * 1024 * 1024))
+    print 'source: ' + str(len(source)) + ' bytes'
+    start_time = time.time()
+    token_array = create_scanner(source).all()
+    list_time = time.time() - start_time
+    start_time = time.time()
+    token_buffer = TokenBuffer(create_scanner(source).tokens())
+    buffer_time = time.time() - start_time
+    token_number = len(token_array)
+    
+    list_size = token_list_size(token_array)
+    buffer_size = token_buffer_size(token_buffer)
+    print 'tokens: ' + str(token_number)
+    print 'list:   %.1f bytes/token, scan %.3f s, walk %.3f s, parse %.3f s' % \
+          (float(list_size) / token_number, list_time, time_walk(token_array), time_parse(token_array))
+    print 'buffer: %.1f bytes/token, scan %.3f s, walk %.3f s, parse %.3f s' % \
+          (float(buffer_size) / token_number, buffer_time, time_walk(token_buffer), time_parse(token_buffer))
+
+
+#########################################################################
+##   benchmark_incremental  - apply edits all over a large program, some
+##                            of which open and close comments, and
+##                            compare a full rescan with the incremental one
+## ######################################################################
+def benchmark_incremental(megabytes):
+    source = generate_program(int(megabytes * 1024 * 1024))
+    print 'source: ' + str(len(source)) + ' bytes'
+    scanner = IncrementalScanner(source)
+    edits = ['x', '\n', ' (* ', ' *) ', ';']
+    full_time = 0.0
+    incremental_time = 0.0
+    rescanned = 0
+    identical = True
+    for index in range(20):
+        offset = len(source) * index / 20
+        inserted = edits[index % len(edits)]
+        start_time = time.time()
+        token_array = scanner.edit(offset, 0, inserted)
+        incremental_time += time.time() - start_time
+        rescanned += scanner.get_rescanned()
+        source = source[:offset] + inserted + source[offset:]
+        start_time = time.time()
+        full_array = TableScanner(source).all()
+        full_time += time.time() - start_time
+        identical = identical and same_tokens(full_array, token_array)
+    print 'full rescan: %.3f s, incremental: %.3f s, speedup %.2fx' % (full_time, incremental_time, full_time / incremental_time)
+    print 'tokens scanned again per edit: ' + str(rescanned / 20) + ' of ' + str(len(token_array)) + ', identical: ' + str(identical)
+
+
+#########################################################################
+##   DiscardedOutput  - an observer that asks for the trace and throws it
+##                      away, which is what Output cost before the parser
+##                      looked at Output.tracing
+## ######################################################################
+class DiscardedOutput(Output):
+    tracing = True
+
+
+#########################################################################
+##   benchmark_tracing  - parse the same tokens with observers that do
+##                        and don't trace
+## ######################################################################
+def benchmark_tracing(megabytes):
+    source = generate_program(int(megabytes * 1024 * 1024))
+    token_array = create_scanner(source).all()
+    print 'source: ' + str(len(source)) + ' bytes, ' + str(len(token_array)) + ' tokens'
+    for name, output_class in [('Output, no tracing', Output), ('traced and discarded', DiscardedOutput), ('ParserAscOutput', ParserAscOutput)]:
+        start_time = time.time()
+        output = output_class()
+        Parser(token_array, output, ParserFactory(output)).parse()
+        elapsed_time = time.time() - start_time
+        print '%-22s parse %.3f s, %9.0f tokens/s' % (name + ':', elapsed_time, len(token_array) / elapsed_time)
+
+
+#########################################################################
+##   generate_expressions  - produce a program whose assignments hold
+##                           long operator chains, with expressions nested
+##                           in depth parentheses in between
+## ######################################################################
+def generate_expressions(size, depth):
+    declarations = 'PROGRAM Expressions;\nCONST c = 3;\nVAR x, y: INTEGER;\nBEGIN\n'
+    chain = '  x := ' + ' + '.join(['x * y DIV c - y MOD 7 + (-x)'] * 20) + ';\n'
+    nested = '  y := ' + '(' * depth + 'x + 1' + ') * y' * depth + ';\n'
+    count = max(1, (size - len(declarations)) / (len(chain) * 10 + len(nested)))
+    return declarations + (chain * 10 + nested) * count + '  WRITE x\nEND Expressions.\n'
+
+
+#########################################################################
+##   benchmark_expressions  - parse generated expressions with the AST
+##                            factory
+## ######################################################################
+def benchmark_expressions(megabytes):
+    for depth in [10, 100, 1000, 10000]:
+        source = generate_expressions(int(megabytes * 1024 * 1024), depth)
+        token_array = create_scanner(source).all()
+        line = 'depth %5d, %7d tokens:' % (depth, len(token_array))
+        for name, factory_class in [('ParserFactory', ParserFactory), ('AstFactory', AstFactory)]:
+            output = Output()
+            parser = Parser(token_array, output, factory_class(output))
+            start_time = time.time()
+            parser.parse()
+            elapsed_time = time.time() - start_time
+            line += '  %s %.3f s, %7.0f tokens/s%s' % \
+                    (name, elapsed_time, len(token_array) / elapsed_time, parser.get_error_message() != '' and ' (errors)' or '')
+        print line
+
+
+#########################################################################
+##   generate_statements  - produce a SIMPLE program of roughly the given
+##                          size in bytes made of short declarations and
+##                          statements, so that most of the time goes into
+##                          choosing the production
+## ######################################################################
+def generate_statements(size):
+    declarations = 'PROGRAM Statements;\nTYPE R = RECORD f: INTEGER; END;\nVAR r: R;\n'
+    block = 'CONST c%d = 1;\nTYPE T%d = INTEGER;\nVAR v%d, w%d: T%d;\n'
+    body = '  x := 1; READ y; WRITE x; r.f := y;\n' + \
+           '  IF x < y THEN x := y ELSE y := x END;\n' + \
+           '  WHILE x > 0 DO x := x - 1 END;\n' + \
+           '  REPEAT y := y + 1 UNTIL y > 3 END;\n'
+    count = max(1, (size - len(declarations)) / (len(block) + len(body)))
+    declarations += ''.join([block % (index, index, index, index, index) for index in range(count)])
+    return declarations + 'VAR x, y: INTEGER;\nBEGIN\n' + body * count + '  WRITE x\nEND Statements.\n'
+
+
+#########################################################################
+##   benchmark_statements  - parse generated statements and declarations
+##                           with and without building the tree, the best
+##                           of a few runs in processor time
+## ######################################################################
+def benchmark_statements(megabytes):
+    source = generate_statements(int(megabytes * 1024 * 1024))
+    token_array = create_scanner(source).all()
+    statement_count = source.count(';')
+    print 'source: ' + str(len(source)) + ' bytes, ' + str(len(token_array)) + ' tokens'
+    for name, factory_class in [('ParserFactory', ParserFactory), ('AstFactory', AstFactory)]:
+        best_time = None
+        for index in range(5):
+            output = Output()
+            parser = Parser(token_array, output, factory_class(output))
+            start_time = time.clock()
+            parser.parse()
+            elapsed_time = time.clock() - start_time
+            if best_time == None or elapsed_time < best_time:
+                best_time = elapsed_time
+        print '%-13s %.3f s, %8.0f tokens/s, %7.0f statements/s%s' % \
+              (name, best_time, len(token_array) / best_time, statement_count / best_time, parser.get_error_message() != '' and ' (errors)' or '')
+
+
+#########################################################################
+##   generate_declarations  - produce a program with one section of the
+##                            given number of declarations of one kind
+## ######################################################################
+def generate_declarations(count, kind):
+    if kind == 'VAR list':
+        section = 'VAR ' + ', '.join(['v%d' % index for index in range(count)]) + ': INTEGER;\n'
+    elif kind == 'VAR lines':
+        section = 'VAR\n' + ''.join(['  v%d: INTEGER;\n' % index for index in range(count)])
+    else:
+        section = 'CONST\n' + ''.join(['  c%d = %d;\n' % (index, index) for index in range(count)])
+    return 'PROGRAM Declarations;\n' + section + 'END Declarations.\n'
+
+
+#########################################################################
+##   benchmark_declarations  - parse large VAR and CONST sections into
+##                             the symbol table, the best of a few runs in
+##                             processor time
+## ######################################################################
+def benchmark_declarations(megabytes):
+    for count in [10000, 100000, 1000000]:
+        if count > megabytes * 250000:
+            break
+        line = '%7d declarations:' % count
+        for kind in ['VAR list', 'VAR lines', 'CONST']:
+            token_array = create_scanner(generate_declarations(count, kind)).all()
+            best_time = None
+            for index in range(max(1, min(3, 1000000 / count))):
+                output = Output()
+                parser = Parser(token_array, output, AstFactory(output))
+                start_time = time.clock()
+                parser.parse()
+                elapsed_time = time.clock() - start_time
+                if best_time == None or elapsed_time < best_time:
+                    best_time = elapsed_time
+                del parser, output
+            line += '  %s %.3f s, %7.0f/s' % (kind, best_time, count / best_time)
+        print line
+
+
+#########################################################################
+##   generate_nesting_program  - produce procedures that declare records
+##                               nested to the given depth, every field
+##                               names a type of the global or the
+##                               universe scope. The procedure inside
+##                               them has no formals and sees the global
+##                               array x, not the formal x around it.
+## ######################################################################
+def generate_nesting_program(count, depth):
+    record = 'INTEGER'
+    for level in range(depth):
+        record = 'RECORD a, b: INTEGER; c: T; d: ' + record + '; END'
+    procedure = 'PROCEDURE P%d(x: INTEGER);\nVAR r: ' + record + ';\n' + \
+                'PROCEDURE Inner();\nBEGIN\n  x[1] := g\nEND Inner;\nBEGIN\n  g := x\nEND P%d;\n'
+    return 'PROGRAM Nesting;\nTYPE T = ARRAY 2 OF INTEGER;\nVAR g: INTEGER; x: ARRAY 3 OF INTEGER;\n' + \
+           ''.join([procedure % (index, index) for index in range(count)]) + 'BEGIN\n  g := 0\nEND Nesting.\n'
+
+
+#########################################################################
+##   benchmark_nesting  - parse the same number of records at growing
+##                        depths with every kind of scope stack, the best
+##                        of a few runs in processor time. The runs of the
+##                        scope stacks take turns, so the growing heap
+##                        does not favour the one that runs first.
+## ######################################################################
+def benchmark_nesting(megabytes):
+    records = max(64, int(megabytes * 5000))
+    for depth in [1, 4, 16, 64]:
+        token_array = create_scanner(generate_nesting_program(records / depth, depth)).all()
+        best_times = {}
+        error_messages = {}
+        for index in range(5):
+            for scope_stack in sorted(scope_stacks.keys()):
+                output = Output()
+                parser = Parser(token_array, output, AstFactory(output, scope_stack))
+                start_time = time.clock()
+                parser.parse()
+                elapsed_time = time.clock() - start_time
+                best_times[scope_stack] = min(best_times.get(scope_stack, elapsed_time), elapsed_time)
+                error_messages[scope_stack] = parser.get_error_message()
+        for scope_stack in sorted(best_times.keys()):
+            print 'depth %2d %-7s %d records: %.3f s, %.2f us per field%s' % \
+                  (depth, scope_stack, records, best_times[scope_stack], best_times[scope_stack] * 1000000 / (records * 4),
+                   error_messages[scope_stack] != '' and ' (errors)' or '')
+
+
+#########################################################################
+##   generate_erroneous_program  - produce the program of generate_program
+##                                 with one token deleted from the given
+##                                 fraction of its statement lines
+## ######################################################################
+def generate_erroneous_program(size, fraction, seed = 64738):
+    generator = random.Random(seed)
+    lines = generate_program(size).split('\n')
+    #keep the declarations and the END line, so that every error is a syntax error in the statements
+    for index in range(lines.index('BEGIN') + 1, len(lines) - 2):
+        words = lines[index].split()
+        if len(words) > 1 and generator.random() < fraction:
+            del words[generator.randrange(len(words))]
+            lines[index] = '  ' + ' '.join(words)
+    return '\n'.join(lines)
+
+
+#########################################################################
+##   benchmark_errors  - parse programs with more and more syntax errors
+## ######################################################################
+def benchmark_errors(megabytes):
+    for fraction in [0.0, 0.01, 0.1, 0.5]:
+        source = generate_erroneous_program(int(megabytes * 1024 * 1024), fraction)
+        token_array = create_scanner(source).all()
+        line = '%3d%% damaged lines, %7d tokens:' % (fraction * 100, len(token_array))
+        for name, factory_class in [('ParserFactory', ParserFactory), ('AstFactory', AstFactory)]:
+            output = Output()
+            parser = Parser(token_array, output, factory_class(output))
+            start_time = time.time()
+            parser.parse()
+            elapsed_time = time.time() - start_time
+            line += '  %s %.3f s, %7.0f tokens/s, %6d errors' % \
+                    (name, elapsed_time, len(token_array) / elapsed_time, parser.get_error_message().count('\n'))
+        print line
+
+
+#########################################################################
+##   benchmark_cache  - compile a program, store it in an empty cache and
+##                      load it again
+## ######################################################################
+def benchmark_cache(megabytes):
+    source = generate_program(int(megabytes * 1024 * 1024))
+    directory = tempfile.mkdtemp()
+    try:
+        cache = ParseCache(directory)
+        start_time = time.time()
+        output = Output()
+        factory = AstFactory(output)
+        Parser(create_scanner(source).all(), output, factory).parse()
+        compile_time = time.time() - start_time
+
+        start_time = time.time()
+        cache.store(source, factory.get_ast_root(), factory.get_symbol_table())
+        store_time = time.time() - start_time
+
+        start_time = time.time()
+        cache.load(source)
+        load_time = time.time() - start_time
+        entry_number, total_size = cache.get_size()
+        print 'scan and parse %.3f s, store %.3f s (%d bytes), load %.3f s, %.1f times faster than compiling' % \
+              (compile_time, store_time, total_size, load_time, compile_time / load_time)
+    finally:
+        shutil.rmtree(directory)
+
+
+#########################################################################
+##   generate_procedure_program  - produce a SIMPLE program of roughly the
+##                                 given size in bytes that is made of
+##                                 procedures calling each other
+## ######################################################################
+def generate_procedure_program(size):
+    declarations = 'PROGRAM Procedures;\nCONST\n  size = 47;\nVAR\n  a: ARRAY size OF INTEGER;\n  i, total: INTEGER;\n' + \
+                   '  r: RECORD x, y: INTEGER; END;\n'
+    procedures = []
+    length = len(declarations)
+    while length < size or len(procedures) < 2:
+        name = 'P' + str(len(procedures))
+        procedure = 'PROCEDURE ' + name + '(x, y: INTEGER): INTEGER;\nVAR t: INTEGER;\nBEGIN\n' + \
+                    '  t := x * ' + str(len(procedures) + 1) + ' + y DIV 3;\n'
+        if len(procedures) > 0:
+            procedure += '  t := t + P' + str(len(procedures) / 2) + '(t MOD size, y + 1);\n'
+        procedure += '  a[t MOD size] := t;\n  r.x := t\nRETURN t\nEND ' + name + ';\n'
+        procedures.append(procedure)
+        length += len(procedure)
+    body = 'BEGIN\n  i := 0;\n  WHILE i < size DO\n    total := total + P' + str(len(procedures) - 1) + '(i, i);\n' + \
+           '    i := i + 1\n  END;\n  WRITE total\nEND Procedures.\n'
+    return declarations + ''.join(procedures) + body
+
+
+#########################################################################
+##   benchmark_reparse  - change the statements of single procedures and
+##                        compare parsing the whole program again with
+##                        the IncrementalParser. The program is interpreted
+##                        after the first edit, the later edits must still
+##                        find their way through what the interpreter
+##                        left in the symbol table.
+## ######################################################################
+def benchmark_reparse(megabytes):
+    source = generate_procedure_program(int(megabytes * 1024 * 1024))
+    incremental_parser = IncrementalParser(source)
+    print 'source: ' + str(len(source)) + ' bytes, ' + str(len(incremental_parser.get_token_array())) + ' tokens'
+    full_time = 0.0
+    incremental_time = 0.0
+    reparsed = 0
+    identical = True
+    for index in range(20):
+        #the first statement of a procedure spread over the program
+        offset = source.index(' + y DIV 3', len(source) * index / 20)
+        inserted = ' + ' + str(index)
+        source = source[:offset] + inserted + source[offset:]
+        start_time = time.time()
+        incremental_parser.edit(offset, 0, inserted)
+        incremental_time += time.time() - start_time
+        reparsed += incremental_parser.get_reparsed()
+        if index == 0:
+            standard_output = sys.stdout
+            sys.stdout = open('/dev/null', 'w')
+            try:
+                Interpreter(incremental_parser.get_symbol_table(), incremental_parser.get_ast_root()).interpret()
+            finally:
+                sys.stdout.close()
+                sys.stdout = standard_output
+
+        start_time = time.time()
+        output = Output()
+        factory = AstFactory(output)
+        parser = Parser(create_scanner(source).all(), output, factory)
+        parser.parse()
+        full_time += time.time() - start_time
+        identical = identical and parser.get_error_message() == incremental_parser.get_error_message() and \
+                    sorted(factory.get_symbol_table().keys()) == sorted(incremental_parser.get_symbol_table().keys())
+    print 'full parse: %.3f s, incremental: %.3f s, speedup %.2fx' % (full_time, incremental_time, full_time / incremental_time)
+    print 'tokens parsed again per edit: ' + str(reparsed / 20) + ' of ' + str(len(incremental_parser.get_token_array())) + \
+          ', same diagnostics: ' + str(identical)
+
+
+#########################################################################
+##   measure_scanner  - runs in a process of its own, so that the peak
+##                      memory belongs to this scanner alone. It returns
+##                      the best time of a few runs and the growth of the
+##                      peak memory over the generated source text.
+## ######################################################################
+def measure_scanner(backend, size, mix, repeat):
+    source = generate_mixed_program(size, mix)
+    base_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    best_time = None
+    for index in range(repeat):
+        start_time = time.time()
+        scanner = scanner_backends[backend](source)
+        token_array = scanner.all()
+        elapsed_time = time.time() - start_time
+        if best_time == None or elapsed_time < best_time:
+            best_time = elapsed_time
+        token_count = len(token_array)
+        del scanner, token_array
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'scanner': backend, 'tokens': token_count, 'seconds': best_time,
+            'tokens_per_second': token_count / best_time,
+            'megabytes_per_second': len(source) / 1048576.0 / best_time,
+            'peak_memory_kb': peak_memory - base_memory}
+
+
+#########################################################################
+##   measure_check  - runs in a process of its own like measure_scanner,
+##                    parses the program like "./sc -c", which keeps the
+##                    parse trace, or like "./sc -c --check". The memory
+##                    is what the parse needs beyond the peak of building
+##                    the source text.
+## ######################################################################
+def measure_check(check, size):
+    source = generate_program(size)
+    base_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.time()
+    if check:
+        error_message, token_count = check_syntax(create_scanner(source).tokens())
+    else:
+        token_stream = TokenStream(create_scanner(source).tokens())
+        output = ParserAscOutput()
+        Parser(token_stream, output, ParserFactory(output)).parse()
+        token_count = token_stream.get_count()
+    elapsed_time = time.time() - start_time
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return len(source), token_count, elapsed_time, peak_memory - base_memory
+
+
+#########################################################################
+##   benchmark_check  - the peak memory of the syntax check stays the
+##                      same when the program grows
+## ######################################################################
+def benchmark_check(megabytes):
+    for factor in [0.25, 0.5, 1]:
+        size = int(megabytes * factor * 1024 * 1024)
+        line = ''
+        for name, check in [('-c', False), ('-c --check', True)]:
+            pool = multiprocessing.Pool(1)
+            source_size, token_count, elapsed_time, peak_memory = pool.apply(measure_check, (check, size))
+            pool.terminate()
+            if line == '':
+                line = '%8d bytes, %7d tokens:' % (source_size, token_count)
+            line += '  %s %9.0f tokens/s, peak memory +%6d KB' % (name, token_count / elapsed_time, peak_memory)
+        print line
+
+
+def get_revision():
+    try:
+        return subprocess.Popen(['git', 'rev-parse', 'HEAD'], stdout = subprocess.PIPE, stderr = subprocess.PIPE).communicate()[0].strip()
+    except OSError:
+        return ''
+
+
+#########################################################################
+##   benchmark_throughput  - measure every scanner backend on the same
+##                           mixed program
+## ######################################################################
+def benchmark_throughput(megabytes, mix = None, json_output = False, repeat = 3):
+    if mix == None:
+        mix = dict([(name, 1) for name in program_pieces])
+    size = int(megabytes * 1024 * 1024)
+    source_size = len(generate_mixed_program(size, mix))
+    results = []
+    for backend in sorted(scanner_backends.keys()):
+        # a new process for every scanner, the peak memory of a process never goes down
+        pool = multiprocessing.Pool(1)
+        results.append(pool.apply(measure_scanner, (backend, size, mix, repeat)))
+        pool.terminate()
+
+    if json_output:
+        print json.dumps({'benchmark': 'throughput', 'revision': get_revision(), 'python': sys.version.split()[0],
+                          'source_bytes': source_size, 'mix': mix, 'repeat': repeat, 'results': results}, sort_keys = True)
+        return
+    print 'source: ' + str(source_size) + ' bytes, mix: ' + ', '.join([name + ':' + str(weight) for name, weight in sorted(mix.items())])
+    for result in results:
+        print '%-6s %8d tokens in %.3f s: %9.0f tokens/s, %6.2f MB/s, peak memory +%d KB' % \
+              (result['scanner'], result['tokens'], result['seconds'], result['tokens_per_second'],
+               result['megabytes_per_second'], result['peak_memory_kb'])
+
+
+if __name__ == '__main__':
+    benchmarks = {'scanner': benchmark_scanner, 'tokens': benchmark_tokens, 'incremental': benchmark_incremental,
+                  'throughput': benchmark_throughput, 'tracing': benchmark_tracing,
+                  'expressions': benchmark_expressions, 'errors': benchmark_errors, 'cache': benchmark_cache,
+                  'reparse': benchmark_reparse, 'statements': benchmark_statements,
+                  'check': benchmark_check, 'declarations': benchmark_declarations,
+                  'nesting': benchmark_nesting}
+    #the options of the throughput benchmark may appear anywhere
+    options = {}
+    arguments = []
+    for argument in sys.argv[1:]:
+        if argument.startswith('--mix='):
+            options['mix'] = parse_mix(argument[len('--mix='):])
+        elif argument == '--json':
+            options['json_output'] = True
+        else:
+            arguments.append(argument)
+    if len(arguments) < 1 or arguments[0] not in benchmarks or (options and arguments[0] != 'throughput'):
+        print 'usage: python Benchmark.py (' + '|'.join(sorted(benchmarks.keys())) + ') [megabytes]'
+        print '       python Benchmark.py throughput [megabytes] [--mix=piece[:weight],...] [--json]'
+        exit(-1)
+    if len(arguments) > 1:
+        benchmarks[arguments[0]](float(arguments[1]), **options)
+    else:
+        benchmarks[arguments[0]](4, **options)
@@ -0,0 +1,249 @@
+#!/usr/bin/python
+
+########################################################################
+# author:  Shiliang Wang
+# Email:   wangshiliang@jhu.edu
+#########################################################################
+## Cache.py - This module keeps the abstract syntax tree and the symbol
+##            table of compiled programs in a directory, so a program that
+##            did not change is neither scanned nor parsed again.
+##            An entry is found by the hash of the program text and of the
+##            compiler that produced it. Every entry is written to a
+##            temporary file and renamed, so several processes can share
+##            the directory. When the directory grows beyond its size the
+##            least recently used entries are removed.
+##            "python Cache.py directory" prints the size of a cache,
+##            "python Cache.py --clear directory" empties it.
+#########################################################################
+
+import sys
+import os
+import time
+import errno
+import hashlib
+import tempfile
+from Serializer import format_version
+from Serializer import serialize
+from Serializer import deserialize
+
+# the modules whose code decides what the abstract syntax tree and the
+# symbol table of a program look like
+compiler_modules = ['Token', 'NameTable', 'LineIndex', 'Scanner', 'Environment', 'SymbolTable', 'Ast', 'Factory', 'Parser', 'Serializer']
+
+entry_suffix = '.ast'
+
+# a temporary file this old was left behind by a process that died
+temporary_age = 3600
+
+compiler_version = None
+
+
+#########################################################################
+##   get_compiler_version  - the hash of the serialized format and of the
+##                           source of the compiler modules, any change to
+##                           the compiler makes the old entries unreachable
+## ######################################################################
+def get_compiler_version():
+    global compiler_version
+    if compiler_version == None:
+        digest = hashlib.sha1('format ' + str(format_version) + '\n')
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for module in compiler_modules:
+            module_file = open(os.path.join(directory, module + '.py'), 'rb')
+            digest.update(module_file.read())
+            module_file.close()
+        compiler_version = digest.hexdigest()
+    return compiler_version
+
+
+#########################################################################
+## ParseCache - This class stores and loads the compiled programs of one
+##              cache directory and counts how often it was useful
+##
+#########################################################################
+class ParseCache( object ):
+    def __init__(self, directory, max_size = 64 * 1024 * 1024):
+        self.__directory = directory
+        self.__max_size = max_size
+        self.__hits = 0
+        self.__misses = 0
+        self.__stores = 0
+        self.__evictions = 0
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError, error:
+                #another process created it first
+                if error.errno != errno.EEXIST:
+                    raise
+
+    def get_directory(self):
+        return self.__directory
+
+    """
+        Return the name of the entry of the program text
+    """
+    def get_key(self, source):
+        digest = hashlib.sha1(get_compiler_version())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def __get_entry_name(self, key):
+        return os.path.join(self.__directory, key + entry_suffix)
+
+    """
+        Return the abstract syntax tree and the symbol table of the program
+        text, or None if they are not in the cache
+    """
+    def load(self, source):
+        data = self.load_payload(source)
+        if data == None:
+            return None
+        try:
+            return deserialize(data)
+        except Exception:
+            #a broken entry is as good as none, the next store replaces it
+            self.__hits -= 1
+            self.__misses += 1
+            return None
+
+    """
+        Return the serialized abstract syntax tree and symbol table of the
+        program text, or None if they are not in the cache
+    """
+    def load_payload(self, source):
+        entry_name = self.__get_entry_name(self.get_key(source))
+        try:
+            entry_file = open(entry_name, 'rb')
+        except IOError:
+            self.__misses += 1
+            return None
+        try:
+            data = entry_file.read()
+        finally:
+            entry_file.close()
+        #the modification time orders the entries for the eviction
+        try:
+            os.utime(entry_name, None)
+        except OSError:
+            pass
+        self.__hits += 1
+        return data
+
+    """
+        Store the abstract syntax tree and the symbol table of the program
+        text, the entry appears at once and complete or not at all
+    """
+    def store(self, source, ast_root, symbol_table):
+        self.store_payload(source, serialize(ast_root, symbol_table))
+
+    def store_payload(self, source, data):
+        entry_name = self.__get_entry_name(self.get_key(source))
+        handle, temporary_name = tempfile.mkstemp(entry_suffix, '.', self.__directory)
+        try:
+            os.write(handle, data)
+            os.close(handle)
+            os.rename(temporary_name, entry_name)
+        except:
+            try:
+                os.remove(temporary_name)
+            except OSError:
+                pass
+            raise
+        self.__stores += 1
+        self.__evict()
+
+    """
+        Remove the least recently used entries until the cache fits into
+        its size again
+    """
+    def __evict(self):
+        entries = []
+        total_size = 0
+        now = time.time()
+        for name in os.listdir(self.__directory):
+            path = os.path.join(self.__directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                #removed by another process in the meantime
+                continue
+            if name.startswith('.'):
+                if now - status.st_mtime > temporary_age:
+                    self.__remove(path)
+            elif name.endswith(entry_suffix):
+                entries.append((status.st_mtime, status.st_size, path))
+                total_size += status.st_size
+        if total_size <= self.__max_size:
+            return
+        entries.sort()
+        for modification_time, size, path in entries:
+            if total_size <= self.__max_size:
+                break
+            if self.__remove(path):
+                self.__evictions += 1
+            total_size -= size
+
+    def __remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    """
+        Remove all entries
+    """
+    def clear(self):
+        for name in os.listdir(self.__directory):
+            if name.endswith(entry_suffix) and not name.startswith('.'):
+                self.__remove(os.path.join(self.__directory, name))
+
+    """
+        Return the number of entries and their size in bytes
+    """
+    def get_size(self):
+        entry_number = 0
+        total_size = 0
+        for name in os.listdir(self.__directory):
+            if name.endswith(entry_suffix) and not name.startswith('.'):
+                try:
+                    total_size += os.path.getsize(os.path.join(self.__directory, name))
+                    entry_number += 1
+                except OSError:
+                    pass
+        return entry_number, total_size
+
+    def get_hits(self):
+        return self.__hits
+
+    def get_misses(self):
+        return self.__misses
+
+    def get_stores(self):
+        return self.__stores
+
+    def get_evictions(self):
+        return self.__evictions
+
+    def get_statistics(self):
+        lookups = self.__hits + self.__misses
+        if lookups == 0:
+            hit_rate = 0.0
+        else:
+            hit_rate = 100.0 * self.__hits / lookups
+        return 'cache: %d hits, %d misses (%.1f%% hits), %d stores, %d evictions' % \
+               (self.__hits, self.__misses, hit_rate, self.__stores, self.__evictions)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 2:
+        cache = ParseCache(sys.argv[1])
+    elif len(sys.argv) == 3 and sys.argv[1] == '--clear':
+        cache = ParseCache(sys.argv[2])
+        cache.clear()
+    else:
+        print 'usage: python Cache.py [--clear] directory'
+        exit(-1)
+    entry_number, total_size = cache.get_size()
+    print '%s: %d entries, %d bytes' % (cache.get_directory(), entry_number, total_size)
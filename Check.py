@@ -0,0 +1,360 @@
+#!/usr/bin/python
+
+########################################################################
+# author:  Shiliang Wang
+# Email:   wangshiliang@jhu.edu
+#########################################################################
+##  Check.py - This file compiles small generated SIMPLE programs in two
+##            ways that must give the same result and compares what they
+##            produce.
+##            "python Check.py [name]..." runs the named checks, or all of
+##            them, prints "ok" or the first difference of every check
+##            and exits with 1 if one of them failed.
+##            "globals" compares the symbol tables, the abstract syntax
+##            tree and the errors of procedures without formals, which
+##            see the global scope, with the chained and the flat symbol
+##            table.
+##            "interpreter" interprets a loop over global, local, array
+##            and record variables right after the parse and after the
+##            tree went through the Serializer, and compares what it
+##            writes with the result computed in Python.
+##            "entries" compares the symbol table entries of constants,
+##            variables, formals, types and procedures before and after
+##            a round trip through the Serializer.
+##            "layout" compares the code of both code generators for
+##            variables of nested array and record types when the layout
+##            of the types is computed and when it is taken from the
+##            types.
+##            "types" compares procedures whose locals write out the same
+##            anonymous array and record types again and again with the
+##            same procedures using named types: the number of types, the
+##            code and what the interpreter writes.
+#########################################################################
+
+import sys
+from cStringIO import StringIO
+from Scanner import create_scanner
+from Parser import Parser
+from Visitor import SemanticAscOutput
+from Visitor import AstAscOutput
+from Factory import SemanticFactory
+from Factory import AstFactory
+from SymbolTable import scope_stacks
+from SymbolTable import Procedure
+from Interpreter import Interpreter
+from CodeGenerator import CodeGenerator
+from ImprovedCodeGenerator import ImprovedCodeGenerator
+from Serializer import serialize
+from Serializer import deserialize
+
+
+#########################################################################
+##   compare  - return '' if the two texts are the same, otherwise the
+##              first line in which they differ
+## ######################################################################
+def compare(first_name, first_text, second_name, second_text):
+    first_lines = first_text.split('\n')
+    second_lines = second_text.split('\n')
+    for index in range(max(len(first_lines), len(second_lines))):
+        first_line = index < len(first_lines) and first_lines[index] or '(end)'
+        second_line = index < len(second_lines) and second_lines[index] or '(end)'
+        if first_line != second_line:
+            return 'line %d: %s %r, %s %r' % (index + 1, first_name, first_line, second_name, second_line)
+    return ''
+
+
+#########################################################################
+##   compile_semantic  - the symbol tables and the errors of the program
+##   compile_ast  - the abstract syntax tree and the errors of the program
+## ######################################################################
+def compile_semantic(source, scope_stack = 'chained'):
+    output = SemanticAscOutput()
+    parser = Parser(create_scanner(source).all(), output, SemanticFactory(output, scope_stack))
+    parser.parse()
+    return output.get_output() + '\n' + parser.get_error_message()
+
+def compile_ast(source, scope_stack = 'chained'):
+    output = AstAscOutput()
+    factory = AstFactory(output, scope_stack)
+    parser = Parser(create_scanner(source).all(), output, factory)
+    parser.parse()
+    if factory.get_ast_root() != None:
+        output.set_root(factory.get_ast_root())
+    return output.get_output() + '\n' + parser.get_error_message()
+
+
+#########################################################################
+##   interpret  - what the program writes, the symbol table and the tree
+##                are those of a program without errors
+## ######################################################################
+def interpret(symbol_table, ast_root):
+    standard_output = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        Interpreter(symbol_table, ast_root).interpret()
+        return sys.stdout.getvalue()
+    finally:
+        sys.stdout = standard_output
+
+
+#########################################################################
+##   generate_code  - the code the generator prints for the program
+## ######################################################################
+def generate_code(generator_class, symbol_table, ast_root):
+    generator = generator_class(symbol_table, ast_root)
+    generator.generate_code()
+    standard_output = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        generator.print_code()
+        return sys.stdout.getvalue()
+    finally:
+        sys.stdout = standard_output
+
+
+#########################################################################
+##   generate_globals_program  - produce a program with the given number
+##                               of global variables and of procedures
+##                               without formals that use them, some of
+##                               them declare a local of the name of a
+##                               global or use a name that is not declared
+## ######################################################################
+def generate_globals_program(count):
+    procedures = []
+    for index in range(count):
+        if index % 5 == 1:
+            procedures.append('PROCEDURE P%d();\nVAR g%d: INTEGER;\nBEGIN\n  g%d := g0 + 1\nEND P%d;\n' % (index, index, index, index))
+        elif index % 5 == 3:
+            procedures.append('PROCEDURE P%d();\nBEGIN\n  h%d := g%d\nEND P%d;\n' % (index, index, index, index))
+        else:
+            procedures.append('PROCEDURE P%d();\nVAR l: INTEGER;\nBEGIN\n  l := g%d + 1; g0 := l\nEND P%d;\n' % (index, index, index))
+    return 'PROGRAM Globals;\nVAR ' + ', '.join(['g%d' % index for index in range(count)]) + ': INTEGER;\n' + \
+           ''.join(procedures) + 'BEGIN\n  WRITE g0\nEND Globals.\n'
+
+
+#########################################################################
+##   check_globals  - the global scope a procedure sees must give the same
+##                    result with every scope stack
+## ######################################################################
+def check_globals():
+    source = generate_globals_program(40)
+    for compile_function in [compile_semantic, compile_ast]:
+        chained_output = compile_function(source, 'chained')
+        for scope_stack in sorted(scope_stacks.keys()):
+            difference = compare('chained', chained_output, scope_stack, compile_function(source, scope_stack))
+            if difference != '':
+                return compile_function.__name__ + ', ' + difference
+    return ''
+
+
+#########################################################################
+##   generate_interpreter_program  - produce a program that spends the
+##                                   given number of iterations reading
+##                                   and writing variables of every kind
+##   interpreter_result  - what the program writes
+## ######################################################################
+def generate_interpreter_program(iterations):
+    return 'PROGRAM Interpret;\nTYPE R = RECORD f, g: INTEGER; END;\n' + \
+           'VAR i, s, t, u: INTEGER; r: R; a: ARRAY 8 OF INTEGER;\n' + \
+           'PROCEDURE Step(x, y: INTEGER): INTEGER;\nVAR l, m: INTEGER;\nBEGIN\n' + \
+           '  l := x + y; m := l * 2 - x; l := l + m - y\nRETURN l\nEND Step;\n' + \
+           'BEGIN\n  i := 0; s := 0;\n  WHILE i < ' + str(iterations) + ' DO\n' + \
+           '    t := i MOD 8; u := s + t; a[t] := u - s; r.f := a[t] + t; r.g := r.f + u;\n' + \
+           '    s := (s + r.g - u) MOD 1000; s := Step(s, t) MOD 1000;\n' + \
+           '    i := i + 1\n  END;\n  WRITE s\nEND Interpret.\n'
+
+def interpreter_result(iterations):
+    s = 0
+    a = [0] * 8
+    for i in range(iterations):
+        t = i % 8
+        u = s + t
+        a[t] = u - s
+        f = a[t] + t
+        g = f + u
+        s = (s + g - u) % 1000
+        l = s + t
+        m = l * 2 - s
+        s = (l + m - t) % 1000
+    return str(s) + '\n'
+
+
+#########################################################################
+##   check_interpreter  - the addresses of the variables must lead to the
+##                        same boxes after a round trip through the
+##                        Serializer
+## ######################################################################
+def check_interpreter():
+    iterations = 500
+    source = generate_interpreter_program(iterations)
+    expected_output = interpreter_result(iterations)
+    for scope_stack in sorted(scope_stacks.keys()):
+        output = AstAscOutput()
+        factory = AstFactory(output, scope_stack)
+        parser = Parser(create_scanner(source).all(), output, factory)
+        parser.parse()
+        if parser.get_error_message() != '':
+            return scope_stack + ', ' + parser.get_error_message().strip()
+        difference = compare('expected', expected_output, scope_stack, interpret(factory.get_symbol_table(), factory.get_ast_root()))
+        if difference != '':
+            return difference
+        ast_root, symbol_table = deserialize(serialize(factory.get_ast_root(), factory.get_symbol_table()))
+        difference = compare('expected', expected_output, scope_stack + ' serialized', interpret(symbol_table, ast_root))
+        if difference != '':
+            return difference
+    return ''
+
+
+#########################################################################
+##   generate_entries_program  - produce a program with the given number
+##                               of constants, global variables and
+##                               procedures with formals and locals
+## ######################################################################
+def generate_entries_program(count):
+    procedure = 'PROCEDURE P%d(x, y: INTEGER): INTEGER;\nVAR l: INTEGER; m: R;\nBEGIN\n' + \
+                '  l := x + c%d; m.a := y; m.c[1] := l\nRETURN l\nEND P%d;\n'
+    return 'PROGRAM Entries;\nCONST ' + ' '.join(['c%d = %d;' % (index, index) for index in range(count)]) + '\n' + \
+           'TYPE R = RECORD a, b: INTEGER; c: ARRAY 4 OF INTEGER; END;\n' + \
+           'VAR ' + ', '.join(['v%d' % index for index in range(count)]) + ': INTEGER; r: R; a: ARRAY 8 OF R;\n' + \
+           ''.join([procedure % (index, index, index) for index in range(count)]) + \
+           'BEGIN\n  v0 := P0(1, 2); r.a := v0; a[2].c[3] := r.a\nEND Entries.\n'
+
+
+#########################################################################
+##   describe_table  - the symbol table as "-t" shows it, followed by the
+##                     class and the position of every entry and by the
+##                     tables of the procedures
+## ######################################################################
+def describe_table(symbol_table):
+    output = SemanticAscOutput()
+    output.get_table(symbol_table)
+    lines = [output.get_output()]
+    for name, entry in sorted(symbol_table.items()):
+        lines.append('%s %s %d %d %d' % (name, entry.__class__.__name__, entry.get_start_position(), entry.get_end_position(), entry.get_line()))
+        if isinstance(entry, Procedure):
+            lines.append(describe_table(entry.get_scope().get_table()))
+    return '\n'.join(lines)
+
+
+#########################################################################
+##   check_entries  - the slots of the entries must keep every attribute
+##                    through a round trip through the Serializer
+## ######################################################################
+def check_entries():
+    output = AstAscOutput()
+    factory = AstFactory(output)
+    parser = Parser(create_scanner(generate_entries_program(50)).all(), output, factory)
+    parser.parse()
+    if parser.get_error_message() != '':
+        return parser.get_error_message().strip()
+    ast_root, symbol_table = deserialize(serialize(factory.get_ast_root(), factory.get_symbol_table()))
+    return compare('parsed', describe_table(factory.get_symbol_table()), 'serialized', describe_table(symbol_table))
+
+
+#########################################################################
+##   generate_layout_program  - produce a program of the given number of
+##                              variables of the same nested type, every
+##                              one of them is written at another offset
+## ######################################################################
+def generate_layout_program(count):
+    assignments = ['  v%d[%d].y[%d].d[%d] := v%d[%d].x.b' % (index, index % 32, index % 8, index % 16, (index + 1) % count, (index * 7) % 32)
+                   for index in range(count)]
+    return 'PROGRAM Layout;\nTYPE Inner = RECORD a, b, c: INTEGER; d: ARRAY 16 OF INTEGER; END;\n' + \
+           'Outer = ARRAY 32 OF RECORD x: Inner; y: ARRAY 8 OF Inner; END;\nVAR i: INTEGER; ' + \
+           ', '.join(['v%d' % index for index in range(count)]) + ': Outer;\n' + \
+           'BEGIN\n  i := 3;\n' + ';\n'.join(assignments) + '\nEND Layout.\n'
+
+
+#########################################################################
+##   check_layout  - the layout a type keeps must give the same code as
+##                   the layout computed for a type that was just parsed
+## ######################################################################
+def check_layout():
+    token_array = create_scanner(generate_layout_program(20)).all()
+    for generator_class in [CodeGenerator, ImprovedCodeGenerator]:
+        output = AstAscOutput()
+        factory = AstFactory(output)
+        parser = Parser(token_array, output, factory)
+        parser.parse()
+        if parser.get_error_message() != '':
+            return parser.get_error_message().strip()
+        computed_code = generate_code(generator_class, factory.get_symbol_table(), factory.get_ast_root())
+        kept_code = generate_code(generator_class, factory.get_symbol_table(), factory.get_ast_root())
+        difference = compare('computed', computed_code, 'kept', kept_code)
+        if difference != '':
+            return generator_class.__name__ + ', ' + difference
+    return ''
+
+
+#########################################################################
+##   generate_types_program  - produce procedures whose locals are all of
+##                             the same two types, written out again for
+##                             every local or named once in the global
+##                             scope
+## ######################################################################
+def generate_types_program(count, named):
+    if named:
+        types = 'TYPE A = ARRAY 8 OF INTEGER; R = RECORD x, y: INTEGER; z: ARRAY 4 OF INTEGER; END;\n'
+        array_type = 'A'
+        record_type = 'R'
+    else:
+        types = ''
+        array_type = 'ARRAY 8 OF INTEGER'
+        record_type = 'RECORD x, y: INTEGER; z: ARRAY 4 OF INTEGER; END'
+    declarations = ' '.join(['a%d: %s; r%d: %s;' % (index, array_type, index, record_type) for index in range(4)])
+    procedure = 'PROCEDURE P%d(f: INTEGER);\nVAR ' + declarations + '\nBEGIN\n' + \
+                '  a0[1] := f; r3.z[2] := a0[1]; a2[3] := r3.z[2] * 2; r1.y := a2[3] + 1; WRITE r1.y\nEND P%d;\n'
+    return 'PROGRAM Types;\n' + types + ''.join([procedure % (index, index) for index in range(count)]) + \
+           'BEGIN\n' + ';\n'.join(['  P%d(%d)' % (index, index) for index in range(count)]) + '\nEND Types.\n'
+
+
+#########################################################################
+##   describe_types  - the number of different types of the variables of
+##                     every procedure, the code and what the interpreter
+##                     writes. Every procedure interns its types in a
+##                     table of its own, so they are counted one
+##                     procedure at a time.
+## ######################################################################
+def describe_types(source):
+    output = AstAscOutput()
+    factory = AstFactory(output)
+    parser = Parser(create_scanner(source).all(), output, factory)
+    parser.parse()
+    if parser.get_error_message() != '':
+        return parser.get_error_message()
+    type_numbers = []
+    for name, entry in sorted(factory.get_symbol_table().items()):
+        if isinstance(entry, Procedure):
+            variable_types = [variable.get_type() for variable in entry.get_scope().get_table().values()]
+            type_numbers.append('%s: %d types\n' % (name, len(set([id(variable_type) for variable_type in variable_types]))))
+    return ''.join(type_numbers) + \
+           generate_code(CodeGenerator, factory.get_symbol_table(), factory.get_ast_root()) + \
+           interpret(factory.get_symbol_table(), factory.get_ast_root())
+
+
+#########################################################################
+##   check_types  - an anonymous type must be shared like a named one
+## ######################################################################
+def check_types():
+    return compare('named', describe_types(generate_types_program(20, True)),
+                   'anonymous', describe_types(generate_types_program(20, False)))
+
+
+if __name__ == '__main__':
+    checks = {'globals': check_globals, 'interpreter': check_interpreter, 'entries': check_entries,
+              'layout': check_layout, 'types': check_types}
+    names = sys.argv[1:] or sorted(checks.keys())
+    for name in names:
+        if name not in checks:
+            print 'usage: python Check.py [' + '|'.join(sorted(checks.keys())) + ']...'
+            exit(-1)
+    failed = False
+    for name in names:
+        difference = checks[name]()
+        if difference == '':
+            print name + ': ok'
+        else:
+            print name + ': ' + difference
+            failed = True
+    if failed:
+        exit(1)
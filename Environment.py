@@ -10,6 +10,13 @@
 
 import copy
 
+# the environments the interpreter finds a variable in, the depth of the
+# (depth, slot) address the AstFactory gives every variable it can resolve
+# and the index of the environment in Interpreter.get_slot_box
+global_depth = 0
+local_depth = 1
+field_depth = 2
+
 #########################################################################
 ## Box - This class is the base class for environment box
 ##
@@ -87,34 +94,34 @@ class ArrayBox( object ):
 #########################################################################
 class RecordBox( object ):
     """
-        This constructor did nothing, the initialization has to be finished with
-        the add_element_box function
+        This constructor only makes room for the boxes of the fields, the
+        initialization has to be finished with the add_element_box function
      """
-    def __init__(self):
-        self.__record = {}
+    def __init__(self, element_number):
+        self.__record = [None] * element_number
         
     
     def get_environment(self):
         return self.__record
     
     """
-        This function will add the new element box
+        This function will add the new element box at the slot of its field
     """ 
-    def add_element_box(self, key, element_box):
-        self.__record[key] = element_box
+    def add_element_box(self, slot, element_box):
+        self.__record[slot] = element_box
     
     """
-        This function will get the box based on the value name
+        This function will get the box based on the slot of the field
     """
-    def get_element_box(self, key):
-        return self.__record[key]
+    def get_element_box(self, slot):
+        return self.__record[slot]
     
     """
         This function will copy another box to itself
     """
     def copy(self, value_box):
-        for key, value in self.__record.items():
-            self.__record[key].copy(value_box.get_element_box(key))
+        for slot in range(len(self.__record)):
+            self.__record[slot].copy(value_box.get_element_box(slot))
         
 #########################################################################
 ## DereferenceBox - This class derived from Box to hold the boxes that make up 
@@ -27,8 +27,14 @@ from SymbolTable import Scope
 from SymbolTable import Type
 from SymbolTable import Integer
 from SymbolTable import Constant
+from SymbolTable import Variable
+from SymbolTable import GlobalVariable
 from SymbolTable import Array
 from SymbolTable import Record
+from SymbolTable import scope_stacks
+from Environment import global_depth
+from Environment import local_depth
+from Environment import field_depth
 import copy
 
 #########################################################################
@@ -48,6 +54,9 @@ class AbstractFactory( object ):
     def get_global_scope(self):
         pass
     
+    def import_global_scope(self):
+        pass
+    
     def is_global_scope(self):
         return True
     
@@ -60,6 +69,12 @@ class AbstractFactory( object ):
     def add_entry(self, entry_token, entry_type):
         return ""
     
+    def add_entries(self, entry_tokens, entry_types):
+        return []
+    
+    def add_outer_entry(self, entry_token, entry_type):
+        return ""
+    
     def create_ast(self, root_node):
         pass
     
@@ -93,7 +108,7 @@ class AbstractFactory( object ):
     def produce_assign_node(self, location_node, expression_node):
         pass
     
-    def produce_if_node(self, condition_node, repeat_node):
+    def produce_if_node(self, condition_node, true_instruction_node, false_instruction_node):
         pass
     
     def produce_repeat_node(self, condition_node, instruction_node):
@@ -102,9 +117,22 @@ class AbstractFactory( object ):
     def produce_condition_node(self, relation_token, left_expression_node, right_expression_node):
         pass
     
+    def produce_function_call_node(self, current_token, formal_node_array, table_entry):
+        pass
+    
+    def produce_procedure_call_node(self, current_token, formal_node_array, table_entry):
+        pass
+    
     def get_error_message(self):
         return ""
     
+    """
+        The factory may quote the source text in its error messages once it
+        knows the LineIndex of it
+    """
+    def set_line_index(self, line_index):
+        pass
+    
     
     
     
@@ -124,13 +152,19 @@ class ParserFactory( AbstractFactory ):
 ## ######################################################################
 
 class SemanticFactory( AbstractFactory ):
-    def __init__(self, output):
-        #this list is used as a program stack
-        self._scope_array = []
+    """
+        scope_stack names the ScopeStack that keeps the scopes, "chained"
+        or "flat"
+    """
+    def __init__(self, output, scope_stack = 'chained'):
+        #this stack is used as a program stack
+        self._scope_stack = scope_stacks[scope_stack]()
         self._scope_num = -1
         self.__output = output
         self.__symbol_table = None
+        self.__program_scopes = None
         self._error_message = ''
+        self._line_index = None
     
     """
         This function will create a new scope, and set the current scope as the outer scope for the new scope
@@ -141,16 +175,24 @@ class SemanticFactory( AbstractFactory ):
         if self._scope_num == 0:
             scope = Scope(self._scope_num, None)
         else:
-            scope = Scope(self._scope_num, self._scope_array[self._scope_num-1])
-        self._scope_array.append(scope)
+            scope = Scope(self._scope_num, self._scope_stack.get_scope(self._scope_num-1))
+        self._scope_stack.push(scope)
         
     def get_outer_scope(self):
         assert self._scope_num > 0
-        return self._scope_array[self._scope_num-1]
+        return self._scope_stack.get_scope(self._scope_num-1)
     
     def get_global_scope(self):
         assert self._scope_num > 0
-        return self._scope_array[1]
+        return self._scope_stack.get_scope(1)
+    
+    """
+        The entries of the global scope count as entries of the current
+        scope, see Scope.import_scope
+    """
+    def import_global_scope(self):
+        assert self._scope_num > 0
+        self._scope_stack.import_scope(self._scope_num, self._scope_stack.get_scope(1))
         
     def is_global_scope(self):
         if self._scope_num == 1:
@@ -162,43 +204,95 @@ class SemanticFactory( AbstractFactory ):
     """
     def get_current_scope(self):
         assert self._scope_num >= 0
-        return self._scope_array[self._scope_num]
+        return self._scope_stack.get_scope(self._scope_num)
     
     def get_type_object(self, value):
-        current_scope = self.get_current_scope()
-        type_object = current_scope.find(value)
-        return type_object
+        return self._scope_stack.find(value)
         
     def get_symbol_table(self):
         return self.__symbol_table
+
+    """
+        Return the universe and the global scope of the parsed program, so
+        that declarations can be parsed into them again
+    """
+    def get_program_scopes(self):
+        return self.__program_scopes
+
+    """
+        Make the given scopes the stack of scopes again, the last one is the
+        current scope
+    """
+    def reenter_scopes(self, scopes):
+        while self._scope_num >= 0:
+            self._scope_stack.pop()
+            self._scope_num -= 1
+        for scope in scopes:
+            self._scope_stack.push(scope)
+            self._scope_num += 1
     
     def delete_scope(self):
         #sort the variables in the current scope and pop up the stack
         assert self._scope_num >= 0
         if self._scope_num == 1:
             #print 'symbol table build finished'
-            self.__output.get_table(self._scope_array[1].get_table())
-            self.__symbol_table = self._scope_array[1].get_table()
+            self.__output.get_table(self._scope_stack.get_scope(1).get_table())
+            self.__symbol_table = self._scope_stack.get_scope(1).get_table()
+            self.__program_scopes = self._scope_stack.get_scopes()[:2]
         self._scope_num -= 1
-        self._scope_array.pop()
+        self._scope_stack.pop()
         
     def add_entry(self, entry_token, entry_type):
         assert self._scope_num >= 0
         #judge whether the new entry has existed in the local scope's symbol table
-        if self.get_current_scope().local(entry_token.get_token_value()):
+        if self._scope_stack.get_local(self._scope_num, entry_token.get_token_value()) != None:
             last_entry = self.get_type_object(entry_token.get_token_value())
-            self._error_message =  'error: duplicate declaration of \"' + entry_token.get_token_value() + '\" at Line: ' + str(entry_token.get_line_number()) + \
-                             ', Position: (' + str(entry_token.get_token_start_index()) +  + ', ' + str(entry_token.get_token_end_index()) + ') conflicts with \"' + \
-                            entry_token.get_token_value()  + '\" at Line: ' + \
-                             str(last_entry.get_line()) + ', Position: (' + str(last_entry.get_start_position()) + ', ' + str(last_entry.get_end_position()) + ')'
+            self._error_message = self.__duplicate_declaration(entry_token, last_entry)
             return None
         else:
             entry_type.set_start_position(entry_token.get_token_start_index())
             entry_type.set_end_position(entry_token.get_token_end_index())
             entry_type.set_line(entry_token.get_line_number())
-            self._scope_array[self._scope_num].insert(entry_token.get_token_value(), entry_type)
+            self._scope_stack.insert(self._scope_num, entry_token.get_token_value(), entry_type)
             return True
     
+    """
+        Add the entries of a whole identifier list to the current scope in
+        one pass, with the same checks and error message as add_entry.
+        Return the error messages of the duplicate declarations, an empty
+        list if there is none.
+    """
+    def add_entries(self, entry_tokens, entry_types):
+        assert self._scope_num >= 0
+        scope_stack = self._scope_stack
+        depth = self._scope_num
+        error_messages = []
+        for index in range(len(entry_tokens)):
+            entry_token = entry_tokens[index]
+            name = entry_token.get_token_value()
+            #the earlier names of the list are already in the scope, so it finds their duplicates as well
+            last_entry = scope_stack.get_local(depth, name)
+            if last_entry != None:
+                self._error_message = self.__duplicate_declaration(entry_token, last_entry)
+                error_messages.append(self._error_message)
+            else:
+                entry_type = entry_types[index]
+                entry_type.set_start_position(entry_token.get_token_start_index())
+                entry_type.set_end_position(entry_token.get_token_end_index())
+                entry_type.set_line(entry_token.get_line_number())
+                scope_stack.insert(depth, name, entry_type)
+        return error_messages
+
+    """
+        The error message for a declaration of a name that the same scope
+        already declared as last_entry
+    """
+    def __duplicate_declaration(self, entry_token, last_entry):
+        return 'error: duplicate declaration of \"' + entry_token.get_token_value() + '\" at Line: ' + str(entry_token.get_line_number()) + \
+               ', Position: (' + str(entry_token.get_token_start_index()) + ', ' + str(entry_token.get_token_end_index()) + ') conflicts with \"' + \
+               entry_token.get_token_value()  + '\" at Line: ' + \
+               str(last_entry.get_line()) + ', Position: (' + str(last_entry.get_start_position()) + ', ' + str(last_entry.get_end_position()) + ')'
+
     """
         This function is called when creating a new procedure entry in the outer scope
     
@@ -206,18 +300,15 @@ class SemanticFactory( AbstractFactory ):
     def add_outer_entry(self, entry_token, entry_type):
         assert self._scope_num > 0
         #judge whether the new entry has existed in the outer scope's symbol table
-        if self.get_outer_scope().local(entry_token.get_token_value()):
+        if self._scope_stack.get_local(self._scope_num-1, entry_token.get_token_value()) != None:
             last_entry = self.get_type_object(entry_token.get_token_value())
-            self._error_message =  'error: duplicate declaration of \"' + entry_token.get_token_value() + '\" at Line: ' + str(entry_token.get_line_number()) + \
-                             ', Position: (' + str(entry_token.get_token_start_index()) +  + ', ' + str(entry_token.get_token_end_index()) + ') conflicts with \"' + \
-                            entry_token.get_token_value()  + '\" at Line: ' + \
-                             str(last_entry.get_line()) + ', Position: (' + str(last_entry.get_start_position()) + ', ' + str(last_entry.get_end_position()) + ')'
+            self._error_message = self.__duplicate_declaration(entry_token, last_entry)
             return None
         else:
             entry_type.set_start_position(entry_token.get_token_start_index())
             entry_type.set_end_position(entry_token.get_token_end_index())
             entry_type.set_line(entry_token.get_line_number())
-            self._scope_array[self._scope_num-1].insert(entry_token.get_token_value(), entry_type)
+            self._scope_stack.insert(self._scope_num-1, entry_token.get_token_value(), entry_type)
             return True
         
         
@@ -226,11 +317,23 @@ class SemanticFactory( AbstractFactory ):
             return True
         else:
             self._error_message = 'error: The identifier \"' + entry_token.get_token_value() + '\" in the Type production must denote a type at Line: ' + str(entry_token.get_line_number()) + \
-                             ', Position: (' + str(entry_token.get_token_end_index()) + ', ' + str(entry_token.get_token_end_index()) + ')'
+                             ', Position: (' + str(entry_token.get_token_end_index()) + ', ' + str(entry_token.get_token_end_index()) + ')' + self._locate(entry_token.get_token_end_index())
             return None
                              
     def get_error_message(self):
-        return self._error_message   
+        return self._error_message
+    
+    def set_line_index(self, line_index):
+        self._line_index = line_index
+    
+    """
+        Return the column and the source line of the position for an error
+        message, or nothing if there is no LineIndex
+    """
+    def _locate(self, position):
+        if self._line_index == None:
+            return ''
+        return self._line_index.describe(position)   
     
     
 #########################################################################
@@ -240,10 +343,10 @@ class SemanticFactory( AbstractFactory ):
 #########################################################################
 
 class AstFactory( SemanticFactory ):
-    def __init__(self, output):
+    def __init__(self, output, scope_stack = 'chained'):
         self.__output = output
         self.__ast_root = None
-        super(AstFactory, self).__init__(self.__output)
+        super(AstFactory, self).__init__(self.__output, scope_stack)
         
     def create_ast(self, root_node):
         #print 'create ast'
@@ -265,17 +368,23 @@ class AstFactory( SemanticFactory ):
             
         elif current_token.get_token_name() == 'identifier':
             #judge whether this identifier exists in symbol table
-            if self.get_current_scope().find(current_token.get_token_value()):
+            value_entry = self.get_type_object(current_token.get_token_value())
+            if value_entry:
                 #judge whether this identifier is a constant type
-                value_entry = self.get_type_object(current_token.get_token_value())
                 if type(value_entry) is Constant:
                     node = AstNumber(value_entry, value_entry.get_value())
                     node.set_type(Integer.get_instance())
                     node.set_start_position(current_token.get_token_start_index())
                     node.set_end_position(current_token.get_token_end_index())
                     node.set_line(current_token.get_line_number())
+                #a type or a procedure has no value
+                elif not isinstance(value_entry, Variable):
+                    self._error_message = 'error: the identifier \"' + current_token.get_token_value() + '\" must denote a constant or a variable at Line: ' + str(current_token.get_line_number()) + \
+                        ', Position: (' + str(current_token.get_token_start_index()) + ', ' + str(current_token.get_token_end_index()) + ')' + self._locate(current_token.get_token_start_index())
+                    return None
                 else:
                     node = AstVariable(value_entry, current_token.get_token_value())
+                    self.__resolve_variable(node, value_entry, current_token.get_token_value())
                     node.set_type(value_entry.get_type())
                     node.set_start_position(current_token.get_token_start_index())
                     node.set_end_position(current_token.get_token_end_index())
@@ -283,11 +392,23 @@ class AstFactory( SemanticFactory ):
             #if this identifier doesn't exist in symbol table, error handling
             else:
                 self._error_message = 'error: the identifier \"' + current_token.get_token_value() + '\" hasn\'t been declared yet at Line: ' + str(current_token.get_line_number()) + \
-                    ', Position: (' + str(current_token.get_token_start_index()) + ', ' + str(current_token.get_token_end_index()) + ')'
+                    ', Position: (' + str(current_token.get_token_start_index()) + ', ' + str(current_token.get_token_end_index()) + ')' + self._locate(current_token.get_token_start_index())
                 return None
         return node
     
     
+    """
+        Give the variable node the (depth, slot) address of its box. The
+        interpreter has no environments of the procedures around the one
+        it runs, so a variable of an enclosing procedure stays unresolved
+        and is found by name.
+    """
+    def __resolve_variable(self, node, value_entry, name):
+        if type(value_entry) is GlobalVariable:
+            node.set_address(global_depth, value_entry.get_slot())
+        elif self._scope_stack.get_local(self._scope_num, name) is value_entry:
+            node.set_address(local_depth, value_entry.get_slot())
+
     def produce_number_node(self, number_entry):
         node = AstNumber(number_entry, number_entry.get_value())
         node.set_type(Integer.get_instance())
@@ -298,17 +419,25 @@ class AstFactory( SemanticFactory ):
         #we will do the constant folding for the adjacent nodes
         operator = operator_token.get_token_name()
         if type(last_node) is AstNumber and type(current_node) is AstNumber:
-            node = copy.copy(last_node)
+            if (operator == 'DIV' or operator == 'MOD') and current_node.get_constant_value() == 0:
+                self._error_message = 'error: the expression on the right-hand side of the ' + operator + ' cannot evaluate to zero at Line: ' + str(current_node.get_line()) + \
+                    ', Position: (' + str(current_node.get_start_position()) + ', ' + str(current_node.get_end_position()) + ')' + self._locate(current_node.get_start_position())
+                return None
             if operator == '+':
-                node.set_constant_value(last_node.get_constant_value() + current_node.get_constant_value())
+                value = last_node.get_constant_value() + current_node.get_constant_value()
             elif operator == '-':
-                node.set_constant_value(last_node.get_constant_value() - current_node.get_constant_value())
+                value = last_node.get_constant_value() - current_node.get_constant_value()
             elif operator == '*':
-                node.set_constant_value(last_node.get_constant_value() * current_node.get_constant_value())
+                value = last_node.get_constant_value() * current_node.get_constant_value()
             elif operator == 'DIV':
-                node.set_constant_value(last_node.get_constant_value() / current_node.get_constant_value())
+                value = last_node.get_constant_value() / current_node.get_constant_value()
             elif operator == 'MOD':
-                node.set_constant_value(last_node.get_constant_value() % current_node.get_constant_value())
+                value = last_node.get_constant_value() % current_node.get_constant_value()
+            #the folded number has an entry of its own, a declared constant keeps its value
+            node = self.produce_number_node(Constant(Integer.get_instance(), value))
+            node.set_start_position(last_node.get_start_position())
+            node.set_end_position(last_node.get_end_position())
+            node.set_line(last_node.get_line())
                 
         #otherwise, we will produce a binary node
         #we also need to make sure both of the operands are type integer
@@ -322,10 +451,10 @@ class AstFactory( SemanticFactory ):
             else:
                 if type(last_node.get_type()) is not Integer:
                     self._error_message = 'error: arithmetic operators are only applicable to operands of type integer at Line: ' + str(last_node.get_line()) + \
-                        ', Position: (' + str(last_node.get_start_position()) + ', ' + str(last_node.get_end_position()) + ')'
+                        ', Position: (' + str(last_node.get_start_position()) + ', ' + str(last_node.get_end_position()) + ')' + self._locate(last_node.get_start_position())
                 elif type(current_node.get_type()) is not Integer:
                     self._error_message = 'error: arithmetic operators are only applicable to operands of type integer at Line: ' + str(current_node.get_line()) + \
-                        ', Position: (' + str(current_node.get_start_position()) + ', ' + str(current_node.get_end_position()) + ')'
+                        ', Position: (' + str(current_node.get_start_position()) + ', ' + str(current_node.get_end_position()) + ')' + self._locate(current_node.get_start_position())
         return node
     
     def produce_index_node(self, root_node, expression_node):
@@ -341,18 +470,22 @@ class AstFactory( SemanticFactory ):
         
         else:
             self._error_message = 'error: Selector "[]" are only applicable to variables of array type at Line: ' + str(root_node.get_line()) + \
-            ', Position: (' + str(root_node.get_start_position()) + ', ' + str(root_node.get_end_position()) + ')'
+            ', Position: (' + str(root_node.get_start_position()) + ', ' + str(root_node.get_end_position()) + ')' + self._locate(root_node.get_start_position())
             return None
     
     def produce_field_node(self, root_node, current_token):
         current_entry = root_node.get_type()
         if type(current_entry) is Record:
-            record_value_entry = current_entry.get_scope().find(current_token.get_token_value())
+            #the fields are the entries of the record scope itself, not of the scopes around it
+            record_value_entry = False
+            if current_entry.get_scope().local(current_token.get_token_value()):
+                record_value_entry = current_entry.get_scope().find(current_token.get_token_value())
             if record_value_entry == False:
                 self._error_message = 'error: the identifier \"' + current_token.get_token_value() + '\" hasn\'t been declared in this record at Line: ' + str(current_token.get_line_number()) + \
-                    ', Position: (' + str(current_token.get_token_start_index()) + ', ' + str(current_token.get_token_end_index()) + ')'
+                    ', Position: (' + str(current_token.get_token_start_index()) + ', ' + str(current_token.get_token_end_index()) + ')' + self._locate(current_token.get_token_start_index())
                 return None
             variable_node = AstVariable(record_value_entry, current_token.get_token_value())
+            variable_node.set_address(field_depth, record_value_entry.get_slot())
             variable_node.set_line(current_token.get_line_number())
             variable_node.set_start_position(current_token.get_token_start_index())
             variable_node.set_end_position(current_token.get_token_end_index())
@@ -365,7 +498,7 @@ class AstFactory( SemanticFactory ):
             return new_root_node
         else:
             self._error_message = 'error: Selector "." are only applicable to variables of record type at Line: ' + str(root_node.get_line()) + \
-            ', Position: (' + str(root_node.get_start_position()) + ', ' + str(root_node.get_end_position()) + ')'
+            ', Position: (' + str(root_node.get_start_position()) + ', ' + str(root_node.get_end_position()) + ')' + self._locate(root_node.get_start_position())
             return None
         
         
@@ -378,7 +511,7 @@ class AstFactory( SemanticFactory ):
             return read_node
         else:
             self._error_message = 'error: The designator in the Read production must denote a variable of type integer at Line: ' + str(location_node.get_line()) + \
-            ', Position: (' + str(location_node.get_start_position()) + ', ' + str(location_node.get_end_position()) + ')'
+            ', Position: (' + str(location_node.get_start_position()) + ', ' + str(location_node.get_end_position()) + ')' + self._locate(location_node.get_start_position())
             return None
         
         
@@ -391,7 +524,7 @@ class AstFactory( SemanticFactory ):
             return write_node
         else:
             self._error_message = 'error: The expression in the Write production must be of type integer at Line: ' + str(expression_node.get_line()) + \
-            ', Position: (' + str(expression_node.get_start_position()) + ', ' + str(expression_node.get_end_position()) + ')'
+            ', Position: (' + str(expression_node.get_start_position()) + ', ' + str(expression_node.get_end_position()) + ')' + self._locate(expression_node.get_start_position())
             return None
         
     def produce_assign_node(self, location_node, expression_node):
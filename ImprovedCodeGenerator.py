@@ -63,9 +63,22 @@ class ImprovedCodeGenerator:
         self.__in_function = False
         self.__ltorg_number = 0
         self.__ltorg_distance = 0
-        
+        self.__line_index = None
+
+    """
+        With the LineIndex of the source text the errors found while
+        folding constants also show the column and the source line
+    """
+    def set_line_index(self, line_index):
+        self.__line_index = line_index
+
+    def locate(self, position):
+        if self.__line_index == None:
+            return ''
+        return self.__line_index.describe(position)
+
     """
-        This function is called by the generate_code function 
+        This function is called by the generate_code function
         It will perform storage allocation for all variables 
         in the ST
     """
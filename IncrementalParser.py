@@ -0,0 +1,331 @@
+#!/usr/bin/python
+
+########################################################################
+# author:  Shiliang Wang
+# Email:   wangshiliang@jhu.edu
+#########################################################################
+## IncrementalParser.py - This module keeps the symbol table and the
+##                        abstract syntax tree of a program that is edited
+##                        up to date. It scans with the IncrementalScanner
+##                        and parses the changed procedures again with
+##                        Parser.parse_procedure.
+##
+#########################################################################
+
+from Parser import Parser
+from Factory import AstFactory
+from Ast import Node
+from SymbolTable import Entry
+from SymbolTable import Scope
+from Scanner import IncrementalScanner
+from Visitor import Output
+
+from bisect import bisect_left
+from bisect import bisect_right
+
+
+#########################################################################
+##   identifier_names  - the names of the identifiers among the tokens
+##                       from start_index up to end_index
+## ######################################################################
+def identifier_names(token_array, start_index, end_index):
+    return set([token.get_token_value() for token in token_array[start_index:end_index] if token.get_token_name() == 'identifier'])
+
+
+#########################################################################
+## ProcedureUnit - This class is a procedure declared in the global scope
+##                 as the IncrementalParser sees it: the range of tokens it
+##                 was parsed from and its name
+##
+#########################################################################
+class ProcedureUnit( object ):
+    def __init__(self, start_index, end_index, name):
+        self.__start_index = start_index
+        self.__end_index = end_index
+        self.__name = name
+        #the identifiers in its tokens, found the first time they are needed
+        self.__references = None
+
+    def get_start_index(self):
+        return self.__start_index
+
+    def get_end_index(self):
+        return self.__end_index
+
+    def get_name(self):
+        return self.__name
+
+    def move(self, delta):
+        self.__start_index += delta
+        self.__end_index += delta
+
+    """
+        Return the names of all identifiers the procedure mentions
+    """
+    def get_references(self, token_array):
+        if self.__references == None:
+            self.__references = identifier_names(token_array, self.__start_index, self.__end_index + 1)
+        return self.__references
+
+
+#########################################################################
+## IncrementalParser - This class keeps the symbol table and the abstract
+##                     syntax tree of a program up to date while it is
+##                     edited. An edit inside the procedures declared in
+##                     the global scope parses only these procedures again
+##                     and puts their declarations into the global scope
+##                     in place of the old ones; the procedures that call a
+##                     procedure whose signature changed are checked again
+##                     the same way. Any other edit, and any edit of a
+##                     program with errors, parses the whole program, so
+##                     the errors are always those of a full parse.
+##
+#########################################################################
+class IncrementalParser:
+    def __init__(self, source):
+        self.__scanner = IncrementalScanner(source)
+        #number of tokens parsed again by the last edit
+        self.__reparsed = 0
+        self.__parse_all()
+
+    """
+        Scan and parse the complete program again
+    """
+    def __parse_all(self):
+        self.__factory = None
+        self.__units = []
+        #the identifiers outside of the procedures, found the first time they are needed
+        self.__program_references = None
+        token_array = self.__scanner.all()
+        self.__reparsed = len(token_array)
+        if self.__scanner.have_error():
+            self.__error_message = self.__scanner.get_error_message()
+            return
+        output = Output()
+        self.__factory = AstFactory(output)
+        parser = Parser(token_array, output, self.__factory)
+        parser.parse()
+        self.__error_message = parser.get_error_message()
+        for start_index, end_index, name in parser.get_procedure_ranges():
+            self.__units.append(ProcedureUnit(start_index, end_index, name))
+
+    """
+        Replace "removed" characters at "offset" by the "inserted" text and
+        bring the symbol table and the abstract syntax tree up to date
+    """
+    def edit(self, offset, removed, inserted):
+        self.__scanner.edit(offset, removed, inserted)
+        self.__reparse()
+
+    """
+        Replace the program by a new version of it
+    """
+    def update(self, source):
+        self.__scanner.update(source)
+        self.__reparse()
+
+    def __reparse(self):
+        last_edit = self.__scanner.get_last_edit()
+        self.__reparsed = 0
+        if self.__error_message == '' and last_edit != None and last_edit[1] == 0 and last_edit[2] == 0:
+            #no token changed, only blanks or comments, the tree just moves
+            index, removed_count, inserted_count, delta, line_delta = last_edit
+            if delta != 0 or line_delta != 0:
+                threshold = self.__scanner.all()[index].get_token_start_index() - delta
+                self.__move_positions(index, threshold, delta, line_delta)
+            return
+        if self.__error_message != '' or last_edit == None or not self.__reparse_edit(last_edit):
+            self.__parse_all()
+
+    """
+        Parse the procedures the last edit of the tokens fell into again.
+        Return False if the edit is not inside procedures declared in the
+        global scope, or if they or their callers have errors now.
+    """
+    def __reparse_edit(self, last_edit):
+        index, removed_count, inserted_count, delta, line_delta = last_edit
+        token_array = self.__scanner.all()
+        units = self.__units
+        start_indexes = [unit.get_start_index() for unit in units]
+        #the edit must start behind the "PROCEDURE" of a procedure ...
+        first = bisect_left(start_indexes, index) - 1
+        if first < 0 or index > units[first].get_end_index():
+            return False
+        #... and end before the ";" of the same or a later procedure
+        last = first
+        if removed_count > 0:
+            last = bisect_right(start_indexes, index + removed_count - 1) - 1
+            if index + removed_count - 1 >= units[last].get_end_index():
+                return False
+        for unit_index in range(first, last):
+            if units[unit_index].get_end_index() + 1 != units[unit_index + 1].get_start_index():
+                #a declaration between the procedures changed
+                return False
+
+        if delta != 0 or line_delta != 0:
+            #the first old token behind the edit, at its old position
+            threshold = token_array[index + inserted_count].get_token_start_index() - delta
+            self.__move_positions(index, threshold, delta, line_delta)
+        token_delta = inserted_count - removed_count
+        for unit in units[last + 1:]:
+            unit.move(token_delta)
+        return self.__reparse_units(first, last, units[last].get_end_index() + token_delta)
+
+    """
+        Parse the procedures from units[first] on again, up to the token at
+        end_index that ends units[last] now, and put their declarations
+        into the global scope
+    """
+    def __reparse_units(self, first, last, end_index):
+        units = self.__units
+        token_array = self.__scanner.all()
+        scopes = self.__factory.get_program_scopes()
+        table = scopes[1].get_table()
+        start_index = units[first].get_start_index()
+
+        #the old declarations make way for the new ones, which take over their objects
+        reused_procedures = {}
+        signatures = {}
+        for unit in units[first:last + 1]:
+            procedure_object = table.pop(unit.get_name())
+            reused_procedures[unit.get_name()] = procedure_object
+            signatures[unit.get_name()] = self.__get_signature(procedure_object)
+        #like in a full parse the procedures do not see what is declared after them
+        start_position = token_array[start_index].get_token_start_index()
+        hidden = {}
+        for name, entry in table.items():
+            if entry.get_start_position() > start_position:
+                hidden[name] = entry
+                del table[name]
+
+        output = Output()
+        factory = AstFactory(output)
+        factory.reenter_scopes(scopes)
+        parser = Parser(token_array, output, factory)
+        token_index = start_index
+        while token_index <= end_index and token_array[token_index].get_token_name() == 'PROCEDURE':
+            token_index = parser.parse_procedure(token_index, reused_procedures) + 1
+            if parser.get_error_message() != '':
+                return False
+        if token_index != end_index + 1:
+            #the procedures end somewhere else now
+            return False
+        new_units = [ProcedureUnit(start, end, name) for start, end, name in parser.get_procedure_ranges()]
+        new_names = set([unit.get_name() for unit in new_units])
+        if new_names & set(hidden.keys()):
+            #a later declaration of the same name is a duplicate now
+            return False
+        table.update(hidden)
+        units[first:last + 1] = new_units
+        self.__reparsed += end_index + 1 - start_index
+
+        old_names = set(signatures.keys())
+        changed_names = new_names ^ old_names
+        for name in new_names & old_names:
+            if self.__get_signature(table[name]) != signatures[name]:
+                changed_names.add(name)
+        if len(changed_names) == 0:
+            return True
+        #the calls in the body of the program are only checked again by a full parse
+        if changed_names & self.__get_program_references():
+            return False
+        #a procedure without formals takes the global scope as its own, its declarations must not clash with the new procedures
+        copies_changed = new_names != old_names
+        for unit_index in range(first + len(new_units), len(units)):
+            unit = units[unit_index]
+            if (copies_changed and table[unit.get_name()].get_argument_num() == 0) or changed_names & unit.get_references(token_array):
+                if not self.__reparse_units(unit_index, unit_index, unit.get_end_index()):
+                    return False
+        return True
+
+    """
+        The calls of a procedure are checked against these
+    """
+    def __get_signature(self, procedure_object):
+        return (procedure_object.get_argument_num(), procedure_object.get_procedure_type() != None)
+
+    def __get_program_references(self):
+        if self.__program_references == None:
+            token_array = self.__scanner.all()
+            references = set()
+            start_index = 0
+            for unit in self.__units:
+                references |= identifier_names(token_array, start_index, unit.get_start_index())
+                start_index = unit.get_end_index() + 1
+            references |= identifier_names(token_array, start_index, len(token_array))
+            self.__program_references = references
+        return self.__program_references
+
+    """
+        Move the declarations and the nodes that start at threshold or
+        later by the characters and lines the edit inserted, the way the
+        IncrementalScanner moves the tokens behind an edit. They are all
+        reached from the global scope and the body of the program.
+    """
+    def __move_positions(self, index, threshold, delta, line_delta):
+        symbol_table = self.__factory.get_symbol_table()
+        pending = symbol_table.values()
+        pending.append(self.__factory.get_ast_root())
+        #a procedure whose tokens end before the edit keeps its positions and so does all it declares
+        seen = set()
+        for unit in self.__units:
+            if unit.get_end_index() >= index:
+                break
+            seen.add(id(symbol_table[unit.get_name()]))
+        #whether the objects of a class hold positions, decided once per class
+        walked_classes = {}
+        while pending:
+            item = pending.pop()
+            if id(item) in seen:
+                continue
+            seen.add(id(item))
+            if isinstance(item, Scope):
+                pending.extend(item.get_table().values())
+                continue
+            if isinstance(item, (list, tuple)):
+                #a list may hold numbers as well, like the (slot, type) pairs of a record
+                values = item
+            else:
+                #an entry that was never declared has no position
+                if hasattr(item, '_start_position') and item.get_start_position() >= threshold:
+                    item.set_start_position(item.get_start_position() + delta)
+                    #a position the parser never set stays 0, like the end of an assignment of a folded constant
+                    if item.get_end_position() != 0:
+                        item.set_end_position(item.get_end_position() + delta)
+                    if item.get_line() != 0:
+                        item.set_line(item.get_line() + line_delta)
+                if isinstance(item, Entry):
+                    attributes = item.get_attributes()
+                else:
+                    attributes = vars(item).iteritems()
+                values = [value for name, value in attributes if name != '_visitor']
+            for value in values:
+                value_class = value.__class__
+                walked = walked_classes.get(value_class)
+                if walked == None:
+                    walked = issubclass(value_class, (Node, Entry, Scope, list, tuple))
+                    walked_classes[value_class] = walked
+                if walked:
+                    pending.append(value)
+
+    """
+        Return the number of tokens the last edit parsed again
+    """
+    def get_reparsed(self):
+        return self.__reparsed
+
+    def get_token_array(self):
+        return self.__scanner.all()
+
+    def get_error_message(self):
+        return self.__error_message
+
+    def get_symbol_table(self):
+        if self.__factory == None:
+            return None
+        return self.__factory.get_symbol_table()
+
+    def get_ast_root(self):
+        if self.__factory == None:
+            return None
+        return self.__factory.get_ast_root()
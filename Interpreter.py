@@ -10,34 +10,50 @@
 #########################################################################
 
 from SymbolTable import Variable
+from Environment import local_depth
+from Environment import field_depth
 
 class Interpreter:
     def __init__(self, symbol_table, ast_root):
         self.__symbol_table = symbol_table
         self.__ast_root = ast_root
         self.__environment_array = []
-        self.__current_environment = None
-        self.__is_record = False
+        #the global environment, the one of the running procedure and the current one, which is a record while its field is found
+        self.__depth_environments = [None, None, None]
         self.__scope_num = -1
         self.__stack = []
-    
+        self.__line_index = None
+
+    """
+        With the LineIndex of the source text the runtime errors also show
+        the column and the source line
+    """
+    def set_line_index(self, line_index):
+        self.__line_index = line_index
+
+    def locate(self, position):
+        if self.__line_index == None:
+            return ''
+        return self.__line_index.describe(position)
+
     """
         This function is called by interpret 
         It will build the environment based on the symbol table
         
     """
     def __build_environment(self):
-        environment = {}
+        variables = [value for key, value in sorted(self.__symbol_table.items()) if isinstance(value, Variable)]
+        #the environments are lists indexed by the slots of the variables
+        environment = [None] * (max([-1] + [value.get_slot() for value in variables]) + 1)
         self.__scope_num += 1
-        for key, value in sorted(self.__symbol_table.items()):
+        for value in variables:
             #we just build the environment for the variable entry
-            if isinstance(value, Variable):
-                variable_type = value.get_type()
-                variable_type.accept(self)
-                environment[key] = variable_type.to_environment()
+            variable_type = value.get_type()
+            variable_type.accept(self)
+            environment[value.get_slot()] = variable_type.to_environment()
                 
         self.__environment_array.append(environment)
-        self.__current_environment = environment
+        self.__depth_environments = [environment, environment, environment]
     
     """
         This function is called by the driver program
@@ -60,40 +76,48 @@ class Interpreter:
     def pop_stack(self):
         return self.__stack.pop()
         
+    """
+        Return the box at the (depth, slot) address the AstFactory gave a
+        variable, a field is found in the record the last AstField set
+    """
+    def get_slot_box(self, depth, slot):
+        return self.__depth_environments[depth][slot]
+    
+    """
+        Push the box at the (depth, slot) address, it is what every
+        resolved variable does, so it is one call
+    """
+    def push_slot_box(self, depth, slot):
+        self.__stack.append(self.__depth_environments[depth][slot])
+    
+    """
+        Return the box of a variable without an address, a variable of a
+        procedure around the running one, which only the global
+        environment may have a variable of the same name for
+    """
     def get_environment_box(self, name):
-        if self.__is_record == True:
-            return self.__current_environment[name]
-        else:
-            if name in self.__current_environment:
-                return self.__current_environment[name]
-            else:
-                return self.__environment_array[0][name]
+        return self.get_global_environment_box(name)
     
     def get_global_environment_box(self, name):
-        if self.__is_record == True:
-            return self.__environment_array[0][name]
-        else:
-            return self.__environment_array[0][name]
+        return self.__environment_array[0][self.__symbol_table[name].get_slot()]
         
         
     def get_current_environment(self):
-        return self.__current_environment
+        return self.__depth_environments[field_depth]
     
     """
         This function is used in visiting the elements in Record type
     
     """
     def set_current_environment(self, environment):
-        self.__current_environment = environment
-        self.__is_record = True
+        self.__depth_environments[field_depth] = environment
         
     """
         This function is used to get out of the scope of Record
         
     """
     def reset_environment(self):
-        self.__current_environment = self.__environment_array[self.__scope_num]
-        self.__is_record = False   
+        self.__depth_environments[field_depth] = self.__environment_array[self.__scope_num]
     
     """
         This function is used in calling a function
@@ -102,7 +126,8 @@ class Interpreter:
     def create_environment(self, environment):
         self.__scope_num += 1
         self.__environment_array.append(environment)
-        self.__current_environment = environment
+        self.__depth_environments[local_depth] = environment
+        self.__depth_environments[field_depth] = environment
         
     """
         This function is used when the function returns
@@ -111,7 +136,8 @@ class Interpreter:
     def delete_environmnet(self):
         self.__scope_num -= 1
         self.__environment_array.pop()
-        self.__current_environment = self.__environment_array[self.__scope_num]
+        self.__depth_environments[local_depth] = self.__environment_array[self.__scope_num]
+        self.__depth_environments[field_depth] = self.__environment_array[self.__scope_num]
     
     
         
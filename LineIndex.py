@@ -0,0 +1,66 @@
+#!/usr/bin/python
+
+########################################################################
+# author:  Shiliang Wang
+# Email:   wangshiliang@jhu.edu
+#########################################################################
+## LineIndex.py - This module keeps the offset at which every line of a
+##                source text starts, so that an absolute position in the
+##                text maps to a line and a column by binary search and
+##                the diagnostics can quote the source line.
+##
+#########################################################################
+
+import re
+from bisect import bisect_right
+
+# the same end of line characters as in Scanner, every one of them starts a new line
+eol_pattern = re.compile('[\n\r]')
+
+#########################################################################
+## LineIndex - Lines and columns are counted from 1. The line numbers are
+##             the physical lines of the source text, so they differ from
+##             the token lines after a comment that spans several lines.
+##
+#########################################################################
+class LineIndex( object ):
+    def __init__(self, source):
+        self.__source = source
+        self.__starts = [0]
+        self.__starts.extend([match.end() for match in eol_pattern.finditer(source)])
+
+    def get_line_count(self):
+        return len(self.__starts)
+
+    """
+        Return the line that contains the offset
+    """
+    def get_line(self, offset):
+        return bisect_right(self.__starts, offset)
+
+    """
+        Return the line and the column of the offset
+    """
+    def get_position(self, offset):
+        line = bisect_right(self.__starts, offset)
+        return line, offset - self.__starts[line - 1] + 1
+
+    """
+        Return the text of the line without its end of line character
+    """
+    def get_line_text(self, line):
+        start = self.__starts[line - 1]
+        if line < len(self.__starts):
+            return self.__source[start:self.__starts[line] - 1]
+        return self.__source[start:]
+
+    """
+        Return the column of the offset, followed by the source line and a
+        mark under the offset, to be appended to an error message
+    """
+    def describe(self, offset):
+        line, column = self.get_position(offset)
+        text = self.get_line_text(line)
+        #keep the tabs, so that the mark lines up with the text
+        mark = ''.join([character == '\t' and '\t' or ' ' for character in text[:column - 1]]) + '^'
+        return ' Column:' + str(column) + '\n' + text + '\n' + mark
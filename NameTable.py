@@ -0,0 +1,64 @@
+#!/usr/bin/python
+
+########################################################################
+# author:  Shiliang Wang
+# Email:   wangshiliang@jhu.edu
+#########################################################################
+## NameTable.py - This module maps every distinct identifier and keyword
+##                to a small integer id. The scanner interns each name
+##                once, so all later tokens, symbol table keys and
+##                environment keys share one string object and dictionary
+##                lookups compare them by identity. Every scanner owns a
+##                table of its own, so the names of one compilation are
+##                dropped together with its scanner.
+##
+#########################################################################
+
+#########################################################################
+## NameTable - This class interns names. The keywords are interned first,
+##             so a name is a keyword exactly when its id is below the
+##             number of keywords
+##
+#########################################################################
+class NameTable( object ):
+    def __init__(self, keywords):
+        # name -> id, and back
+        self.__ids = {}
+        self.__names = []
+        # the keywords get the ids 0 .. len(keywords) - 1
+        for keyword in keywords:
+            self.intern(keyword)
+        self.__keyword_number = len(keywords)
+
+    """
+        Return the id of the name, adding the name to the table if it is new
+    """
+    def intern(self, name):
+        name_id = self.__ids.get(name)
+        if name_id is None:
+            name_id = len(self.__names)
+            name = intern(name)
+            self.__names.append(name)
+            self.__ids[name] = name_id
+        return name_id
+
+    """
+        Return the id of the name, or None if the name was never interned
+    """
+    def get_id(self, name):
+        return self.__ids.get(name)
+
+    """
+        Return the shared string object for the given id
+    """
+    def get_name(self, name_id):
+        return self.__names[name_id]
+
+    def is_keyword(self, name_id):
+        return name_id < self.__keyword_number
+
+    def get_keyword_number(self):
+        return self.__keyword_number
+
+    def get_size(self):
+        return len(self.__names)
@@ -4,16 +4,30 @@
 # author:  Shiliang Wang           
 # Email:   wangshiliang@jhu.edu
 #########################################################################
-##   Parser.py  - This class accepts the list of tokens to the constructor
+##   Parser.py  - This class accepts the list of tokens to the constructor,
+##   or a TokenStream that produces them lazily
 ##   public function:  
 ##   def parse(self): The driver program should call this method to parse the tokens
 ##   def get_error_message(self):  The driver program can get all the 
 ##   error message by calling this function 
+##   def set_line_index(self, line_index):  With the LineIndex of the source
+##   text the error messages also show the column and the source line
+##   def get_procedure_ranges(self) and def parse_procedure(self, start_index,
+##   reused_procedures):  The IncrementalParser finds the procedures of the
+##   program with them and parses a changed one again
+##   def set_profile(self, profile):  A ParserProfile records the calls,
+##   the tokens and the time of every production
+##   def set_error_limit(self, error_limit):  The parse stops after this
+##   many errors
+##   check_syntax(token_iterator, error_limit):  Checks only the syntax of a
+##   program, in memory that does not grow with the program
 ## ######################################################################
 
 from Token import Token
+from Token import TokenStream
 from Visitor import AstAscOutput
 from Factory import AstFactory
+from Factory import ParserFactory
 from SymbolTable import Integer
 from SymbolTable import Constant
 from SymbolTable import Array
@@ -23,35 +37,54 @@ from SymbolTable import LocalVariable
 from SymbolTable import FormalVariable
 from Ast import AstNumber
 from SymbolTable import Procedure
+from SymbolTable import TypeTable
+from Visitor import Output
 
 import copy
-"""
-    This exception class is used for returning to declaration  
-"""
-class FindDeclException: pass
-
-"""
-    This exception class is used for returning to begin  
-"""
-class FindBeginException: pass
-
-"""
-    This exception is used for returning to instruction
-"""
-class FindInstructException: pass
-
-"""
-    This exception is used for ending the program
-"""
-class EndException: pass
+import types
 
 #all week symbols
 weak_symbol = [';',')',']','END','.']
 
+#the strong symbols that start a declaration, an instruction or the body of a program or a procedure
+declaration_symbol = ['CONST','TYPE','VAR']
+instruction_symbol = ['IF','REPEAT','WHILE','WRITE','READ']
+
 #all strong symbols
-strong_symbol = ['BEGIN', 'CONST','TYPE','VAR','IF','REPEAT','WHLIE','WRTIE','READ']
+strong_symbol = ['BEGIN'] + declaration_symbol + instruction_symbol
+
+#the closing symbols each production owns. While it is open the error handling stops at them as well,
+#so the production that owns the symbol takes it up; they include the follow set of Instructions
+program_sync_symbol = ['END']
+procedure_sync_symbol = ['RETURN','END']
+if_sync_symbol = ['ELSE','END']
+repeat_sync_symbol = ['UNTIL','END']
+while_sync_symbol = ['END']
+record_sync_symbol = ['END']
+
+#the symbols an instruction may start with, in the order the error message names them
+instruction_expect_symbol = ['identifier','IF','REPEAT','WHILE','READ','WRITE']
+
+# the tokens after the name of a constant whose value is a plain number
+number_constant_symbol = ['=', 'integer', ';']
+
+#the methods a ParserProfile times, see Parser.set_profile
+profiled_productions = ['parse', 'program_instructions', 'declarations', 'const_declaration', 'type_declaration',
+                        'var_declaration', 'procedure_declaration', 'type', 'instructions', 'instruction',
+                        'identifier_instruction', 'if_instruction', 'repeat_instruction', 'while_instruction',
+                        'read_instruction', 'write_instruction', 'condition', 'selector', 'expressionlist',
+                        'expression', 'operand']
         
         
+#########################################################################
+## ErrorLimitReached - This exception ends the parse once it finds one
+##                     error more than the error limit allows
+##
+#########################################################################
+class ErrorLimitReached( Exception ):
+    pass
+
+
 class Parser:
     def __init__(self, __token_array, output, factory):
         self.__token_array = __token_array
@@ -62,7 +95,95 @@ class Parser:
         self.__factory = factory
         self.__program_value = ''
         self.__start_error_index = 0
+        #the token at which the error handling started, kept so that a TokenStream may forget it
+        self.__start_error_token = None
         self.__is_error_handling = False
+        #set after a syntax error until the production that accepts the next strong symbol takes over
+        self.__synchronizing = False
+        #closing symbol -> the number of open productions that own it
+        self.__sync_counts = {}
+        #the index of the closing symbol the parser last synchronized at
+        self.__resumed_index = -1
+        self.__line_index = None
+        #the parse stops after this many errors, None for no limit
+        self.__error_limit = None
+        self.__error_count = 0
+        #the display strings are only built for an observer that keeps them
+        self.__tracing = output.tracing
+        #the first and last token index and the name of the procedures declared in the global scope
+        self.__procedure_ranges = []
+        self.__procedure_depth = 0
+        #name -> Procedure, the objects a procedure that is parsed again keeps
+        self.__reused_procedures = {}
+        #the types written in the program outside of the procedures, every procedure has a table of its own
+        #so that it gets the same types when the IncrementalParser parses it again by itself
+        self.__type_table = TypeTable()
+        #only the AstFactory builds the abstract syntax tree and knows the values of constant expressions
+        self.__builds_ast = type(factory) == AstFactory
+        #only the AstAscOutput shows where the instructions of a body end
+        self.__marks_instructions = type(output) == AstAscOutput
+        
+    def set_line_index(self, line_index):
+        self.__line_index = line_index
+        self.__factory.set_line_index(line_index)
+
+    """
+        Stop the parse at the first error after the given number of errors,
+        the error message then ends with a line that says so
+    """
+    def set_error_limit(self, error_limit):
+        self.__error_limit = error_limit
+
+    """
+        Record the calls, the consumed tokens and the time of every
+        production in the ParserProfile. The methods of this parser are
+        replaced by ones that tell the profile, a parser without a profile
+        calls the productions themselves and pays nothing.
+    """
+    def set_profile(self, profile):
+        for name in profiled_productions:
+            if name == 'parse':
+                method_name = name
+            else:
+                method_name = '_Parser__' + name
+            function = self.__profiled(profile, name, getattr(Parser, method_name).im_func)
+            setattr(self, method_name, types.MethodType(function, self))
+        #the tables call the functions with the parser
+        self.__declaration_handlers = dict([(symbol, getattr(self, '_Parser' + handler.__name__).im_func)
+                                            for symbol, handler in Parser.__declaration_handlers.iteritems()])
+        self.__instruction_handlers = dict([(symbol, getattr(self, '_Parser' + handler.__name__).im_func)
+                                            for symbol, handler in Parser.__instruction_handlers.iteritems()])
+
+    def __profiled(self, profile, name, function):
+        def profiled_function(parser, *arguments):
+            start_index = parser.__current_token_index
+            profile.enter(name)
+            try:
+                return function(parser, *arguments)
+            finally:
+                profile.leave(name, parser.__current_token_index - start_index)
+        return profiled_function
+
+    """
+        Return the first and the last token index and the name of every
+        procedure declared in the global scope, in the order of the program.
+        The name is None if the procedure has none.
+    """
+    def get_procedure_ranges(self):
+        return self.__procedure_ranges
+
+    """
+        Parse the procedure declaration that starts with the "PROCEDURE" at
+        start_index into the current scope of the factory. A procedure named
+        in reused_procedures is given the new declaration instead of a new
+        object. Return the index of the last token of the declaration.
+    """
+    def parse_procedure(self, start_index, reused_procedures = None):
+        if reused_procedures != None:
+            self.__reused_procedures = reused_procedures
+        self.__current_token_index = start_index
+        self.__procedure_declaration(self.__get_current_token(), self.__current_level)
+        return self.__current_token_index
         
         
     def __get_current_token(self):
@@ -70,20 +191,32 @@ class Parser:
         return current_token
     
     def __is_next_token(self):
-        if self.__current_token_index < len(self.__token_array) - 1:
-            return True
-        return False
+        return self.__is_next_tokens(1)
     
     def __is_next_tokens(self, length):
-        if self.__current_token_index + length < len(self.__token_array):
-            return True
-        return False
+        try:
+            self.__token_array[self.__current_token_index + length]
+        except IndexError:
+            return False
+        return True
         
     def __get_next_token(self):
         self.__current_token_index += 1
         current_token = self.__token_array[self.__current_token_index]
         return current_token     
     
+    #the tokens after the current one have the given names, the look ahead of the bulk constants
+    def __is_followed_by(self, token_names):
+        index = self.__current_token_index
+        for token_name in token_names:
+            index += 1
+            try:
+                if self.__token_array[index].get_token_name() != token_name:
+                    return False
+            except IndexError:
+                return False
+        return True
+
     def __match_next_tokens(self, tokens):
         for index in range(len(tokens)):
             if self.__token_array[self.__current_token_index+1+index] != tokens[index]:
@@ -91,92 +224,88 @@ class Parser:
         return True
             
         
-    #Program = "PROGRAM" identifier ";" Declarations ["BEGIN" Instructions] "END" identifier "." 
     def parse(self):
-        exception_exist = True
-        before_declaration = True
-        need_begin = True
-        need_declaration = True
-        need_instruction = False
+        try:
+            self.__program()
+        except ErrorLimitReached:
+            if self.__error_count == 1:
+                self.__error_message += 'error: stopped after 1 error\n'
+            else:
+                self.__error_message += 'error: stopped after ' + str(self.__error_count) + ' errors\n'
+
+    #Program = "PROGRAM" identifier ";" Declarations ["BEGIN" Instructions] "END" identifier "." 
+    def __program(self):
+        if self.__tracing:
+            self.__output.add_output('Program', self.__current_level)
+        #create a universe scope before it start parsing, and insert the singleton instance of the Integer class.
+        self.__factory.create_scope()
+        integer_type = Integer.get_instance()
+        token = Token('Integer','INTEGER',0,0,0)
+        self.__factory.add_entry(token, integer_type)
+        self.__current_level += 1;
+        self.__enter_sync(program_sync_symbol)
+        self.__expect('PROGRAM')
+        #create a program scope with the universe as its "outer" scope
+        self.__factory.create_scope()
+        self.__expect('identifier')
+        if not self.__synchronizing:
+            self.__program_value = self.__get_current_token().get_token_value()
+        self.__expect(';')
+        self.__declarations()
         
-        while exception_exist:
-            try:
-                if before_declaration:
-                    self.__output.add_output('Program', self.__current_level)
-                    #create a universe scope before it start parsing, and insert the singleton instance of the Integer class.
-                    self.__factory.create_scope()
-                    integer_type = Integer.get_instance()
-                    token = Token('Integer','INTEGER',0,0,0)
-                    self.__factory.add_entry(token, integer_type)
-                    self.__current_level += 1;
-                    self.__expect('PROGRAM')
-                    #create a program scope with the universe as its "outer" scope
-                    self.__factory.create_scope()
-                    self.__expect('identifier')
-                    self.__program_value = self.__get_current_token().get_token_value()
-                    self.__expect(';')
-                
-                if need_declaration:
-                    self.__declarations()
-                    
-                if need_begin:
-                    current_token = self.__get_next_token()
-                    if current_token.get_token_name() == 'BEGIN':
-                        instruction_node = self.__instructions()
-                        if type(self.__output) == AstAscOutput:
-                            self.__output.add_semantic_output('instructions =>\n')
-                        self.__factory.create_ast(instruction_node)
-                    else:
-                        self.__current_token_index -= 1
-                        
-                if need_instruction:
-                    instruction_node = self.__instructions()
-                    if type(self.__output) == AstAscOutput:
-                            self.__output.add_semantic_output('instructions =>\n')
-                    self.__factory.create_ast(instruction_node)
-                self.__expect('END')
-                self.__expect('identifier')
-                #if the identifier after program and the corresponding identifier after the END is not identical
-                if self.__get_current_token().get_token_value() != self.__program_value:
-                    self.__error('error: the identifier after PROGRAM and the corresponding identifier after corresponding END is not identical')
-                self.__expect('.')
-                self.__factory.delete_scope()
-                self.__current_level -= 1;
-                self.__factory.delete_scope()
-                exception_exist = False
-            
-            except FindDeclException:
-                exception_exist = True
-                before_declaration = False
-                need_declaration = True
-                need_begin = True
-                need_instruction = False
-                self.__current_level = 1
-            
-            except FindBeginException:
-                exception_exist = True
-                before_declaration = False
-                need_declaration = False
-                need_begin = True
-                need_instruction = False
-                self.__current_level = 1
-                
-            except FindInstructException:
-                before_declaration = False
-                need_declaration = False
-                need_begin = False
-                need_instruction = True
+        while True:
+            current_token = self.__get_next_token()
+            current_token_name = current_token.get_token_name()
+            if self.__synchronizing:
+                if current_token_name in program_sync_symbol and not self.__is_followed_by(['identifier', '.']):
+                    #the END of a block the error handling skipped into, go on at the next strong symbol
+                    self.__skip_to_sync(self.__get_next_token())
+                    continue
+                #no production took up the strong symbol, go on at the level of the program
+                self.__synchronizing = False
                 self.__current_level = 1
-                
-            except EndException:
-                self.__current_level = 0
-                return
-            
-            except Exception:
-                print 'exception cased:'
-                current_token = self.__get_current_token()
-                print 'token_name:' + current_token.get_token_name() + 'token_value:' + current_token.get_token_value()
-                print 'Line:' + str(current_token.get_line_number())
+                if current_token_name in declaration_symbol:
+                    self.__current_token_index -= 1
+                    self.__declarations()
+                    continue
+                elif current_token_name in instruction_symbol:
+                    self.__current_token_index -= 1
+                    self.__program_instructions()
+                    continue
+                elif current_token_name != 'BEGIN' and current_token_name not in program_sync_symbol:
+                    #the error handling reached the end of the program
+                    self.__current_level = 0
+                    return
+            if current_token_name == 'BEGIN':
+                self.__program_instructions()
+                if self.__synchronizing:
+                    continue
+            else:
+                self.__current_token_index -= 1
+            self.__expect('END')
+            self.__expect('identifier')
+            if not self.__synchronizing:
+                break
+        #if the identifier after program and the corresponding identifier after the END is not identical
+        if self.__get_current_token().get_token_value() != self.__program_value:
+            self.__error('error: the identifier after PROGRAM and the corresponding identifier after corresponding END is not identical')
+        self.__expect('.')
+        self.__leave_sync(program_sync_symbol)
+        self.__factory.delete_scope()
+        self.__current_level -= 1;
+        self.__factory.delete_scope()
+    
+    """
+        The instructions of the program become the abstract syntax tree,
+        unless the parser is synchronizing after an error in them or none
+        of them is left
+    """
+    def __program_instructions(self):
+        instruction_node = self.__instructions()
+        if not self.__synchronizing and instruction_node != None:
+            if self.__marks_instructions:
+                self.__output.add_semantic_output('instructions =>\n')
+            self.__factory.create_ast(instruction_node)
     
     """
         This function defines the ways for error handling
@@ -192,10 +321,12 @@ class Parser:
         if self.__is_error_handling == False:
             self.__is_error_handling = True
             self.__start_error_index = self.__current_token_index
+            self.__start_error_token = self.__get_current_token()
             is_report_error = True
         else:
             if self.__current_token_index - self.__start_error_index > 8:
                 self.__start_error_index = self.__current_token_index
+                self.__start_error_token = self.__get_current_token()
                 is_report_error = True
             else:
                 is_report_error = False
@@ -204,65 +335,86 @@ class Parser:
         if expect_symbol in weak_symbol:
             self.__current_token_index -= 1
             if is_report_error == True:
-                self.__error('error: ' + 'expect:\'' + expect_string + '\'  Line:' + str(self.__get_current_token().get_line_number()) + ', Position:' + str(self.__get_current_token().get_token_end_index()+1))
+                self.__error('error: ' + 'expect:\'' + expect_string + '\'  Line:' + str(self.__get_current_token().get_line_number()) + ', Position:' + str(self.__get_current_token().get_token_end_index()+1), self.__get_current_token().get_token_end_index()+1)
             return 
         
-        #Other wise, find the strong symbol 
+        #Other wise, skip to the next strong symbol or closing symbol and leave it to the production that accepts it 
         else:
-            current_token = self.__get_current_token()
-            current_token_name = current_token.get_token_name()
-            while current_token_name not in strong_symbol:
-                if self.__is_next_token() :
-                    current_token = self.__get_next_token()
-                    current_token_name = current_token.get_token_name()
-                else :
-                    if is_report_error == True:
-                        self.__error('error: ' + 'expect:\'' + expect_string + '\'  Line:' + str(self.__token_array[self.__start_error_index].get_line_number()) + \
-                                 ', Position:' + str(self.__token_array[self.__start_error_index].get_token_start_index()))
-                    raise EndException()
-
-            if current_token_name == 'CONST' or current_token_name == 'TYPE' or current_token_name == 'VAR':
-                self.__current_token_index -= 1
-                if is_report_error == True:
-                    self.__error('error: ' + 'expect:\'' + expect_string + '\'  Line:' + str(self.__token_array[self.__start_error_index].get_line_number()) + \
-                                 ', Position:' + str(self.__token_array[self.__start_error_index].get_token_start_index()))
-                raise FindDeclException()
-            
-            elif current_token_name == 'IF' or current_token_name == 'REPEAT' or current_token_name == 'WHILE' or current_token_name == 'WRITE' or current_token_name == 'READ':
-                self.__current_token_index -= 1
-                if is_report_error == True:
-                    self.__error('error: ' + 'expect:\'' + expect_string + '\'  Line:' + str(self.__token_array[self.__start_error_index].get_line_number()) + \
-                                 ', Position:' + str(self.__token_array[self.__start_error_index].get_token_start_index()))                
-                raise FindInstructException()
-            
-            elif current_token_name == 'BEGIN':
-                self.__current_token_index -= 1
-                if is_report_error == True:
-                    self.__error('error: ' + 'expect:\'' + expect_string + '\'  Line:' + str(self.__token_array[self.__start_error_index].get_line_number()) + \
-                                 ', Position:' + str(self.__token_array[self.__start_error_index].get_token_start_index()))                
-                raise FindBeginException()
+            self.__skip_to_sync(self.__get_current_token())
+            if is_report_error == True:
+                self.__error('error: ' + 'expect:\'' + expect_string + '\'  Line:' + str(self.__start_error_token.get_line_number()) + \
+                             ', Position:' + str(self.__start_error_token.get_token_start_index()), self.__start_error_token.get_token_start_index())
+            self.__synchronizing = True
         
+    """
+        Skip from the given token to the next strong symbol or closing
+        symbol of an open production, which becomes the next token
+    """
+    def __skip_to_sync(self, current_token):
+        current_token_name = current_token.get_token_name()
+        sync_counts = self.__sync_counts
+        while current_token_name not in strong_symbol and not sync_counts.get(current_token_name) and current_token_name != 'eof':
+            current_token = self.__get_next_token()
+            current_token_name = current_token.get_token_name()
+        self.__current_token_index -= 1
+
+    """
+        The production owns the closing symbols until it leaves them
+    """
+    def __enter_sync(self, sync_symbol):
+        sync_counts = self.__sync_counts
+        for symbol in sync_symbol:
+            sync_counts[symbol] = sync_counts.get(symbol, 0) + 1
+
+    def __leave_sync(self, sync_symbol):
+        sync_counts = self.__sync_counts
+        for symbol in sync_symbol:
+            sync_counts[symbol] -= 1
+
+    """
+        After an error the production takes up the next token if it is one
+        of the given closing symbols and goes on parsing at the given level
+    """
+    def __resume(self, sync_symbol, level):
+        if self.__synchronizing and self.__token_array[self.__current_token_index + 1].get_token_name() in sync_symbol:
+            self.__synchronizing = False
+            self.__current_level = level
+            self.__resumed_index = self.__current_token_index + 1
+
     #match the next token name with the expect_symbol. 
+    #while synchronizing nothing is expected, the production returns to the one that accepts the strong symbol
     def __expect(self, expect_symbol):
+        if self.__synchronizing:
+            return False
         current_token = self.__get_next_token()
         if  current_token.get_token_name() == expect_symbol:
-            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
             return True
         else :
             self.__error_handling(expect_symbol);
             
     def __expect_in_array(self, expect_symbol):
+        if self.__synchronizing:
+            return False
         current_token = self.__get_next_token()
         if current_token.get_token_name() in expect_symbol:
-            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
             return True
         else :
             self.__error_handling(expect_symbol);
             
         
-    def __error(self, error_message):
+    def __error(self, error_message, position = None):
         if error_message != '':
+            if self.__error_count == self.__error_limit:
+                #the errors so far are all the limit allows, there is more input left to check
+                raise ErrorLimitReached()
+            if self.__line_index != None and position != None:
+                error_message += self.__line_index.describe(position)
             self.__error_message += error_message + '\n'
+            self.__error_count += 1
     
     def get_error_message(self):
         return self.__error_message
@@ -270,364 +422,449 @@ class Parser:
     #Declarations = {"CONST" ConstDecl | "TYPE" TypeDecl | "VAR" VarDecl | "PROCEDURE" ProcDecl} 
     def __declarations(self):
         #print 'declarations'
-        self.__output.add_output('Declarations', self.__current_level)
+        if self.__tracing:
+            self.__output.add_output('Declarations', self.__current_level)
         self.__current_level += 1
+        level = self.__current_level
+        declaration_handlers = self.__declaration_handlers
         current_token = self.__get_next_token()
-        current_token_name = current_token.get_token_name()
-        while current_token_name == 'CONST' or current_token_name == 'TYPE' or current_token_name == 'VAR' or current_token_name == 'PROCEDURE':
-            #ConstDecl = {identifier "=" Expression ";"}
-            if current_token_name =='CONST':
-                self.__output.add_output('ConstDecl', self.__current_level)
-                self.__current_level += 1
-                self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        handler = declaration_handlers.get(current_token.get_token_name())
+        while handler != None:
+            if self.__synchronizing:
+                #the declaration at which the parser synchronized follows the one with the error
+                self.__synchronizing = False
+                self.__current_level = level
+            handler(self, current_token, level)
+            current_token = self.__get_next_token()
+            handler = declaration_handlers.get(current_token.get_token_name())
+        self.__current_token_index -= 1
+        self.__current_level -= 1
+
+    #ConstDecl = {identifier "=" Expression ";"}
+    def __const_declaration(self, current_token, level):
+        if self.__tracing:
+            self.__output.add_output('ConstDecl', self.__current_level)
+        self.__current_level += 1
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        current_token = self.__get_next_token()
+        entry_token = None
+        #the run of constants with a plain number, they cannot refer to each other and are inserted at once
+        number_tokens = []
+        number_entries = []
+        while current_token.get_token_name() =='identifier':
+            entry_token = current_token
+            #without tracing the value of "identifier = integer ;" is the number, it needs no expression
+            if self.__builds_ast and not self.__tracing and not self.__synchronizing and self.__is_followed_by(number_constant_symbol):
+                length = self.__token_array[self.__current_token_index + 2].get_token_value()
+                number_tokens.append(entry_token)
+                number_entries.append(Constant(Integer.get_instance(), length))
+                self.__current_token_index += len(number_constant_symbol)
                 current_token = self.__get_next_token()
-                entry_token = None
-                while current_token.get_token_name() =='identifier':
-                    entry_token = current_token
-                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                    self.__expect('=')
-                    expression_node = self.__expression()
-                    self.__expect(';')
-                    #create a new entry in the current scope
-                    if type(self.__factory) == AstFactory:
-                        if type(expression_node) == AstNumber:
-                            length = expression_node.get_constant_value()
-                        else:
-                            self.__error('error: the expression in the constant declaration must be constant at Line: ' + str(entry_token.get_line_number()))
-                            length = 0
+                continue
+            #the expression may use the constants of the run
+            self.__add_constants(number_tokens, number_entries)
+            number_tokens = []
+            number_entries = []
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            self.__expect('=')
+            expression_node = self.__expression()
+            self.__expect(';')
+            if not self.__synchronizing:
+                #create a new entry in the current scope
+                if self.__builds_ast:
+                    if type(expression_node) == AstNumber:
+                        length = expression_node.get_constant_value()
                     else:
-                        length = 5
-                    const_entry = Constant(Integer.get_instance(), length)
-                    if self.__factory.add_entry(entry_token, const_entry) == None:
-                        self.__error(self.__factory.get_error_message())
-                    current_token = self.__get_next_token()
-                self.__current_token_index -= 1
-                self.__current_level -= 1
-                
-            #TypeDecl = {identifier "=" Type ";"}
-            elif current_token_name == 'TYPE':
-                self.__output.add_output('TypeDecl', self.__current_level)
-                self.__current_level += 1
+                        self.__error('error: the expression in the constant declaration must be constant at Line: ' + str(entry_token.get_line_number()))
+                        length = 0
+                else:
+                    length = 5
+                const_entry = Constant(Integer.get_instance(), length)
+                if self.__factory.add_entry(entry_token, const_entry) == None:
+                    self.__error(self.__factory.get_error_message())
+            current_token = self.__get_next_token()
+        self.__add_constants(number_tokens, number_entries)
+        self.__current_token_index -= 1
+        self.__current_level -= 1
+
+    #put a run of constants to the symbol table at once
+    def __add_constants(self, entry_tokens, const_entries):
+        if len(entry_tokens) > 0:
+            for error_message in self.__factory.add_entries(entry_tokens, const_entries):
+                self.__error(error_message)
+
+    #TypeDecl = {identifier "=" Type ";"}
+    def __type_declaration(self, current_token, level):
+        if self.__tracing:
+            self.__output.add_output('TypeDecl', self.__current_level)
+        self.__current_level += 1
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        current_token = self.__get_next_token()
+        while current_token.get_token_name() == 'identifier':
+            entry_token = current_token
+            if self.__tracing:
                 self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                current_token = self.__get_next_token()
-                while current_token.get_token_name() == 'identifier':
-                    entry_token = current_token
-                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                    self.__expect('=')
-                    type_object = self.__type()
-                    if self.__factory.judge_type(entry_token, type_object) == None:
-                        self.__error(self.__factory.get_error_message())
-                    self.__expect(';')
-                    #create a new entry in the current scope
-                    if self.__factory.add_entry(entry_token, type_object) == None:
-                        self.__error(self.__factory.get_error_message())
-                    current_token = self.__get_next_token()
-                self.__current_token_index -= 1
-                self.__current_level -= 1
-                
-            #VarDecl = {IdentifierList ":" Type ";"}
-            elif current_token_name == 'VAR':
-                self.__output.add_output('VarDecl', self.__current_level)
-                self.__current_level += 1
+            self.__expect('=')
+            #the declared type is an entry with a position of its own, it is not shared
+            type_object = self.__type(False)
+            if not self.__synchronizing:
+                if self.__factory.judge_type(entry_token, type_object) == None:
+                    self.__error(self.__factory.get_error_message())
+            self.__expect(';')
+            #create a new entry in the current scope
+            if not self.__synchronizing:
+                if self.__factory.add_entry(entry_token, type_object) == None:
+                    self.__error(self.__factory.get_error_message())
+            current_token = self.__get_next_token()
+        self.__current_token_index -= 1
+        self.__current_level -= 1
+
+    #VarDecl = {IdentifierList ":" Type ";"}
+    def __var_declaration(self, current_token, level):
+        if self.__tracing:
+            self.__output.add_output('VarDecl', self.__current_level)
+        self.__current_level += 1
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        #all the variables of the section are in the same scope
+        if self.__factory.is_global_scope() == True:
+            variable_class = GlobalVariable
+        else:
+            variable_class = LocalVariable
+        #IdentifierList = identifier {"," identifier}
+        current_token = self.__get_next_token()
+        while current_token.get_token_name() == 'identifier':
+            token_array = []
+            token_array.append(current_token)
+            if self.__tracing:
+                self.__output.add_output('IdentifierList', self.__current_level)
+            self.__current_level += 1
+            if self.__tracing:
                 self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                #IdentifierList = identifier {"," identifier}
-                current_token = self.__get_next_token()
-                while current_token.get_token_name() == 'identifier':
-                    token_array = []
-                    token_array.append(current_token)
-                    self.__output.add_output('IdentifierList', self.__current_level)
-                    self.__current_level += 1
+            current_token = self.__get_next_token()
+            while current_token.get_token_name() == ',':
+                if self.__tracing:
                     self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                    current_token = self.__get_next_token()
-                    while current_token.get_token_name() == ',':
-                        self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                        self.__expect('identifier')
-                        current_token = self.__get_current_token()
-                        token_array.append(current_token)
-                        current_token = self.__get_next_token()
-                    self.__current_token_index -= 1
-                    self.__current_level -= 1
-                    self.__expect(':')
-                    type_object = self.__type()
-                    self.__expect(';')
-                    #put the array of variables to the symbol table
-                    for token in token_array:
-                        if self.__factory.is_global_scope() == True:
-                            var_type = GlobalVariable(type_object)
-                        else:
-                            var_type = LocalVariable(type_object)
-                            
-                        if self.__factory.add_entry(token, var_type) == None:
-                            self.__error(self.__factory.get_error_message())
-                    current_token = self.__get_next_token()
-                    
-                self.__current_token_index -= 1
-                self.__current_level -= 1
-                #create a new entry in the current scope
+                self.__expect('identifier')
+                current_token = self.__get_current_token()
+                if not self.__synchronizing:
+                    token_array.append(current_token)
+                current_token = self.__get_next_token()
+            self.__current_token_index -= 1
+            self.__current_level -= 1
+            self.__expect(':')
+            type_object = self.__type()
+            self.__expect(';')
+            #put the array of variables to the symbol table at once
+            if not self.__synchronizing:
+                var_types = [variable_class(type_object) for token in token_array]
+                for error_message in self.__factory.add_entries(token_array, var_types):
+                    self.__error(error_message)
+            current_token = self.__get_next_token()
             
-            #ProcDecl = "PROCEDURE" identifier "(" [Formals] ")" [":" Type] ";" { VarDecl } 
-            #[ "BEGIN" Instructions ] [ "RETURN" Expression ] "END" identifier ";" .
-            elif current_token_name == 'PROCEDURE':
-                self.__output.add_output('ProcDecl', self.__current_level)
-                argument_num = 0
-                #create a new scope
-                self.__factory.create_scope()
-                self.__current_level += 1
+        self.__current_token_index -= 1
+        self.__current_level -= 1
+
+    #ProcDecl = "PROCEDURE" identifier "(" [Formals] ")" [":" Type] ";" { VarDecl } 
+    #[ "BEGIN" Instructions ] [ "RETURN" Expression ] "END" identifier ";" .
+    def __procedure_declaration(self, current_token, level):
+        start_index = self.__current_token_index
+        self.__procedure_depth += 1
+        if self.__procedure_depth == 1:
+            program_type_table = self.__type_table
+            self.__type_table = TypeTable()
+        if self.__tracing:
+            self.__output.add_output('ProcDecl', self.__current_level)
+        argument_num = 0
+        #create a new scope
+        self.__factory.create_scope()
+        self.__current_level += 1
+        self.__enter_sync(procedure_sync_symbol)
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        self.__expect('identifier')
+        #a procedure without a name is not entered into the symbol table
+        entry_token = None
+        if not self.__synchronizing:
+            entry_token = self.__get_current_token()
+        self.__expect('(')
+        #Formals = Formal { ";" Formal } .
+        #Formal = IdentifierList ":" Type .
+        #IdentifierList = identifier {"," identifier} .
+        current_token = self.__get_next_token()
+        if current_token.get_token_name() == 'identifier':
+            token_array = []
+            token_array.append(current_token)
+            if self.__tracing:
+                self.__output.add_output('IdentifierList', self.__current_level)
+            self.__current_level += 1
+            if self.__tracing:
                 self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            current_token = self.__get_next_token()
+            while current_token.get_token_name() == ',':
+                if self.__tracing:
+                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
                 self.__expect('identifier')
-                entry_token = self.__get_current_token()
-                self.__expect('(')
-                #Formals = Formal { ";" Formal } .
-                #Formal = IdentifierList ":" Type .
-                #IdentifierList = identifier {"," identifier} .
+                current_token = self.__get_current_token()
+                if not self.__synchronizing:
+                    token_array.append(current_token)
                 current_token = self.__get_next_token()
-                if current_token.get_token_name() == 'identifier':
-                    token_array = []
+            self.__current_token_index -= 1
+            self.__current_level -= 1
+            self.__expect(':')
+            type_object = self.__type()
+            #put the array of variables to the symbol table
+            for token in token_array:
+                argument_num += 1
+                var_type = FormalVariable(type_object)
+                if self.__factory.add_entry(token, var_type) == None:
+                    self.__error(self.__factory.get_error_message())
+                    
+            token_array = []
+            current_token = self.__get_next_token()
+            while current_token.get_token_name() == ';':
+                self.__expect('identifier')
+                current_token = self.__get_current_token()
+                if not self.__synchronizing:
                     token_array.append(current_token)
+                if self.__tracing:
                     self.__output.add_output('IdentifierList', self.__current_level)
-                    self.__current_level += 1
+                self.__current_level += 1
+                if self.__tracing:
                     self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                    current_token = self.__get_next_token()
-                    while current_token.get_token_name() == ',':
+                current_token = self.__get_next_token()
+                while current_token.get_token_name() == ',':
+                    if self.__tracing:
                         self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                        self.__expect('identifier')
-                        current_token = self.__get_current_token()
+                    self.__expect('identifier')
+                    current_token = self.__get_current_token()
+                    if not self.__synchronizing:
                         token_array.append(current_token)
-                        current_token = self.__get_next_token()
-                    self.__current_token_index -= 1
-                    self.__current_level -= 1
-                    self.__expect(':')
-                    type_object = self.__type()
-                    #put the array of variables to the symbol table
-                    for token in token_array:
-                        argument_num += 1
-                        var_type = FormalVariable(type_object)
-                        if self.__factory.add_entry(token, var_type) == None:
-                            self.__error(self.__factory.get_error_message())
-                            
-                    token_array = []
                     current_token = self.__get_next_token()
-                    while current_token.get_token_name() == ';':
-                        self.__expect('identifier')
-                        current_token = self.__get_current_token()
-                        token_array.append(current_token)
-                        self.__output.add_output('IdentifierList', self.__current_level)
-                        self.__current_level += 1
-                        self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                        current_token = self.__get_next_token()
-                        while current_token.get_token_name() == ',':
-                            self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                            self.__expect('identifier')
-                            current_token = self.__get_current_token()
-                            token_array.append(current_token)
-                            current_token = self.__get_next_token()
-                        self.__current_token_index -= 1
-                        self.__current_level -= 1
-                        self.__expect(':')
-                        type_object = self.__type()
-                        current_token = self.__get_next_token()
-                    self.__current_token_index -= 1
-                    self.__current_level -= 1
-                    #put the array of variables to the symbol table
-                    for token in token_array:
-                        argument_num += 1
-                        var_type = FormalVariable(type_object)
-                        if self.__factory.add_entry(token, var_type) == None:
-                            self.__error(self.__factory.get_error_message())
-                    
-                else:
-                    self.__current_token_index -= 1
-                    
-                    #put the entry of the symbol table from global scope to the current procedure scope
-                    global_dictionary = self.__factory.get_global_scope().get_table()
-                    for key, value in sorted(global_dictionary.items()):
-                        if not self.__factory.get_current_scope().local(key):
-                            self.__factory.get_current_scope().get_table().insert(key, value)
-                    
-                self.__expect(')')
+                self.__current_token_index -= 1
+                self.__current_level -= 1
+                self.__expect(':')
+                type_object = self.__type()
                 current_token = self.__get_next_token()
-                procedure_type = None
-                if current_token.get_token_name() == ':':
-                    procedure_type = self.__type()
-                    current_token = self.__get_current_token()
-                    if type(procedure_type) != Integer:
-                        self.__error('the return type of a procedure must be INTEGER at Line: ' + str(current_token.get_line_number()) + ' position: (' + \
-                        str(current_token.get_token_start_index()) + ', ' + str(current_token.get_token_end_index()) + ')')
-                    
-                else:
-                    self.__current_token_index -= 1
-                self.__expect(';')
-                #{ VarDecl }
-                self.__declarations()
-                
-                #create a Procedure object
-                procedure_object = Procedure(self.__factory.get_current_scope(), procedure_type, argument_num)
-                if self.__factory.add_outer_entry(entry_token, procedure_object) == None:
+            self.__current_token_index -= 1
+            self.__current_level -= 1
+            #put the array of variables to the symbol table
+            for token in token_array:
+                argument_num += 1
+                var_type = FormalVariable(type_object)
+                if self.__factory.add_entry(token, var_type) == None:
                     self.__error(self.__factory.get_error_message())
-                    
-                #[ "BEGIN" Instructions ]
-                current_token = self.__get_next_token()
-                if current_token.get_token_name() == "BEGIN":
-                    procedure_object.set_body_ast(self.__instructions())
-                    if type(self.__output) == AstAscOutput:
-                        self.__output.add_semantic_output('instructions =>\n')
-                else:
-                    self.__current_token_index -= 1
-                    
-                current_token = self.__get_next_token()
-                #[ "RETURN" Expression ]
-                if current_token.get_token_name() == "RETURN":
-                    return_ast = self.__expression()
-                    if procedure_type == None:
-                        self.__error('the type of the return expression must match the return type declared for the procedure at line: ' + str(return_ast.get_line()) + ' position: (' + \
-                        str(return_ast.get_start_position()) + ', ' + str(return_ast.get_end_position()) + ')')
-                    elif type(return_ast.get_type()) != Integer:
-                        self.__error('the return type of a procedure must be INTEGER at Line: ' + str(return_ast.get_line()) + ' position: (' + \
-                        str(return_ast.get_start_position()) + ', ' + str(return_ast.get_end_position()) + ')')
-                    else:
-                        procedure_object.set_return_ast(return_ast)
-                else:
-                    self.__current_token_index -= 1
-                self.__expect('END')
-                self.__expect('identifier')
-                
-                current_token = self.__get_current_token()
-                #if the identifier after the procedure and the corresponding identifier after the END is not identical
-                if current_token.get_token_value() != entry_token.get_token_value():
-                    self.__error('error: The identifiers after PROCEDURE and the corresponding END must match at line: ' + str(entry_token.get_line_number()) + \
-                    ' and Line: ' + str(current_token.get_line_number()) + ', position: (' + str(entry_token.get_token_start_index()) + ', ' + str(entry_token.get_token_end_index()) + ')' + \
-                    ' and position: (' + str(current_token.get_token_start_index()) + ', ' + str(current_token.get_token_end_index()) + ')')
-                    
-                self.__expect(';')
-                
-                #remove the current scope
-                self.__factory.delete_scope()
-                    
-            current_token = self.__get_next_token()
-            current_token_name = current_token.get_token_name()    
-        self.__current_token_index -= 1
-        self.__current_level -= 1
+            
+        else:
+            self.__current_token_index -= 1
+            
+            #the entries of the global scope count as entries of the procedure scope, without copying them
+            self.__factory.import_global_scope()
+            
+        self.__expect(')')
+        current_token = self.__get_next_token()
+        procedure_type = None
+        if current_token.get_token_name() == ':':
+            procedure_type = self.__type()
+            current_token = self.__get_current_token()
+            if type(procedure_type) != Integer:
+                self.__error('the return type of a procedure must be INTEGER at Line: ' + str(current_token.get_line_number()) + ' position: (' + \
+                str(current_token.get_token_start_index()) + ', ' + str(current_token.get_token_end_index()) + ')')
+            
+        else:
+            self.__current_token_index -= 1
+        self.__expect(';')
+        #{ VarDecl }
+        self.__declarations()
+        
+        #create a Procedure object, a procedure parsed again keeps its object since the calls refer to it
+        if self.__procedure_depth == 1 and entry_token != None and entry_token.get_token_value() in self.__reused_procedures:
+            procedure_object = self.__reused_procedures.pop(entry_token.get_token_value())
+            procedure_object.redefine(self.__factory.get_current_scope(), procedure_type, argument_num)
+        else:
+            procedure_object = Procedure(self.__factory.get_current_scope(), procedure_type, argument_num)
+        if entry_token != None and self.__factory.add_outer_entry(entry_token, procedure_object) == None:
+            self.__error(self.__factory.get_error_message())
+            
+        #[ "BEGIN" Instructions ]
+        current_token = self.__get_next_token()
+        if current_token.get_token_name() == "BEGIN":
+            if self.__synchronizing:
+                #the body follows the declaration with the error
+                self.__synchronizing = False
+                self.__current_level = level + 1
+            procedure_object.set_body_ast(self.__instructions())
+            if self.__marks_instructions:
+                self.__output.add_semantic_output('instructions =>\n')
+        else:
+            self.__current_token_index -= 1
+        self.__resume(procedure_sync_symbol, level + 1)
+            
+        current_token = self.__get_next_token()
+        #[ "RETURN" Expression ]
+        if current_token.get_token_name() == "RETURN":
+            return_ast = self.__expression()
+            #the return expression is only known to the AstFactory
+            if self.__synchronizing or not self.__builds_ast:
+                pass
+            elif procedure_type == None:
+                self.__error('the type of the return expression must match the return type declared for the procedure at line: ' + str(return_ast.get_line()) + ' position: (' + \
+                str(return_ast.get_start_position()) + ', ' + str(return_ast.get_end_position()) + ')')
+            elif type(return_ast.get_type()) != Integer:
+                self.__error('the return type of a procedure must be INTEGER at Line: ' + str(return_ast.get_line()) + ' position: (' + \
+                str(return_ast.get_start_position()) + ', ' + str(return_ast.get_end_position()) + ')')
+            else:
+                procedure_object.set_return_ast(return_ast)
+        else:
+            self.__current_token_index -= 1
+        self.__resume(['END'], level + 1)
+        self.__expect('END')
+        self.__leave_sync(procedure_sync_symbol)
+        self.__expect('identifier')
+        
+        current_token = self.__get_current_token()
+        #if the identifier after the procedure and the corresponding identifier after the END is not identical
+        if not self.__synchronizing and entry_token != None and current_token.get_token_value() != entry_token.get_token_value():
+            self.__error('error: The identifiers after PROCEDURE and the corresponding END must match at line: ' + str(entry_token.get_line_number()) + \
+            ' and Line: ' + str(current_token.get_line_number()) + ', position: (' + str(entry_token.get_token_start_index()) + ', ' + str(entry_token.get_token_end_index()) + ')' + \
+            ' and position: (' + str(current_token.get_token_start_index()) + ', ' + str(current_token.get_token_end_index()) + ')')
+            
+        self.__expect(';')
+        
+        #remove the current scope
+        self.__factory.delete_scope()
+        self.__procedure_depth -= 1
+        if self.__procedure_depth == 0:
+            self.__type_table = program_type_table
+            if entry_token != None:
+                self.__procedure_ranges.append((start_index, self.__current_token_index, entry_token.get_token_value()))
+            else:
+                self.__procedure_ranges.append((start_index, self.__current_token_index, None))
 
     
     #Instructions = Instruction {";" Instruction}
     def __instructions(self):
         #print 'instructions'
-        self.__output.add_output('Instructions', self.__current_level)
+        if self.__tracing:
+            self.__output.add_output('Instructions', self.__current_level)
         self.__current_level += 1
+        level = self.__current_level
         instruction_node = self.__instruction()
         current_instruction_node = instruction_node
+        instruction_handlers = self.__instruction_handlers
         current_token = self.__get_next_token()
-        while current_token.get_token_name() == ';':
-            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        while current_token.get_token_name() == ';' or current_token.get_token_name() in instruction_handlers:
+            if self.__synchronizing:
+                #the instruction at which the parser synchronized follows the one with the error
+                self.__synchronizing = False
+                self.__current_level = level
+                self.__current_token_index -= 1
+            elif current_token.get_token_name() != ';':
+                if current_token.get_token_name() == 'identifier' and self.__resumed_index == self.__current_token_index - 1:
+                    #the name after an END the parser synchronized at, like the one of "END X", starts no instruction
+                    break
+                #reports the missing ";" and takes it as present
+                self.__error_handling(';')
+            elif self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
             next_instruction_node = self.__instruction()
-            if type(self.__factory) == AstFactory:
-                current_instruction_node.set_next_instruction(next_instruction_node)
-                if instruction_node.get_next_instruction() == None:
-                    instruction_node = current_instruction_node
+            #an instruction left to synchronize has no node
+            if self.__builds_ast and next_instruction_node != None:
+                if current_instruction_node == None:
+                    instruction_node = next_instruction_node
+                else:
+                    current_instruction_node.set_next_instruction(next_instruction_node)
+                    if instruction_node.get_next_instruction() == None:
+                        instruction_node = current_instruction_node
                 current_instruction_node = next_instruction_node
             current_token = self.__get_next_token()
         self.__current_token_index -= 1
         self.__current_level -= 1
         return instruction_node
         
-    #Expression = ["+"|"-"] Term {("+"|"-") Term}
-    def __expression(self):
-        #print 'expression'
-        self.__output.add_output('Expression', self.__current_level)
-        self.__current_level += 1
-        current_token = self.__get_next_token()
-        negate_expression = False
-        if current_token.get_token_name() == '+' or current_token.get_token_name() == '-':
-            self.__output.add_output(current_token.get_display_string(), self.__current_level)
-            if current_token.get_token_name() == '-':
-                negate_expression = True
-                negate_token = current_token
-        else:
-            self.__current_token_index -= 1
-        last_expression_node = self.__term()
-            
-        current_token = self.__get_next_token()
-        while current_token.get_token_name() == '+' or current_token.get_token_name() == '-':
-            self.__output.add_output(current_token.get_display_string(), self.__current_level)
-            operator_token = current_token
-            current_expression_node = self.__term()
-            new_expression_node = self.__factory.produce_binary_node(operator_token, last_expression_node, current_expression_node)
-            if new_expression_node == None:
-                self.__error(self.__factory.get_error_message())
-            else:
-                last_expression_node = new_expression_node    
-            current_token = self.__get_next_token()
-        #create the negate expression if needed
-        if negate_expression == True:
-            number_entry = Constant(Integer.get_instance(), 0)
-            new_expression_node = self.__factory.produce_binary_node(negate_token, self.__factory.produce_number_node(number_entry), last_expression_node)
-            if new_expression_node == None:
-                self.__error(self.__factory.get_error_message())
-            else:
-                last_expression_node = new_expression_node   
-        self.__current_token_index -= 1
-        self.__current_level -= 1
-        return last_expression_node
-        
     #Type = identifier | "ARRAY" Expression "OF" Type | "RECORD" {IdentifierList ":" Type ";"} "END
-    def __type(self):
+    #an ARRAY or RECORD type is the interned one of its structure, unless interned is False. Without
+    #the AstFactory the length of every array is 5, so arrays of different lengths would be merged.
+    def __type(self, interned = True):
+        interned = interned and self.__builds_ast
         #print 'type'
         #Type = identifier
-        self.__output.add_output('Type', self.__current_level)
+        if self.__tracing:
+            self.__output.add_output('Type', self.__current_level)
         self.__current_level += 1
         expect_array = ['identifier','ARRAY','RECORD']
         self.__expect_in_array(expect_array)
+        #like an undeclared type, a missing type is taken as INTEGER
+        if self.__synchronizing:
+            return Integer.get_instance()
         current_token = self.__get_current_token()
         type_object = None
         if current_token.get_token_name() == 'identifier':
-            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
             #it looks the identifier up in the current scope or the outer scope and returns the associated Type object
             type_object = self.__factory.get_type_object(current_token.get_token_value())
             if type_object == False:
                 #print 'error handling'
                 self.__error('error: type \"' + current_token.get_token_value() + '\" hasn\'t been declared yet. Line: ' + str(current_token.get_line_number()) + \
-                             ', Position:' + str(current_token.get_token_end_index()+1))
+                             ', Position:' + str(current_token.get_token_end_index()+1), current_token.get_token_end_index()+1)
                 type_object = Integer.get_instance()
             
         #Type = "ARRAY" Expression "OF" Type
         elif current_token.get_token_name() == 'ARRAY':
-            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
             expression_node = self.__expression()
-            if type(self.__factory) == AstFactory:
+            if self.__synchronizing:
+                return Integer.get_instance()
+            if self.__builds_ast:
                 if type(expression_node) == AstNumber:
                     length = expression_node.get_constant_value()
                     if length <= 0:
                         self.__error('error: The expression in the Type production must be greater than zero, Line: ' + str(current_token.get_line_number()) + \
-                             ', Position:' + str(current_token.get_token_end_index()+1))
+                             ', Position:' + str(current_token.get_token_end_index()+1), current_token.get_token_end_index()+1)
                         
                 else:
                     self.__error('error: The expression in the Type production must be constant, of type integer, Line: ' + str(current_token.get_line_number()) + \
-                             ', Position:' + str(current_token.get_token_end_index()+1))
+                             ', Position:' + str(current_token.get_token_end_index()+1), current_token.get_token_end_index()+1)
+                    length = 0
             else:
                 length = 5
             
             self.__expect('OF')
             type_object = self.__type()
-            type_object = Array(type_object, length)
+            if interned:
+                type_object = self.__type_table.get_array(type_object, length)
+            else:
+                type_object = Array(type_object, length)
             
         #Type = "RECORD" {IdentifierList ":" Type ";"} "END
         elif current_token.get_token_name() == 'RECORD':
-            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
             #create a new scope
             self.__factory.create_scope()
+            level = self.__current_level
+            self.__enter_sync(record_sync_symbol)
             #IdentifierList = identifier {"," identifier}
             current_token = self.__get_next_token()
             while current_token.get_token_name() == 'identifier':
                 token_array = []
                 token_array.append(current_token)
-                self.__output.add_output('IdentifierList', self.__current_level)
+                if self.__tracing:
+                    self.__output.add_output('IdentifierList', self.__current_level)
                 self.__current_level += 1
-                self.__output.add_output(current_token.get_display_string(), self.__current_level)
+                if self.__tracing:
+                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
                 current_token = self.__get_next_token()
                 while current_token.get_token_name() == ',':
                     self.__expect('identifier')
                     current_token = self.__get_current_token()
-                    token_array.append(current_token)
+                    if not self.__synchronizing:
+                        token_array.append(current_token)
                     current_token = self.__get_next_token()  
                 self.__current_token_index -= 1
                 self.__expect(':')
@@ -641,9 +878,14 @@ class Parser:
                         self.__error(self.__factory.get_error_message())
                 current_token = self.__get_next_token()
             self.__current_token_index -= 1
+            self.__resume(record_sync_symbol, level)
             self.__expect('END')
+            self.__leave_sync(record_sync_symbol)
             #create the actual Record type object
-            type_object = Record(self.__factory.get_current_scope())
+            if interned:
+                type_object = self.__type_table.get_record(self.__factory.get_current_scope())
+            else:
+                type_object = Record(self.__factory.get_current_scope())
             #remove the current scope
             self.__factory.delete_scope()
         self.__current_level -= 1
@@ -652,15 +894,18 @@ class Parser:
     #VarDecl = "VAR" {IdentifierList ":" Type ";"}
     def __vardecl(self):
         #print 'VarDecl'
-        self.__output.add_output('VarDecl', self.__current_level)
+        if self.__tracing:
+            self.__output.add_output('VarDecl', self.__current_level)
         self.__current_level += 1
         if self.__expect('VAR'):
             #IdentifierList = identifier {"," identifier}
             current_token = self.__get_next_token()
             while current_token.get_token_name() == 'identifier':
-                self.__output.add_output('IdentifierList', self.__current_level)
+                if self.__tracing:
+                    self.__output.add_output('IdentifierList', self.__current_level)
                 self.__current_level += 1
-                self.__output.add_output(current_token.get_display_string(), self.__current_level)
+                if self.__tracing:
+                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
                 current_token = self.__get_next_token()
                 while current_token == ',':
                     self.__expect('identifier')
@@ -672,37 +917,15 @@ class Parser:
             self.__current_token_index -= 1
         self.__current_level -= 1
               
-    #Term = Factor {("*"|"DIV"|"MOD") Factor}
-    def __term(self):
-        #print 'term'
-        self.__output.add_output('Term', self.__current_level)
-        self.__current_level += 1
-        term_node = self.__factor()
-        current_token = self.__get_next_token()
-        while current_token.get_token_name() == '*' or current_token.get_token_name() == 'DIV' or current_token.get_token_name() == 'MOD':
-            self.__output.add_output(current_token.get_token_name(), self.__current_level)
-            current_term_node = self.__factor()
-            new_term_node = self.__factory.produce_binary_node(current_token, term_node, current_term_node)
-            if new_term_node == None:
-                self.__error(self.__factory.get_error_message())
-            else:
-                term_node = new_term_node
-            current_token = self.__get_next_token()
-        self.__current_token_index -= 1
-        self.__current_level -= 1
-        return term_node
-        
-    #Factor = integer | Designator | "(" Expression ")" | Call
-    def __factor(self):
+    """
+        The integer, Designator and Call alternatives of Factor, the current
+        token is the integer or the identifier
+    """
+    def __operand(self, current_token):
         factor_node = None
-        #print 'factor'
-        self.__output.add_output('Factor', self.__current_level)
-        self.__current_level += 1
-        expect_array = ['integer','identifier','(']
-        self.__expect_in_array(expect_array)
-        current_token = self.__get_current_token()
         if current_token.get_token_name() == 'integer':
-            self.__output.add_output(current_token.get_display_string(), self.__current_level) 
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
             #create an AST node based on the current token
             factor_node = self.__factory.create_node(current_token)
             #if there exist some errors 
@@ -717,25 +940,31 @@ class Parser:
             #Call = identifier "(" [Actuals] ")" .  Actuals = ExpressionList
             if type(self.__factory.get_type_object(current_token.get_token_value())) == Procedure:
                 start_token = current_token
-                self.__output.add_output('Call', self.__current_level)
+                if self.__tracing:
+                    self.__output.add_output('Call', self.__current_level)
                 self.__current_level += 1 
-                self.__output.add_output(current_token.get_display_string(), self.__current_level)
+                if self.__tracing:
+                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
                 self.__expect('(')
                 formal_node_array = self.__expressionlist()
+                if self.__synchronizing:
+                    return None
                 current_token = self.__get_current_token()
                 table_entry = self.__factory.get_type_object(start_token.get_token_value())
                 if len(formal_node_array) != table_entry.get_argument_num():
                     self.__error('the number of the actual parameters supplied for a call must match the number of the corresponding formal parameters of' + \
                     'the called procedure at Line: ' + str(start_token.get_line_number()) + ' position: (' + \
-                    str(start_token.get_token_start_index()) + ', ' + str(self.get_token_end_index()) + ')')
+                    str(start_token.get_token_start_index()) + ', ' + str(start_token.get_token_end_index()) + ')')
                 factor_node = self.__factory.produce_function_call_node(current_token, formal_node_array, table_entry)
                 self.__expect(')')
             
             #Designator = identifier Selector
             else:
-                self.__output.add_output('Designator', self.__current_level)
+                if self.__tracing:
+                    self.__output.add_output('Designator', self.__current_level)
                 self.__current_level += 1 
-                self.__output.add_output(current_token.get_display_string(), self.__current_level) 
+                if self.__tracing:
+                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
                 #create an AST node based on the current token
                 factor_node = self.__factory.create_node(current_token)
                 #if there exists some errors
@@ -744,175 +973,385 @@ class Parser:
                     number_entry = Constant(Integer.get_instance(), 0)
                     factor_node = self.__factory.produce_number_node(number_entry)
                 factor_node = self.__selector(factor_node)
-            
-        #Factor = "(" Expression ")"
-        elif current_token.get_token_name() == '(':
-            self.__output.add_output(current_token.get_display_string(), self.__current_level) 
-            factor_node = self.__expression()
-            self.__expect(')')
-        self.__current_level -= 1
         return factor_node
+    
+    #Expression = ["+"|"-"] Term {("+"|"-") Term}
+    #Term = Factor {("*"|"DIV"|"MOD") Factor}
+    #Factor = integer | Designator | "(" Expression ")" | Call
+    """
+        Expression, Term and Factor without recursion for "(" Expression ")":
+        the expressions waiting for their ")" are kept on a stack. The
+        expression being parsed is held in negate_token, sum_node,
+        add_token, product_node and multiply_token, an outer expression is
+        pushed as a tuple of them. The trace shows every Expression, Term
+        and Factor at the level the production has in the grammar.
+    """
+    def __expression(self):
+        token_array = self.__token_array
+        produce_binary_node = self.__factory.produce_binary_node
+        tracing = self.__tracing
+        frame_stack = []
+        negate_token = self.__open_expression()
+        sum_node = add_token = product_node = multiply_token = None
+        while True:
+            #Factor, the first one of a Term if no operator is waiting
+            if tracing:
+                if multiply_token == None:
+                    self.__output.add_output('Term', self.__current_level)
+                    self.__current_level += 1
+                self.__output.add_output('Factor', self.__current_level)
+                self.__current_level += 1
+            current_token = token_array[self.__current_token_index + 1]
+            current_token_name = current_token.get_token_name()
+            if current_token_name == '(':
+                self.__current_token_index += 1
+                if tracing:
+                    #the expected token and the "(" of the factor
+                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
+                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
+                frame_stack.append((negate_token, sum_node, add_token, product_node, multiply_token))
+                negate_token = self.__open_expression()
+                sum_node = add_token = product_node = multiply_token = None
+                continue
+            if current_token_name == 'integer' or current_token_name == 'identifier':
+                self.__current_token_index += 1
+                if tracing:
+                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            else:
+                #reports the error
+                self.__expect_in_array(['integer','identifier','('])
+                if self.__synchronizing:
+                    return self.__close_expressions(frame_stack)
+            factor_node = self.__operand(current_token)
+            if tracing:
+                self.__current_level -= 1
+            if self.__synchronizing:
+                return self.__close_expressions(frame_stack)
+            
+            while True:
+                #{("*"|"DIV"|"MOD") Factor}
+                if multiply_token != None:
+                    new_term_node = produce_binary_node(multiply_token, product_node, factor_node)
+                    if new_term_node == None:
+                        self.__error(self.__factory.get_error_message())
+                    else:
+                        product_node = new_term_node
+                    multiply_token = None
+                else:
+                    product_node = factor_node
+                self.__current_token_index += 1
+                current_token = token_array[self.__current_token_index]
+                current_token_name = current_token.get_token_name()
+                if current_token_name == '*' or current_token_name == 'DIV' or current_token_name == 'MOD':
+                    if tracing:
+                        self.__output.add_output(current_token_name, self.__current_level)
+                    multiply_token = current_token
+                    break
+                
+                #{("+"|"-") Term}
+                if tracing:
+                    self.__current_level -= 1
+                if add_token != None:
+                    new_expression_node = produce_binary_node(add_token, sum_node, product_node)
+                    if new_expression_node == None:
+                        self.__error(self.__factory.get_error_message())
+                    else:
+                        sum_node = new_expression_node
+                    add_token = None
+                else:
+                    sum_node = product_node
+                if current_token_name == '+' or current_token_name == '-':
+                    if tracing:
+                        self.__output.add_output(current_token.get_display_string(), self.__current_level)
+                    add_token = current_token
+                    break
+                
+                #the expression is complete, create the negate expression if needed
+                self.__current_token_index -= 1
+                if negate_token != None:
+                    number_entry = Constant(Integer.get_instance(), 0)
+                    new_expression_node = produce_binary_node(negate_token, self.__factory.produce_number_node(number_entry), sum_node)
+                    if new_expression_node == None:
+                        self.__error(self.__factory.get_error_message())
+                    else:
+                        sum_node = new_expression_node
+                if tracing:
+                    self.__current_level -= 1
+                if len(frame_stack) == 0:
+                    return sum_node
+                #it was the factor "(" Expression ")" of the outer expression
+                factor_node = sum_node
+                negate_token, sum_node, add_token, product_node, multiply_token = frame_stack.pop()
+                self.__expect(')')
+                if tracing:
+                    self.__current_level -= 1
+    
+    """
+        Return the sign that starts an expression of __expression if it is
+        "-", None otherwise
+    """
+    def __open_expression(self):
+        if self.__tracing:
+            self.__output.add_output('Expression', self.__current_level)
+            self.__current_level += 1
+        current_token = self.__get_next_token()
+        current_token_name = current_token.get_token_name()
+        if current_token_name != '+' and current_token_name != '-':
+            self.__current_token_index -= 1
+            return None
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        if current_token_name == '-':
+            return current_token
+        return None
+    
+    """
+        After an error every open "(" Expression ")" is given up, like a
+        Factor that returns after its ")" the trace goes one level up for it
+    """
+    def __close_expressions(self, frame_stack):
+        if self.__tracing:
+            self.__current_level -= len(frame_stack)
+        return None
         
     #Instruction = Assign | If | Repeat | While | Read | Write | Call
     def __instruction(self):
         #print 'instruction'
-        self.__output.add_output('Instruction', self.__current_level)
+        if self.__tracing:
+            self.__output.add_output('Instruction', self.__current_level)
         self.__current_level += 1
-        expect_array = ['identifier','IF','REPEAT','WHILE','READ','WRITE']
-        self.__expect_in_array(expect_array)
+        #an instruction with a syntax error has no node
+        if self.__synchronizing:
+            return None
+        current_token = self.__get_next_token()
+        handler = self.__instruction_handlers.get(current_token.get_token_name())
+        if handler == None:
+            self.__error_handling(instruction_expect_symbol)
+            return None
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        return handler(self, current_token)
         
-        current_token = self.__get_current_token()
-        if current_token.get_token_name() == 'identifier':
-            #Instruction = Call
-            #Call = identifier "(" [Actuals] ")" .  
-            #Actuals = ExpressionList
-            if type(self.__factory.get_type_object(current_token.get_token_value())) == Procedure:
+    #Instruction = Call | Assign, depending on what the identifier was declared as
+    def __identifier_instruction(self, current_token):
+        #Instruction = Call
+        #Call = identifier "(" [Actuals] ")" .  
+        #Actuals = ExpressionList
+        if type(self.__factory.get_type_object(current_token.get_token_value())) == Procedure:
+            if self.__tracing:
                 self.__output.add_output('Call', self.__current_level)
-                self.__current_level += 1 
+            self.__current_level += 1 
+            if self.__tracing:
                 self.__output.add_output(current_token.get_display_string(), self.__current_level)
-                self.__expect('(')
-                formal_node_array = self.__expressionlist()
-                self.__expect(')')                
-                #create a call node in AST
-                table_entry = self.__factory.get_type_object(current_token.get_token_value())
-                instruction_node = self.__factory.produce_procedure_call_node(current_token, formal_node_array, table_entry)
-                self.__current_level -= 1
-                
-            #Instruction = Assign
-            #Assign = Designator ":=" Expression
-            #Designator = identifier Selector
-            else:
-                self.__output.add_output('Assign', self.__current_level) 
-                self.__current_level += 1
-                self.__output.add_output('Designator', self.__current_level) 
-                self.__current_level += 1
-                self.__output.add_output(current_token.get_display_string(), self.__current_level) 
-                left_location_node = self.__factory.create_node(current_token)
-                #if there exist some errors 
-                if left_location_node == None:
-                    self.__error(self.__factory.get_error_message())
-                    number_entry = Constant(Integer.get_instance(), 0)
-                    left_location_node = self.__factory.produce_number_node(number_entry)
-                
-                location_node = self.__selector(left_location_node)
-                self.__expect(':=')
-                expression_node = self.__expression()
-                #create a assign node in AST
-                instruction_node = self.__factory.produce_assign_node(location_node, expression_node)
-                self.__current_level -= 2
-            
-        #Instruction = If
-        #If = "IF" Condition "THEN" Instructions ["ELSE" Instructions] "END"
-        elif current_token.get_token_name() == 'IF':
-            self.__output.add_output('If', self.__current_level) 
-            self.__current_level += 1
-            self.__output.add_output(current_token.get_display_string(), self.__current_level) 
-            condition_node = self.__condition()
-            self.__expect('THEN')
-            true_instruction_node = self.__instructions()
-            current_token = self.__get_next_token()
-            false_instruction_node = None
-            if current_token.get_token_name() == 'ELSE':
-                self.__output.add_output(current_token.get_display_string(), self.__current_level) 
-                false_instruction_node = self.__instructions()
-            else :
-                self.__current_token_index -= 1
-            #create a if node in AST
-            instruction_node = self.__factory.produce_if_node(condition_node, true_instruction_node, false_instruction_node)
-            self.__expect('END')
+            self.__expect('(')
+            formal_node_array = self.__expressionlist()
+            self.__expect(')')                
+            if self.__synchronizing:
+                return None
+            #create a call node in AST
+            table_entry = self.__factory.get_type_object(current_token.get_token_value())
+            instruction_node = self.__factory.produce_procedure_call_node(current_token, formal_node_array, table_entry)
             self.__current_level -= 1
             
-        #Instruction = Repeat
-        #Repeat = "REPEAT" Instructions "UNTIL" Condition "END"
-        elif current_token.get_token_name() == 'REPEAT':
-            self.__output.add_output('Repeat', self.__current_level) 
+        #Instruction = Assign
+        #Assign = Designator ":=" Expression
+        #Designator = identifier Selector
+        else:
+            if self.__tracing:
+                self.__output.add_output('Assign', self.__current_level)
             self.__current_level += 1
-            self.__output.add_output(current_token.get_display_string(), self.__current_level) 
-            instruction_node = self.__instructions()
-            self.__expect('UNTIL')
-            condition_node = self.__condition()
-            #create the repeat node in AST
-            instruction_node = self.__factory.produce_repeat_node(condition_node, instruction_node)
-            self.__expect('END')
-            self.__current_level -= 1
-            
-        #Instruction = While
-        #While = "WHLIE" Condition "DO" Instructions "END"    
-        elif current_token.get_token_name() == 'WHILE':
-            self.__output.add_output('While', self.__current_level) 
+            if self.__tracing:
+                self.__output.add_output('Designator', self.__current_level)
             self.__current_level += 1
-            self.__output.add_output(current_token.get_display_string(), self.__current_level) 
-            condition_node = self.__condition()
-            self.__expect('DO')
-            instruction_node = self.__instructions()
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            left_location_node = self.__factory.create_node(current_token)
+            #if there exist some errors 
+            if left_location_node == None:
+                self.__error(self.__factory.get_error_message())
+                number_entry = Constant(Integer.get_instance(), 0)
+                left_location_node = self.__factory.produce_number_node(number_entry)
+            
+            location_node = self.__selector(left_location_node)
+            self.__expect(':=')
+            expression_node = self.__expression()
+            if self.__synchronizing:
+                return None
+            #create a assign node in AST
+            instruction_node = self.__factory.produce_assign_node(location_node, expression_node)
+            self.__current_level -= 2
+        #leave the Instruction as well
+        self.__current_level -= 1
+        return instruction_node
+        
+    #Instruction = If
+    #If = "IF" Condition "THEN" Instructions ["ELSE" Instructions] "END"
+    def __if_instruction(self, current_token):
+        if self.__tracing:
+            self.__output.add_output('If', self.__current_level)
+        self.__current_level += 1
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        level = self.__current_level
+        self.__enter_sync(if_sync_symbol)
+        condition_node = self.__condition()
+        self.__expect('THEN')
+        true_instruction_node = self.__instructions()
+        self.__resume(if_sync_symbol, level)
+        current_token = self.__get_next_token()
+        false_instruction_node = None
+        if current_token.get_token_name() == 'ELSE':
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
+            false_instruction_node = self.__instructions()
+            self.__resume(['END'], level)
+        else :
+            self.__current_token_index -= 1
+        #create a if node in AST, unless a part of it had a syntax error
+        if condition_node == None or true_instruction_node == None:
+            instruction_node = None
+        else:
+            instruction_node = self.__factory.produce_if_node(condition_node, true_instruction_node, false_instruction_node)
+        self.__expect('END')
+        self.__leave_sync(if_sync_symbol)
+        self.__current_level -= 1
+        #leave the Instruction as well
+        self.__current_level -= 1
+        return instruction_node
+        
+    #Instruction = Repeat
+    #Repeat = "REPEAT" Instructions "UNTIL" Condition "END"
+    def __repeat_instruction(self, current_token):
+        if self.__tracing:
+            self.__output.add_output('Repeat', self.__current_level)
+        self.__current_level += 1
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        level = self.__current_level
+        self.__enter_sync(repeat_sync_symbol)
+        instruction_node = self.__instructions()
+        self.__resume(['UNTIL'], level)
+        self.__expect('UNTIL')
+        condition_node = self.__condition()
+        self.__resume(['END'], level)
+        #create the repeat node in AST, unless a part of it had a syntax error
+        if condition_node == None or instruction_node == None:
+            instruction_node = None
+        else:
+            instruction_node = self.__factory.produce_repeat_node(condition_node, instruction_node)
+        self.__expect('END')
+        self.__leave_sync(repeat_sync_symbol)
+        self.__current_level -= 1
+        #leave the Instruction as well
+        self.__current_level -= 1
+        return instruction_node
+        
+    #Instruction = While
+    #While = "WHLIE" Condition "DO" Instructions "END"    
+    def __while_instruction(self, current_token):
+        if self.__tracing:
+            self.__output.add_output('While', self.__current_level)
+        self.__current_level += 1
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        level = self.__current_level
+        self.__enter_sync(while_sync_symbol)
+        condition_node = self.__condition()
+        self.__expect('DO')
+        instruction_node = self.__instructions()
+        self.__resume(while_sync_symbol, level)
+        #unless a part of it had a syntax error
+        if condition_node == None or instruction_node == None:
+            instruction_node = None
+        else:
             #we create a repeat node first
             new_condition_node = self.__factory.reverse_condition(condition_node)
             repeat_node = self.__factory.produce_repeat_node(new_condition_node, instruction_node)
             #we create a if node as the parent node of repeat node
             instruction_node = self.__factory.produce_if_node(condition_node, repeat_node, None)
-            self.__expect('END')
-            self.__current_level -= 1
-            
-        #Instruction = Read
-        #Read = "READ" Designator
-        elif current_token.get_token_name() == 'READ':
-            self.__output.add_output('Read', self.__current_level) 
-            self.__current_level += 1
-            self.__output.add_output(current_token.get_display_string(), self.__current_level) 
-            #Designator = identifier Selector
-            self.__output.add_output('Designator', self.__current_level) 
-            self.__current_level += 1
-            self.__expect('identifier')
-            current_token = self.__get_current_token()
-            location_node = self.__factory.create_node(current_token)
-            #if there exist some errors 
-            if location_node == None:
-                self.__error(self.__factory.get_error_message())
-                number_entry = Constant(Integer.get_instance(), 0)
-                location_node = self.__factory.produce_number_node(number_entry)
-            location_node = self.__selector(location_node)
-            #create a read node in AST
-            read_node = self.__factory.produce_read_node(location_node)
-            if read_node == None:
-                self.__error(self.__factory.get_error_message())
-                number_entry = Constant(Integer.get_instance(), 0)
-                instruction_node = self.__factory.produce_number_node(number_entry)
-            else:
-                instruction_node = read_node
-            self.__current_level -= 2
-            
-        #Instruction = Write
-        #Write = "WRITE" Expression   
-        elif current_token.get_token_name() == 'WRITE':
-            self.__output.add_output('Write', self.__current_level) 
-            self.__current_level += 1
+        self.__expect('END')
+        self.__leave_sync(while_sync_symbol)
+        self.__current_level -= 1
+        #leave the Instruction as well
+        self.__current_level -= 1
+        return instruction_node
+        
+    #Instruction = Read
+    #Read = "READ" Designator
+    def __read_instruction(self, current_token):
+        if self.__tracing:
+            self.__output.add_output('Read', self.__current_level)
+        self.__current_level += 1
+        if self.__tracing:
             self.__output.add_output(current_token.get_display_string(), self.__current_level)
-            expression_node = self.__expression()
-            #create a write node in AST
-            write_node = self.__factory.produce_write_node(expression_node)
-            if write_node == None:
-                self.__error(self.__factory.get_error_message())
-                #I just use the integer 0 to replace the expression
-                number_entry = Constant(Integer.get_instance(), 0)
-                instruction_node = self.__factory.produce_number_node(number_entry)
-            else:
-                instruction_node = write_node
-                
-            self.__current_level -= 1
+        #Designator = identifier Selector
+        if self.__tracing:
+            self.__output.add_output('Designator', self.__current_level)
+        self.__current_level += 1
+        self.__expect('identifier')
+        if self.__synchronizing:
+            return None
+        current_token = self.__get_current_token()
+        location_node = self.__factory.create_node(current_token)
+        #if there exist some errors 
+        if location_node == None:
+            self.__error(self.__factory.get_error_message())
+            number_entry = Constant(Integer.get_instance(), 0)
+            location_node = self.__factory.produce_number_node(number_entry)
+        location_node = self.__selector(location_node)
+        if self.__synchronizing:
+            return None
+        #create a read node in AST
+        read_node = self.__factory.produce_read_node(location_node)
+        if read_node == None:
+            self.__error(self.__factory.get_error_message())
+            #like an instruction with a syntax error, it has no node
+            instruction_node = None
+        else:
+            instruction_node = read_node
+        self.__current_level -= 2
+        #leave the Instruction as well
+        self.__current_level -= 1
+        return instruction_node
         
+    #Instruction = Write
+    #Write = "WRITE" Expression   
+    def __write_instruction(self, current_token):
+        if self.__tracing:
+            self.__output.add_output('Write', self.__current_level)
+        self.__current_level += 1
+        if self.__tracing:
+            self.__output.add_output(current_token.get_display_string(), self.__current_level)
+        expression_node = self.__expression()
+        if self.__synchronizing:
+            return None
+        #create a write node in AST
+        write_node = self.__factory.produce_write_node(expression_node)
+        if write_node == None:
+            self.__error(self.__factory.get_error_message())
+            #like an instruction with a syntax error, it has no node
+            instruction_node = None
+        else:
+            instruction_node = write_node
+            
+        self.__current_level -= 1
+        #leave the Instruction as well
         self.__current_level -= 1
         return instruction_node
         
     #Condition = Expression ("="|"#"|"<"|">"|"<="|">=) Expression
     def __condition(self):
         #print 'condition'
-        self.__output.add_output('Condition', self.__current_level) 
+        if self.__tracing:
+            self.__output.add_output('Condition', self.__current_level)
         self.__current_level += 1
         left_expression_node = self.__expression()
         match_array = ['=','#','<','>','<=','>=']
         self.__expect_in_array(match_array)
         relation_token = self.__get_current_token()
         right_expression_node = self.__expression()
+        if self.__synchronizing:
+            return None
         #create a new condition node
         condition_node = self.__factory.produce_condition_node(relation_token, left_expression_node, right_expression_node)
         self.__current_level -= 1
@@ -921,16 +1360,20 @@ class Parser:
     #Selector = {"[" ExpressionList "]" | "." identifier}
     def __selector(self, left_location_node):
         #print 'selector'
-        self.__output.add_output('Selector', self.__current_level) 
+        if self.__tracing:
+            self.__output.add_output('Selector', self.__current_level)
         self.__current_level += 1
         root_node = copy.copy(left_location_node)
         current_token = self.__get_next_token()
         current_token_name = current_token.get_token_name()
         while current_token_name == '[' or current_token_name == '.':
             if current_token_name == '[':
-                self.__output.add_output(current_token.get_display_string(), self.__current_level) 
+                if self.__tracing:
+                    self.__output.add_output(current_token.get_display_string(), self.__current_level)
                 expression_node_array = self.__expressionlist()
                 self.__expect(']')
+                if self.__synchronizing:
+                    return None
                 #for each expression node, build a new index node as their parent's node in AST
                 for expression_node in expression_node_array:
                     root_node = self.__factory.produce_index_node(root_node, expression_node)
@@ -940,6 +1383,8 @@ class Parser:
                     
             elif current_token_name == '.':
                 self.__expect('identifier')
+                if self.__synchronizing:
+                    return None
                 #build a variable node first and build a field node as their parent's node in AST
                 current_token = self.__get_current_token()
                 root_node = self.__factory.produce_field_node(root_node, current_token)
@@ -957,16 +1402,45 @@ class Parser:
     def __expressionlist(self):
         expression_node_array = []
         #print 'expressionList'
-        self.__output.add_output('ExpressionList', self.__current_level) 
+        if self.__tracing:
+            self.__output.add_output('ExpressionList', self.__current_level)
         self.__current_level += 1
         expression_node_array.append(self.__expression())
         current_token = self.__get_next_token()
         while current_token.get_token_name() == ',':
-            self.__output.add_output(current_token.get_display_string(), self.__current_level) 
+            if self.__tracing:
+                self.__output.add_output(current_token.get_display_string(), self.__current_level)
             expression_node_array.append(self.__expression())
             current_token = self.__get_next_token()
         self.__current_token_index -= 1
         self.__current_level -= 1
         return expression_node_array
 
-    
\ No newline at end of file
+    #the production that parses a declaration or an instruction, by the token it starts with.
+    #They are kept with the class, bound methods in every parser would make it a reference cycle.
+    __declaration_handlers = {'CONST': __const_declaration, 'TYPE': __type_declaration,
+                              'VAR': __var_declaration, 'PROCEDURE': __procedure_declaration}
+    __instruction_handlers = {'identifier': __identifier_instruction, 'IF': __if_instruction,
+                              'REPEAT': __repeat_instruction, 'WHILE': __while_instruction,
+                              'READ': __read_instruction, 'WRITE': __write_instruction}
+
+    
+
+
+#########################################################################
+##   check_syntax  - parse a program only for its syntax. The tokens are
+##                   pulled one by one from the iterator and forgotten, no
+##                   parse trace and no symbol table is kept, so the memory
+##                   does not grow with the program. Returns the error
+##                   message and the number of tokens read.
+## ######################################################################
+def check_syntax(token_iterator, error_limit = None, profile = None):
+    token_stream = TokenStream(token_iterator)
+    output = Output()
+    parser = Parser(token_stream, output, ParserFactory(output))
+    if error_limit != None:
+        parser.set_error_limit(error_limit)
+    if profile != None:
+        parser.set_profile(profile)
+    parser.parse()
+    return parser.get_error_message(), token_stream.get_count()
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+
+########################################################################
+# author:  Shiliang Wang
+# Email:   wangshiliang@jhu.edu
+#########################################################################
+## Profile.py - This module finds out where the parser spends its time.
+##              A ParserProfile given to Parser.set_profile records for
+##              every production the number of calls, the tokens it
+##              consumed, the time spent in it and in the productions it
+##              called, and the time spent in it alone. The report is a
+##              table or a JSON object.
+#########################################################################
+
+import time
+import json
+
+# the clock of the profile
+timer = time.time
+
+
+#########################################################################
+## ParserProfile - This class adds up the calls of the productions of
+##                 one or more parsers
+##
+#########################################################################
+class ParserProfile( object ):
+    def __init__(self):
+        #name -> [calls, tokens, cumulative time, own time]
+        self.__productions = {}
+        #[name, start time, time of the productions it called] of every production that was entered and not left yet
+        self.__stack = []
+        #name -> number of its calls not left yet, a recursive call must not count its time and tokens twice
+        self.__running = {}
+
+    """
+        The parser calls this when a production starts
+    """
+    def enter(self, name):
+        self.__running[name] = self.__running.get(name, 0) + 1
+        self.__stack.append([name, timer(), 0.0])
+
+    """
+        The parser calls this when the production that started last ends,
+        after it consumed the given number of tokens
+    """
+    def leave(self, name, tokens):
+        end_time = timer()
+        name, start_time, inner_time = self.__stack.pop()
+        elapsed_time = end_time - start_time
+        if len(self.__stack) > 0:
+            self.__stack[-1][2] += elapsed_time
+        record = self.__productions.get(name)
+        if record == None:
+            record = [0, 0, 0.0, 0.0]
+            self.__productions[name] = record
+        record[0] += 1
+        record[3] += elapsed_time - inner_time
+        self.__running[name] -= 1
+        if self.__running[name] == 0:
+            record[1] += tokens
+            record[2] += elapsed_time
+
+    """
+        Return one dictionary for every production that was called, the
+        one with the most cumulative time first
+    """
+    def get_statistics(self):
+        statistics = []
+        for name, (calls, tokens, cumulative_time, own_time) in self.__productions.iteritems():
+            statistics.append({'production': name, 'calls': calls, 'tokens': tokens,
+                               'cumulative_seconds': cumulative_time, 'own_seconds': own_time})
+        statistics.sort(key = lambda record: (-record['cumulative_seconds'], record['production']))
+        return statistics
+
+    """
+        Return the time spent in any production, for a whole parse that
+        is the time of the parse
+    """
+    def get_total_time(self):
+        return sum([record[3] for record in self.__productions.itervalues()])
+
+    def format_table(self):
+        total_time = max(self.get_total_time(), 1e-9)
+        lines = ['%-24s %9s %9s %12s %12s %7s' % ('production', 'calls', 'tokens', 'cumulative s', 'own s', 'own %')]
+        for record in self.get_statistics():
+            lines.append('%-24s %9d %9d %12.4f %12.4f %6.1f%%' % \
+                         (record['production'], record['calls'], record['tokens'], record['cumulative_seconds'],
+                          record['own_seconds'], 100.0 * record['own_seconds'] / total_time))
+        return '\n'.join(lines)
+
+    def format_json(self):
+        return json.dumps({'total_seconds': self.get_total_time(), 'productions': self.get_statistics()}, sort_keys = True)
@@ -32,35 +32,171 @@ keywords = ["ARRAY", "BEGIN", "CONST", "DIV", "DO", "ELSE", "END", \
             "THEN", "TYPE", "UNTIL", "VAR", "WHILE", "WRITE", "PROCEDURE", "RETURN"]
 
 
+### Tables for the table-driven scanner ##############################
+
+# every character of the source text belongs to exactly one class
+CLASS_OTHER = 0
+CLASS_LETTER = 1
+CLASS_DIGIT = 2
+CLASS_BLANK = 3
+CLASS_EOL = 4
+CLASS_SYMBOL = 5
+# ':', '<' and '>' may be followed by '='
+CLASS_PREFIX = 6
+CLASS_EQUAL = 7
+# '(' may start a comment
+CLASS_LPAREN = 8
+
+# character -> character class, characters not listed are CLASS_OTHER
+from collections import defaultdict
+char_class = defaultdict(int)
+for character in symbols:
+    char_class[character] = CLASS_SYMBOL
+for character in ":<>":
+    char_class[character] = CLASS_PREFIX
+char_class['='] = CLASS_EQUAL
+char_class['('] = CLASS_LPAREN
+for character in letters:
+    char_class[character] = CLASS_LETTER
+for character in digits:
+    char_class[character] = CLASS_DIGIT
+for character in blanks:
+    char_class[character] = CLASS_BLANK
+for character in eol:
+    char_class[character] = CLASS_EOL
+
+# states of the token automaton, STATE_ACCEPT means the token is complete
+STATE_ACCEPT = -1
+STATE_START = 0
+STATE_IDENTIFIER = 1
+STATE_NUMBER = 2
+STATE_SYMBOL = 3
+STATE_PREFIX = 4
+STATE_COMPOUND = 5
+
+# transitions[state][character class] -> next state
+#               OTHER         LETTER            DIGIT             BLANK         EOL           SYMBOL        PREFIX        EQUAL           LPAREN
+transitions = ((STATE_ACCEPT, STATE_IDENTIFIER, STATE_NUMBER,     STATE_ACCEPT, STATE_ACCEPT, STATE_SYMBOL, STATE_PREFIX, STATE_SYMBOL,   STATE_SYMBOL),
+               (STATE_ACCEPT, STATE_IDENTIFIER, STATE_IDENTIFIER, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT,   STATE_ACCEPT),
+               (STATE_ACCEPT, STATE_ACCEPT,     STATE_NUMBER,     STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT,   STATE_ACCEPT),
+               (STATE_ACCEPT, STATE_ACCEPT,     STATE_ACCEPT,     STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT,   STATE_ACCEPT),
+               (STATE_ACCEPT, STATE_ACCEPT,     STATE_ACCEPT,     STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_COMPOUND, STATE_ACCEPT),
+               (STATE_ACCEPT, STATE_ACCEPT,     STATE_ACCEPT,     STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT, STATE_ACCEPT,   STATE_ACCEPT))
+
+# every scanner interns the names it sees in a NameTable of its own
+from NameTable import NameTable
+
+
 from Token import *
+from LineIndex import LineIndex
 
 
-class Scanner:
-    def __init__(self, source):
+#########################################################################
+##   AbstractScanner  - This class is the base class of the scanners. It
+##                      keeps the source text, the position after the
+##                      last token and the error messages, and builds
+##                      all() and tokens() on the next() of the scanner.
+##
+#########################################################################
+
+class AbstractScanner( object ):
+    def __init__(self, source, position = 0, line = 1):
         # source text and cached length
-        self.__src = source
-        self.__len = len(source)
+        self._src = source
+        self._len = len(source)
         # current position in source text
-        self.__pos = 0
-        self.__line = 1
-        self.__have_error = False
+        self._pos = position
+        self._line = line
+        self._have_error = False
+        # next() was not called yet
+        self._clean = True
+        self._error_message = ''
+        self._line_index = None
+    
+    """
+        Return the next token in the source text, or an "eof"
+        token if the input is exhausted.
+    """
+    def next(self):
+        pass
+    
+    """
+        Return the list of token objects for the complete source
+        text, including the trailing "eof" token. Only works if
+        next() has not been called yet.
+    """
+    def all(self):
+        #it will call function next() repeatedly to implement
+        assert self._clean
+        token_array = []
+        while self._pos < self._len:
+            token = self.next()
+            if token.get_token_name() != 'eof':
+                token_array.append( token )
+                
+        token_array.append(Token('eof','', self._line,self._pos,self._pos))
+        return token_array
+    
+    """
+        Generate the same tokens as all() one at a time, so that the
+        caller doesn't have to keep the complete list.
+    """
+    def tokens(self):
+        assert self._clean
+        while self._pos < self._len:
+            token = self.next()
+            if token.get_token_name() != 'eof':
+                yield token
+                
+        yield Token('eof','', self._line,self._pos,self._pos)
+        
+    """
+        Return whether the scanner part has errors
+    """
+    def have_error(self):
+        return self._have_error
+    
+    """
+        Set the error if it detects the error
+    """
+    def _error(self, error_message):
+        self._have_error = True
+        self._error_message += error_message + '\n'
+        
+    """
+        Return all the errors in Scanner part
+    """
+    def get_error_message(self):
+        return self._error_message
+    
+    """
+        Return the LineIndex of the source text, it is built the first
+        time it is asked for
+    """
+    def get_line_index(self):
+        if self._line_index == None:
+            self._line_index = LineIndex(self._src)
+        return self._line_index
+
+
+class Scanner( AbstractScanner ):
+    def __init__(self, source):
+        super(Scanner, self).__init__(source)
+        self.__name_table = NameTable(keywords)
         # position current token started at
         self.__start = 0
-        # next() was not called yet
-        self.__clean = True
-        self.__error_message = ''
     
     """
     Are we still inside the source text?
     """
     def __valid( self ):
-        return self.__pos < self.__len
+        return self._pos < self._len
     
     """
     Character at current position in source text.
     """
     def __char( self ):
-        return self.__src[self.__pos]
+        return self._src[self._pos]
     
         
     """
@@ -68,7 +204,7 @@ class Scanner:
     """
     def __tick( self ):
         assert self.__valid() 
-        self.__pos += 1
+        self._pos += 1
         
         
     """
@@ -76,8 +212,8 @@ class Scanner:
     """
     def __is_start_comment( self ):
         #Find the start of comment by searching (*
-        if self.__pos + 1 < self.__len and self.__src[self.__pos] == '(' and self.__src[self.__pos + 1]=='*':
-            self.__pos += 2
+        if self._pos + 1 < self._len and self._src[self._pos] == '(' and self._src[self._pos + 1]=='*':
+            self._pos += 2
             return True
         return False
     
@@ -86,13 +222,13 @@ class Scanner:
     """
     def __comment( self ):
         #Find the end of comment by searching *)
-        while self.__pos + 1 < self.__len and not(self.__src[self.__pos]=='*' and self.__src[self.__pos + 1]==')'):
+        while self._pos + 1 < self._len and not(self._src[self._pos]=='*' and self._src[self._pos + 1]==')'):
             self.__tick()
         
         #if the whole source text has been processed. It will return a EOF token
-        if self.__pos + 1 == self.__len:
-            self.__error('error: ' + 'Unfinished comment statement' + ' Line:' + str(self.__line) + ' Position:' + str(self.__pos))
-        self.__pos += 2
+        if self._pos + 1 == self._len:
+            self._error('error: ' + 'Unfinished comment statement' + ' Line:' + str(self._line) + ' Position:' + str(self._pos))
+        self._pos += 2
 
     """
     Process an identifier or a keyword.
@@ -104,10 +240,12 @@ class Scanner:
             current_string += self.__char()
             self.__tick()
             
-        if current_string in keywords:
-            token = Token(current_string, '', self.__line, self.__start, self.__pos - 1)
+        name_table = self.__name_table
+        name_id = name_table.intern(current_string)
+        if name_table.is_keyword(name_id):
+            token = Token(current_string, '', self._line, self.__start, self._pos - 1)
         else:
-            token = Token('identifier', current_string, self.__line, self.__start, self.__pos - 1)
+            token = Token('identifier', name_table.get_name(name_id), self._line, self.__start, self._pos - 1)
             
         return token
 
@@ -123,7 +261,7 @@ class Scanner:
         
         # TODO: check for floating point here...
         
-        token = Token( "integer", int(current_string), self.__line, self.__start, self.__pos - 1 )
+        token = Token( "integer", int(current_string), self._line, self.__start, self._pos - 1 )
         
         return token
     
@@ -141,7 +279,7 @@ class Scanner:
                     current_string += self.__char()
                     self.__tick()
         
-        token = Token( current_string, '', self.__line, self.__start, self.__pos - 1 )
+        token = Token( current_string, '', self._line, self.__start, self._pos - 1 )
         
         return token
 
@@ -152,13 +290,13 @@ class Scanner:
     """
     def next(self):
         # mark it "dirty," can't call "all()" anymore
-        self.__clean = False
+        self._clean = False
         
         # skip leading whitespace and comments (if any)
         while self.__valid():
             if self.__char() in blanks:
                 if self.__char() in eol:
-                    self.__line += 1
+                    self._line += 1
                 self.__tick()
             #Find the start of comment by searching (*
             elif self.__is_start_comment():
@@ -167,7 +305,7 @@ class Scanner:
                 break
 
         # reset token start position
-        self.__start = self.__pos
+        self.__start = self._pos
         
         # recognize an actual token now (we hope)
         if self.__valid():
@@ -179,50 +317,427 @@ class Scanner:
                 token = self.__symbol()
             else:
                 # nope, something we can't handle...
-                self.__have_error = True
-                self.__error('error: ' + 'Unexpected symbol: ' +  self.__char() + ' Line:' + str(self.__line) + ' Position:' + str(self.__pos))
+                self._have_error = True
+                self._error('error: ' + 'Unexpected symbol: ' +  self.__char() + ' Line:' + str(self._line) + ' Position:' + str(self._pos))
                 self.__tick()
-                token =  Token('eof','', self.__line, self.__pos, self.__pos)
+                token =  Token('eof','', self._line, self._pos, self._pos)
 
         if not self.__valid():
-            token =  Token('eof','', self.__line, self.__pos, self.__pos)
+            token =  Token('eof','', self._line, self._pos, self._pos)
             
         return token
             
+
+
+#########################################################################
+##   TableScanner  - This class produces the same tokens and errors as
+##                   Scanner, but it drives a precomputed character class
+##                   table and state transition table instead of calling
+##                   a method for every character.
+##
+#########################################################################
+
+class TableScanner( AbstractScanner ):
+    """
+        The scanner may start in the middle of the source text, position
+        must be outside of any token and comment and line must be the line
+        number at that position
+    """
+    def __init__(self, source, position = 0, line = 1):
+        super(TableScanner, self).__init__(source, position, line)
+        self.__name_table = NameTable(keywords)
+        
+    """
+        Skip a comment whose text starts at pos, return the position after
+        the closing *)
+    """
+    def __comment(self, pos, line):
+        end = self._src.find('*)', pos)
+        if end < 0:
+            #the comment runs until the end of the source text
+            end = max(pos, self._len - 1)
+            if end + 1 == self._len:
+                self._error('error: ' + 'Unfinished comment statement' + ' Line:' + str(line) + ' Position:' + str(end))
+        return end + 2
     
     """
-        Return the list of token objects for the complete source
-        text, including the trailing "eof" token. Only works if
-        next() has not been called yet.
+        Return the next token in the source text, or an "eof"
+        token if the input is exhausted.
     """
-    def all(self):
-        #it will call function next() repeatedly to implement
-        assert self.__clean
-        token_array = []
-        while self.__valid():
-            token = self.next()
-            if token.get_token_name() != 'eof':
-                token_array.append( token )
-                
-        token_array.append(Token('eof','', self.__line,self.__pos,self.__pos))
-        return token_array
+    def next(self):
+        # mark it "dirty," can't call "all()" anymore
+        self._clean = False
+        src = self._src
+        length = self._len
+        pos = self._pos
+        line = self._line
+        classes = char_class
+        name_table = self.__name_table
+        intern_name = name_table.intern
+        get_name = name_table.get_name
+        keyword_number = name_table.get_keyword_number()
+        
+        # skip leading whitespace and comments (if any)
+        while pos < length:
+            current_class = classes[src[pos]]
+            if current_class == CLASS_BLANK:
+                pos += 1
+            elif current_class == CLASS_EOL:
+                line += 1
+                pos += 1
+            elif current_class == CLASS_LPAREN and pos + 1 < length and src[pos + 1] == '*':
+                pos = self.__comment(pos + 2, line)
+            else:
+                break
+        
+        # recognize an actual token now (we hope)
+        if pos < length:
+            start = pos
+            state = transitions[STATE_START][classes[src[pos]]]
+            if state == STATE_ACCEPT:
+                # nope, something we can't handle...
+                self._error('error: ' + 'Unexpected symbol: ' +  src[pos] + ' Line:' + str(line) + ' Position:' + str(pos))
+                pos += 1
+                token = Token('eof','', line, pos, pos)
+            else:
+                # follow the transitions until the token is complete
+                pos += 1
+                row = transitions[state]
+                while pos < length:
+                    next_state = row[classes[src[pos]]]
+                    if next_state == STATE_ACCEPT:
+                        break
+                    state = next_state
+                    row = transitions[state]
+                    pos += 1
+                    
+                current_string = src[start:pos]
+                if state == STATE_IDENTIFIER:
+                    name_id = intern_name(current_string)
+                    if name_id < keyword_number:
+                        token = Token(current_string, '', line, start, pos - 1)
+                    else:
+                        token = Token('identifier', get_name(name_id), line, start, pos - 1)
+                elif state == STATE_NUMBER:
+                    token = Token('integer', int(current_string), line, start, pos - 1)
+                else:
+                    token = Token(current_string, '', line, start, pos - 1)
+                    
+        if pos >= length:
+            token = Token('eof','', line, pos, pos)
+            
+        self._pos = pos
+        self._line = line
+        return token
+
+
+#########################################################################
+##   IncrementalScanner  - This class keeps the token list of a source text
+##                         and updates it after an edit. It rescans from
+##                         the last token that the edit cannot change until
+##                         a new token starts where an old token started
+##                         (moved by the edit), and then only moves the
+##                         rest of the old tokens. Every rescan has a
+##                         scanner and a name table of its own, so no
+##                         table grows over the edits.
+##
+#########################################################################
+
+class IncrementalScanner( AbstractScanner ):
+    def __init__(self, source):
+        super(IncrementalScanner, self).__init__(source)
+        self.__token_array = []
+        # number of tokens scanned again by the last edit
+        self.__rescanned = 0
+        # the tokens the last edit replaced, see get_last_edit
+        self.__last_edit = None
+        self.__rescan_all()
         
     """
-        Return whether the scanner part has errors
+        Scan the complete source text again
     """
-    def have_error(self):
-        return self.__have_error
+    def __rescan_all(self):
+        scanner = TableScanner(self._src)
+        self.__token_array = scanner.all()
+        self._have_error = scanner.have_error()
+        self._error_message = scanner.get_error_message()
+        self.__rescanned = len(self.__token_array)
+        self.__last_edit = None
+        
+    """
+        Return the index of the first old token that has to be scanned
+        again. The scanner looks one character past a token to find its end,
+        so a token is kept only if that character is before the edit.
+    """
+    def __restart_index(self, offset):
+        token_array = self.__token_array
+        low = 0
+        high = len(token_array) - 1
+        while low < high:
+            middle = (low + high) / 2
+            if token_array[middle].get_token_end_index() + 1 < offset:
+                low = middle + 1
+            else:
+                high = middle
+        return low
     
     """
-        Set the error if it detects the error
+        Replace "removed" characters at "offset" by the "inserted" text and
+        update the token list. Return the new token list, which shares the
+        unchanged tokens with the old one.
     """
-    def __error(self, error_message):
-        self.__have_error = True
-        self.__error_message += error_message + '\n'
+    def edit(self, offset, removed, inserted):
+        assert 0 <= offset and offset + removed <= len(self._src)
+        if removed == 0 and inserted == '':
+            self.__rescanned = 0
+            self.__last_edit = (offset, 0, 0, 0, 0)
+            return self.__token_array
+        old_array = self.__token_array
+        self._src = self._src[:offset] + inserted + self._src[offset + removed:]
+        self._len = len(self._src)
+        self._line_index = None
+        # the error messages carry positions, so they are only kept exact
+        # by scanning everything
+        if self._have_error:
+            self.__rescan_all()
+            return self.__token_array
+        
+        delta = len(inserted) - removed
+        # old tokens starting here or later are outside of the edited text
+        unchanged_start = offset + removed
+        index = self.__restart_index(offset)
+        if index > 0:
+            previous = old_array[index - 1]
+            scanner = TableScanner(self._src, previous.get_token_end_index() + 1, previous.get_line_number())
+        else:
+            scanner = TableScanner(self._src)
         
+        token_array = old_array[:index]
+        old_index = index
+        old_length = len(old_array)
+        self.__rescanned = 0
+        while True:
+            token = scanner.next()
+            if scanner.have_error():
+                self.__rescan_all()
+                return self.__token_array
+            if token.get_token_name() == 'eof':
+                # the rest of the source text holds no more tokens
+                token_array.append(token)
+                self.__last_edit = (index, old_length - index, len(token_array) - index, delta, 0)
+                break
+            self.__rescanned += 1
+            start = token.get_token_start_index()
+            while old_index < old_length and old_array[old_index].get_token_start_index() + delta < start:
+                old_index += 1
+            if old_index < old_length:
+                old_token = old_array[old_index]
+                old_start = old_token.get_token_start_index()
+                if old_start >= unchanged_start and old_start + delta == start:
+                    # the same text follows, so the old tokens are still right
+                    line_delta = token.get_line_number() - old_token.get_line_number()
+                    self.__last_edit = (index, old_index - index, len(token_array) - index, delta, line_delta)
+                    self.__shift(token_array, old_index, delta, line_delta)
+                    break
+            token_array.append(token)
+        
+        self.__token_array = token_array
+        return token_array
+    
     """
-        Return all the errors in Scanner part
+        Append the old tokens from old_index on to token_array, moved by
+        delta characters and line_delta lines. The tokens are moved in
+        place, so a token list returned before is only valid until the
+        next edit.
     """
-    def get_error_message(self):
-        return self.__error_message
+    def __shift(self, token_array, old_index, delta, line_delta):
+        moved_array = self.__token_array[old_index:]
+        if delta != 0 or line_delta != 0:
+            for old_token in moved_array:
+                old_token.move(delta, line_delta)
+        token_array.extend(moved_array)
+    
+    """
+        Compute the edit between the current source text and the new one
+        from their common prefix and suffix, then apply it
+    """
+    def update(self, source):
+        old_source = self._src
+        limit = min(len(old_source), len(source))
+        #the longest common prefix and suffix are found by halving, the slices are compared at C speed
+        low = 0
+        high = limit
+        while low < high:
+            middle = (low + high + 1) / 2
+            if old_source[low:middle] == source[low:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        prefix = low
+        low = 0
+        high = limit - prefix
+        while low < high:
+            middle = (low + high + 1) / 2
+            if old_source[len(old_source) - middle:len(old_source) - low] == source[len(source) - middle:len(source) - low]:
+                low = middle
+            else:
+                high = middle - 1
+        suffix = low
+        return self.edit(prefix, len(old_source) - prefix - suffix, source[prefix:len(source) - suffix])
+    
+    """
+        Return the token list including the trailing "eof" token, just
+        like Scanner.all()
+    """
+    def all(self):
+        return self.__token_array
+    
+    """
+        Generate the tokens of the token list one at a time, just like
+        Scanner.tokens()
+    """
+    def tokens(self):
+        return iter(self.__token_array)
+    
+    def get_source(self):
+        return self._src
+    
+    """
+        Return the number of tokens the last edit scanned again
+    """
+    def get_rescanned(self):
+        return self.__rescanned
+
+    """
+        Return what the last edit did to the token list: the index of the
+        first new token, the number of old tokens it replaced, the number
+        of new tokens, and how many characters and lines the old tokens
+        after them moved. None if everything was scanned again.
+    """
+    def get_last_edit(self):
+        return self.__last_edit
+
+
+#########################################################################
+##   RegexScanner  - This class produces the same tokens and errors as
+##                   Scanner, but it matches the whole source text with
+##                   one compiled alternation of named groups.
+##
+#########################################################################
+
+import re
+
+token_pattern = re.compile(r'''
+    (?P<blank>[ \t\f]+)
+  | (?P<eol>[\n\r])
+  | (?P<comment>\(\*.*?\*\))
+  | (?P<unfinished>\(\*.*)
+  | (?P<identifier>[A-Za-z][A-Za-z0-9]*)
+  | (?P<integer>[0-9]+)
+  | (?P<symbol>:=|<=|>=|[;:,.+\-*=\#()\[\]<>])
+  | (?P<unexpected>.)
+''', re.VERBOSE | re.DOTALL)
+
+class RegexScanner( AbstractScanner ):
+    def __init__(self, source):
+        super(RegexScanner, self).__init__(source)
+        self.__name_table = NameTable(keywords)
+        self.__token_generator = None
+        
+    """
+        Generate all the tokens of the source text except for the
+        trailing "eof" token.
+    """
+    def __generate(self):
+        length = self._len
+        line = 1
+        name_table = self.__name_table
+        intern_name = name_table.intern
+        get_name = name_table.get_name
+        keyword_number = name_table.get_keyword_number()
+        for match in token_pattern.finditer(self._src):
+            kind = match.lastgroup
+            if kind == 'blank' or kind == 'comment':
+                continue
+            elif kind == 'eol':
+                line += 1
+                continue
+            start = match.start()
+            end = match.end()
+            if kind == 'unfinished':
+                #the comment runs until the end of the source text
+                self._line = line
+                if start + 2 < length:
+                    self._error('error: ' + 'Unfinished comment statement' + ' Line:' + str(line) + ' Position:' + str(length - 1))
+                    self._pos = length + 1
+                else:
+                    self._pos = length + 2
+                return
+            elif kind == 'unexpected':
+                self._error('error: ' + 'Unexpected symbol: ' + match.group() + ' Line:' + str(line) + ' Position:' + str(start))
+                continue
+            #a token that ends the source text is reported as "eof", just like in Scanner
+            if end == length:
+                break
+            if kind == 'identifier':
+                current_string = match.group()
+                name_id = intern_name(current_string)
+                if name_id < keyword_number:
+                    yield Token(current_string, '', line, start, end - 1)
+                else:
+                    yield Token('identifier', get_name(name_id), line, start, end - 1)
+            elif kind == 'integer':
+                yield Token('integer', int(match.group()), line, start, end - 1)
+            else:
+                yield Token(match.group(), '', line, start, end - 1)
+        self._line = line
+        self._pos = length
+    
+    """
+        Return the next token in the source text, or an "eof"
+        token if the input is exhausted.
+    """
+    def next(self):
+        # mark it "dirty," can't call "all()" anymore
+        self._clean = False
+        if self.__token_generator == None:
+            self.__token_generator = self.__generate()
+        for token in self.__token_generator:
+            return token
+        return Token('eof','', self._line, self._pos, self._pos)
+    
+    """
+        Return the list of token objects for the complete source
+        text, including the trailing "eof" token. Only works if
+        next() has not been called yet.
+    """
+    def all(self):
+        assert self._clean
+        self._clean = False
+        token_array = list(self.__generate())
+        token_array.append(Token('eof','', self._line,self._pos,self._pos))
+        return token_array
+    
+    """
+        Generate the same tokens as all() one at a time, so that the
+        caller doesn't have to keep the complete list.
+    """
+    def tokens(self):
+        assert self._clean
+        self._clean = False
+        for token in self.__generate():
+            yield token
+        yield Token('eof','', self._line,self._pos,self._pos)
+
+
+### Scanner backends ##################################################
+
+# all the scanner classes that can be selected by name
+scanner_backends = {'basic': Scanner, 'table': TableScanner, 'regex': RegexScanner}
+
+"""
+    Construct the scanner of the given backend for the source text
+"""
+def create_scanner(source, backend = 'table'):
+    return scanner_backends[backend](source)
     
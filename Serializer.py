@@ -0,0 +1,46 @@
+#!/usr/bin/python
+
+########################################################################
+# author:  Shiliang Wang
+# Email:   wangshiliang@jhu.edu
+#########################################################################
+## Serializer.py - This module turns the abstract syntax tree and the
+##                 symbol table of a program into a compact string and
+##                 back, so they can be sent between processes or stored.
+##
+#########################################################################
+
+import cPickle
+import zlib
+import gc
+
+# changes whenever the pickled classes change, stored data of another
+# version must not be loaded
+format_version = 5
+
+"""
+    Return the abstract syntax tree and the symbol table as one compressed
+    string
+"""
+def serialize(ast_root, symbol_table):
+    return zlib.compress(call_without_collection(cPickle.dumps, (ast_root, symbol_table), 2))
+
+"""
+    Return the abstract syntax tree and the symbol table stored by serialize
+"""
+def deserialize(data):
+    return call_without_collection(cPickle.loads, zlib.decompress(data))
+
+"""
+    Pickling makes no garbage, but every object it creates or remembers
+    makes the cyclic garbage collector walk the whole growing tree again,
+    which takes more than half of the time on large programs
+"""
+def call_without_collection(function, *arguments):
+    if not gc.isenabled():
+        return function(*arguments)
+    gc.disable()
+    try:
+        return function(*arguments)
+    finally:
+        gc.enable()
@@ -14,6 +14,10 @@ from Environment import RecordBox
 import copy
 
 class Entry( object ):
+    #every entry keeps its attributes in slots instead of a dictionary of its
+    #own, a large program has hundreds of thousands of entries
+    __slots__ = ('_visitor', '_start_position', '_end_position', '_line')
+
     def __init__(self):
         self._visitor = None
         self._start_position = 0
@@ -22,6 +26,21 @@ class Entry( object ):
         
     def accept(self, visitor):
         self._visitor = visitor
+
+    """
+        Return the (name, value) pairs of the attributes that are set, the
+        entries have no dictionary that vars could return
+    """
+    def get_attributes(self):
+        attributes = []
+        for entry_class in self.__class__.__mro__:
+            for name in entry_class.__dict__.get('__slots__', ()):
+                #the slots of the private attributes are mangled like the attributes
+                if name.startswith('__'):
+                    name = '_' + entry_class.__name__ + name
+                if hasattr(self, name):
+                    attributes.append((name, getattr(self, name)))
+        return attributes
         
     def to_asc_output(self):
         pass
@@ -58,6 +77,8 @@ class Entry( object ):
 ## ######################################################################
 
 class Constant( Entry ):
+    __slots__ = ('__const_type', '__value')
+
     def __init__(self, const_type, value):
         self.__const_type = const_type
         self.__value = value
@@ -105,12 +126,24 @@ class Constant( Entry ):
 #########################################################################
 
 class Variable( Entry ):
+    __slots__ = ('_slot',)
+
     def __init__(self, var_type):
-        pass
+        self._slot = None
         
     def get_type(self):
         pass
     
+    """
+        The index of the box of the variable in the environments of its
+        scope, given when the scope inserts the variable
+    """
+    def get_slot(self):
+        return self._slot
+    
+    def set_slot(self, slot):
+        self._slot = slot
+    
     def get_address_offset(self):
         pass
     
@@ -131,6 +164,8 @@ class Variable( Entry ):
 #########################################################################
 
 class GlobalVariable( Variable ):
+    __slots__ = ('__var_type', '__address_offset')
+
     def __init__(self, var_type):
         self.__var_type = var_type
         self.__address_offset = None
@@ -174,6 +209,8 @@ class GlobalVariable( Variable ):
 #########################################################################
 
 class LocalVariable( Variable ):
+    __slots__ = ('__var_type', '__address_offset')
+
     def __init__(self, var_type):
         self.__var_type = var_type
         self.__address_offset = None
@@ -218,6 +255,8 @@ class LocalVariable( Variable ):
 #########################################################################
 
 class FormalVariable( Variable ):
+    __slots__ = ('__var_type', '__address_offset')
+
     def __init__(self, var_type):
         self.__var_type = var_type
         self.__address_offset = None
@@ -262,17 +301,51 @@ class FormalVariable( Variable ):
 ## ######################################################################
 
 class Type( Entry ):
+    #the layout of a type is computed once, the code generators ask for it for
+    #every variable of the type
+    __slots__ = ('__size', '__alignment', '_layout_valid')
+
     def __init__(self):
         self.__size = 0
+        self.__alignment = 1
+        self._layout_valid = False
         
     def get_size(self):
         return self.__size
     
     def set_size(self, size):
         self.__size = size
+
+    def get_alignment(self):
+        return self.__alignment
+
+    def set_alignment(self, alignment):
+        self.__alignment = alignment
     
     def get_type(self):
         pass
+
+    """
+        Whether the size, the alignment and the offsets of the type were
+        computed and are still valid
+    """
+    def has_layout(self):
+        return self._layout_valid
+
+    """
+        Throw the layout away, the next to_storage_allocation computes it
+        again
+    """
+    def invalidate_layout(self):
+        self._layout_valid = False
+
+    def to_storage_allocation(self):
+        if not self.has_layout():
+            self._compute_layout()
+            self._layout_valid = True
+
+    def _compute_layout(self):
+        pass
     
     
 #########################################################################
@@ -285,6 +358,7 @@ class Type( Entry ):
 
 ## Singleton class
 class Integer( Type ):
+    __slots__ = ()
     ## Stores the unique Singleton instance-
     _instance = None
 
@@ -323,9 +397,10 @@ class Integer( Type ):
         #print 'build IntegerBox ends'
         return integer_box
     
-    def to_storage_allocation(self):
+    def _compute_layout(self):
         #print 'allocate integer starts'
         self.set_size(4)
+        self.set_alignment(4)
         #print 'allocate integer ends'
         
         
@@ -336,6 +411,8 @@ class Integer( Type ):
 ## ######################################################################
 
 class Array( Type ):
+    __slots__ = ('__array_type', '__length')
+
     def __init__(self, array_type, length):
         self.__array_type = array_type
         self.__length = length
@@ -384,13 +461,21 @@ class Array( Type ):
         #print 'build ArrayBox ends'
         return array_box
     
-    def to_storage_allocation(self):
+    """
+        The layout of an array is only valid as long as the layout of its
+        elements is
+    """
+    def has_layout(self):
+        return self._layout_valid and self.__array_type.has_layout()
+
+    def _compute_layout(self):
         #print 'allocate array starts'
         self.__array_type.accept(self._visitor)
         self.__array_type.to_storage_allocation()
         element_size = self.__array_type.get_size()
         size = element_size * self.__length
         self.set_size(size)
+        self.set_alignment(self.__array_type.get_alignment())
         #print 'allocate array ends, length is ' + str(length)
         
 
@@ -401,12 +486,37 @@ class Array( Type ):
 #########################################################################
 
 class Record( Type ):
+    __slots__ = ('__scope', '__field_offsets', '__field_count', '__field_types')
+
     def __init__(self, scope):
         self.__scope = scope
+        #field name -> address offset, filled by the layout
+        self.__field_offsets = {}
+        #the number of fields the layout was computed for
+        self.__field_count = 0
+        #(slot, type) of every field, see get_field_types
+        self.__field_types = []
         super(Record, self).__init__()
         
     def get_scope(self):
         return self.__scope
+
+    """
+        Return the address offset of the field of the given name, the
+        layout must have been computed
+    """
+    def get_field_offset(self, name):
+        return self.__field_offsets[name]
+
+    def get_field_offsets(self):
+        return self.__field_offsets
+
+    """
+        A field inserted into the scope after the layout was computed makes
+        the layout invalid
+    """
+    def has_layout(self):
+        return self._layout_valid and self.__field_count == self.__scope.get_slot_count()
     
     def to_asc_output(self):
         #print 'welcome record'
@@ -451,26 +561,31 @@ class Record( Type ):
         self._visitor.add_semantic_output('_anchor_' + str(id(self)) + ' -> _anchor_' + str(id(self.__scope)) + '\n')
         self._visitor.add_idnumber(id(self))
         
+    """
+        Return the slot and the type of every field, the interpreter builds
+        a box for every record variable from them
+    """
+    def get_field_types(self):
+        if len(self.__field_types) != self.__scope.get_slot_count():
+            #we just build the environment for the variable entry
+            self.__field_types = [(value.get_slot(), value.get_type()) for value in self.__scope.get_table().itervalues()
+                                  if isinstance(value, Variable)]
+        return self.__field_types
+
     def to_environment(self):
         #print 'build RecordBox starts'
-        dictionary = self.__scope.get_table()
-        record_box = RecordBox()
-        
-        for key, value in sorted(dictionary.items()):
-            #print 'build record element starts'
-            #we just build the environment for the variable entry
-            if isinstance(value, Variable):
-                variable_type = value.get_type()
-                variable_type.accept(self._visitor)
-                record_box.add_element_box(key, variable_type.to_environment())
-            #print 'build record element ends'
+        record_box = RecordBox(self.__scope.get_slot_count())
+        for slot, variable_type in self.get_field_types():
+            variable_type.accept(self._visitor)
+            record_box.add_element_box(slot, variable_type.to_environment())
         #print 'build RecordBox ends'
         return record_box
     
-    def to_storage_allocation(self):
+    def _compute_layout(self):
         #print 'allocate Record starts'
         dictionary = self.__scope.get_table()
-        record_size = 0
+        field_offsets = {}
+        alignment = 1
         offset = 0
         for key, value in sorted(dictionary.items()):
             #print 'allocate record element starts'
@@ -481,12 +596,17 @@ class Record( Type ):
                 variable_type.to_storage_allocation()
                 
                 #set the address offset for every element in the record
+                field_alignment = variable_type.get_alignment()
+                offset = (offset + field_alignment - 1) / field_alignment * field_alignment
                 value.set_address_offset(offset)
+                field_offsets[key] = offset
                 offset += variable_type.get_size()
+                alignment = max(alignment, field_alignment)
                 
-                record_size += variable_type.get_size()
-                
-        self.set_size(record_size)
+        self.__field_offsets = field_offsets
+        self.__field_count = self.__scope.get_slot_count()
+        self.set_size(offset)
+        self.set_alignment(alignment)
         #print 'allocate record ends, length is ' + str(length)
         
         
@@ -497,6 +617,8 @@ class Record( Type ):
 #########################################################################
 
 class Procedure( Entry ):
+    __slots__ = ('__scope', '__procedure_type', '__body_ast', '__return_ast', '__argument_num')
+
     def __init__( self, scope, procedure_type, argument_num):
         self.__scope = scope
         self.__procedure_type = procedure_type
@@ -524,6 +646,17 @@ class Procedure( Entry ):
     
     def get_argument_num(self):
         return self.__argument_num
+
+    """
+        Give the procedure the scope and the signature of a new declaration
+        of it, the calls that refer to this object stay valid
+    """
+    def redefine(self, scope, procedure_type, argument_num):
+        self.__scope = scope
+        self.__procedure_type = procedure_type
+        self.__body_ast = None
+        self.__return_ast = None
+        self.__argument_num = argument_num
         
 
 #########################################################################
@@ -540,12 +673,39 @@ class Scope:
         self.__environment = {}
         self.__scope_num = scope_num
         self.__outer_scope = outer_scope
+        #the scope whose entries count as entries of this scope, see import_scope
+        self.__imported_scope = None
+        #the number of variables inserted, the size of the environments of this scope
+        self.__slot_count = 0
+        
+    """
+        The entries of the given scope count as entries of this scope as
+        well, before those of the outer scopes. This is how a procedure
+        without formals sees the global scope, which is not copied into it.
+        get_table still returns only the entries inserted into this scope.
+    """
+    def import_scope(self, scope):
+        self.__imported_scope = scope
+    
+    def get_imported_scope(self):
+        return self.__imported_scope
         
     """
-        This function insert an entry to the symbol table
+        This function insert an entry to the symbol table, the name is stored
+        as the interned string, the one the tokens hold, so that lookups
+        compare names by identity
     """
     def insert(self, name, entry):
-        self.__dictionary[name] = entry
+        if isinstance(entry, Variable):
+            entry.set_slot(self.__slot_count)
+            self.__slot_count += 1
+        self.__dictionary[intern(name)] = entry
+    
+    """
+        Every variable of the scope has a slot below this number
+    """
+    def get_slot_count(self):
+        return self.__slot_count
     
     """
         This function finds the value associated with a given name in the scope or any outer scope
@@ -554,8 +714,9 @@ class Scope:
     def find(self, name):
         current_scope = self
         while current_scope != None:
-            if current_scope.__dictionary.has_key(name):
-                return current_scope.__dictionary.get(name)
+            entry = current_scope.get_local(name)
+            if entry != None:
+                return entry
             current_scope = current_scope.__outer_scope
         return False
     
@@ -564,9 +725,17 @@ class Scope:
         or is an outer scope
     """
     def local(self, name):
-        if self.__dictionary.has_key(name):
-            return True
-        return False
+        return self.get_local(name) != None
+    
+    """
+        This function returns the entry of the given name in this scope or
+        the scope it imported, None if there is none
+    """
+    def get_local(self, name):
+        entry = self.__dictionary.get(name)
+        if entry == None and self.__imported_scope != None:
+            return self.__imported_scope.get_local(name)
+        return entry
     
     """
         This function will build the environment based on the symbol table
@@ -588,4 +757,211 @@ class Scope:
         return self.__dictionary
     
     def get_environment(self):
-        return self.__environment
\ No newline at end of file
+        return self.__environment
+
+#########################################################################
+## TypeTable - This class interns the ARRAY and RECORD types written in
+##              the source. Structurally identical types share one object,
+##              so they share one layout, one environment and one node of
+##              the DOT output. The element and field types are interned
+##              first, so their objects stand for their structure.
+##
+#########################################################################
+
+class TypeTable( object ):
+    def __init__(self):
+        #(id of the element type, length) -> Array
+        self.__arrays = {}
+        #((slot, name, id of the field type)...) -> Record
+        self.__records = {}
+
+    """
+        Return the array of the given element type and length
+    """
+    def get_array(self, array_type, length):
+        #the array keeps its element type alive, so its id is not reused
+        key = (id(array_type), length)
+        array = self.__arrays.get(key)
+        if array == None:
+            array = Array(array_type, length)
+            self.__arrays[key] = array
+        return array
+
+    """
+        Return the record of the fields of the given scope, in the order of
+        their declaration. The scope of a record that is found is dropped.
+    """
+    def get_record(self, scope):
+        fields = [(value.get_slot(), name, id(value.get_type())) for name, value in scope.get_table().iteritems()]
+        fields.sort()
+        key = tuple(fields)
+        record = self.__records.get(key)
+        if record == None:
+            record = Record(scope)
+            self.__records[key] = record
+        return record
+
+    def get_type_number(self):
+        return len(self.__arrays) + len(self.__records)
+
+
+#########################################################################
+## ScopeStack - This class holds the scopes a factory has entered, the
+##              last one is the current scope. A name is looked up in the
+##              current scope first and then outward level by level.
+##
+#########################################################################
+
+class ScopeStack( object ):
+    def __init__(self):
+        self._scopes = []
+
+    def push(self, scope):
+        self._scopes.append(scope)
+
+    def pop(self):
+        return self._scopes.pop()
+
+    """
+        Return the scope at the given depth, the universe scope is at depth 0
+    """
+    def get_scope(self, depth):
+        return self._scopes[depth]
+
+    def get_scopes(self):
+        return self._scopes
+
+    """
+        Insert the entry into the scope at the given depth
+    """
+    def insert(self, depth, name, entry):
+        self._scopes[depth].insert(name, entry)
+
+    """
+        The entries of the given scope count as entries of the scope at the
+        given depth, see Scope.import_scope
+    """
+    def import_scope(self, depth, scope):
+        self._scopes[depth].import_scope(scope)
+
+    """
+        Return the entry of the given name in the current scope or any
+        outer scope, False if there is none
+    """
+    def find(self, name):
+        return self._scopes[-1].find(name)
+
+    """
+        Return the entry of the given name in the scope at the given depth
+        or the scope it imported, None if there is none
+    """
+    def get_local(self, depth, name):
+        return self._scopes[depth].get_local(name)
+
+
+#########################################################################
+## FlatScopeStack - This class is a ScopeStack after LeBlanc and Cook.
+##              One dictionary maps every name to the stack of its
+##              bindings in the entered scopes, the innermost one last,
+##              so a lookup costs the same at any depth of nesting. When a
+##              scope is left, the names inserted into it are unbound
+##              again. The scopes keep their own tables for the records,
+##              the procedures and the symbol table of the program.
+##
+#########################################################################
+
+class FlatScopeStack( ScopeStack ):
+    def __init__(self):
+        super(FlatScopeStack, self).__init__()
+        #name -> [(depth, entry)...], ordered by depth
+        self.__bindings = {}
+        #the names inserted into the scope at every depth, they are unbound when it is left
+        self.__undo_lists = []
+        #the depths of the entered scopes that imported a scope, the innermost one last
+        self.__import_depths = []
+
+    """
+        A scope that already has entries, like the global scope entered
+        again by the IncrementalParser, binds them when it is pushed
+    """
+    def push(self, scope):
+        super(FlatScopeStack, self).push(scope)
+        self.__undo_lists.append([])
+        depth = len(self._scopes) - 1
+        for name, entry in scope.get_table().iteritems():
+            self.__bind(depth, name, entry)
+        if scope.get_imported_scope() != None:
+            self.__import_depths.append(depth)
+
+    def pop(self):
+        if len(self.__import_depths) > 0 and self.__import_depths[-1] == len(self._scopes) - 1:
+            self.__import_depths.pop()
+        for name in self.__undo_lists.pop():
+            bindings = self.__bindings[name]
+            #the scope that is left is the innermost one, its binding is the last
+            bindings.pop()
+            if len(bindings) == 0:
+                del self.__bindings[name]
+        return super(FlatScopeStack, self).pop()
+
+    def insert(self, depth, name, entry):
+        self._scopes[depth].insert(name, entry)
+        self.__bind(depth, name, entry)
+
+    def import_scope(self, depth, scope):
+        super(FlatScopeStack, self).import_scope(depth, scope)
+        #only the current scope imports, it is the innermost one
+        self.__import_depths.append(depth)
+
+    def __bind(self, depth, name, entry):
+        bindings = self.__bindings.get(name)
+        if bindings == None:
+            self.__bindings[name] = [(depth, entry)]
+        else:
+            #a procedure is inserted into the outer scope while its own scope is open
+            index = len(bindings)
+            while index > 0 and bindings[index - 1][0] > depth:
+                index -= 1
+            bindings.insert(index, (depth, entry))
+        self.__undo_lists[depth].append(name)
+
+    """
+        Like in the chain of scopes, a scope that imported another one sees
+        its entries before those of the scopes around it. A procedure
+        without formals imports the global scope at any depth, so the
+        scopes deeper than the innermost binding that imported a scope are
+        asked first, the innermost one first.
+    """
+    def find(self, name):
+        bindings = self.__bindings.get(name)
+        if bindings == None:
+            binding_depth = -1
+        else:
+            binding_depth = bindings[-1][0]
+        import_depths = self.__import_depths
+        index = len(import_depths) - 1
+        while index >= 0 and import_depths[index] > binding_depth:
+            entry = self._scopes[import_depths[index]].get_imported_scope().get_local(name)
+            if entry != None:
+                return entry
+            index -= 1
+        if bindings == None:
+            return False
+        return bindings[-1][1]
+
+    def get_local(self, depth, name):
+        bindings = self.__bindings.get(name)
+        if bindings != None:
+            for binding_depth, entry in reversed(bindings):
+                if binding_depth == depth:
+                    return entry
+                if binding_depth < depth:
+                    break
+        imported_scope = self._scopes[depth].get_imported_scope()
+        if imported_scope != None:
+            return imported_scope.get_local(name)
+        return None
+
+
+#the ways a factory can keep its scopes, see SemanticFactory
+scope_stacks = {'chained': ScopeStack, 'flat': FlatScopeStack}
@@ -47,5 +47,171 @@ class Token:
     def get_token_end_index(self):
         return self.__end_index
     
+    """
+        Move the token by delta characters and line_delta lines, used by
+        the IncrementalScanner after an edit before the token
+    """
+    def move(self, delta, line_delta):
+        self.__start_index += delta
+        self.__end_index += delta
+        self.__line_number += line_delta
+    
+
+        
+
+
+#########################################################################
+##   TokenStream  - This class pulls tokens lazily from a token iterator
+##                  (for example Scanner.tokens()) and can be indexed like
+##                  the token list returned by Scanner.all(). Only the
+##                  last "window" tokens are kept, so the parser may step
+##                  back a few tokens but never to the start of the file.
+##
+## ######################################################################
+
+from collections import deque
+
+class TokenStream:
+    def __init__(self, token_iterator, window = 16):
+        self.__iterator = iter(token_iterator)
+        self.__window = deque([], window)
+        # number of tokens pulled from the iterator so far
+        self.__count = 0
+        
+    """
+        Return the token at the given absolute index, raise IndexError
+        once the index is beyond the "eof" token.
+    """
+    def __getitem__(self, index):
+        while index >= self.__count:
+            try:
+                token = self.__iterator.next()
+            except StopIteration:
+                raise IndexError('token index out of range')
+            self.__window.append(token)
+            self.__count += 1
+        first_index = self.__count - len(self.__window)
+        assert index >= first_index, 'token ' + str(index) + ' has already left the lookahead window'
+        return self.__window[index - first_index]
+    
+    """
+        Return the number of tokens pulled so far
+    """
+    def get_count(self):
+        return self.__count
+
+
+#########################################################################
+##   TokenBuffer  - This class stores tokens column by column: compact
+##                  arrays hold the kind id, line, start and end of every
+##                  token and an index into a table of distinct values.
+##                  Indexing it returns a TokenView, which has the same
+##                  accessors as Token, so Parser and the factories can
+##                  use it in place of the list from Scanner.all().
+##
+## ######################################################################
+
+from array import array
+
+class TokenBuffer( object ):
+    def __init__(self, token_iterator = ()):
+        # kind id -> token name, and back
+        self._names = []
+        self._name_ids = {}
+        # value id -> token value, and back. id 0 is the empty value
+        self._values = ['']
+        self._value_ids = {'': 0}
+        # one entry per token in every column
+        self._kinds = array('B')
+        self._lines = array('i')
+        self._starts = array('i')
+        self._ends = array('i')
+        self._value_indices = array('i')
+        # the parser asks for the same token many times in a row
+        self._last_view = None
+        for token in token_iterator:
+            self.append(token)
+            
+    """
+        Store one more token at the end of the buffer
+    """
+    def append(self, token):
+        self.add(token.get_token_name(), token.get_token_value(), token.get_line_number(), \
+                 token.get_token_start_index(), token.get_token_end_index())
+        
+    def add(self, token_name, value, line, start_index, end_index):
+        kind = self._name_ids.get(token_name)
+        if kind == None:
+            kind = len(self._names)
+            self._names.append(token_name)
+            self._name_ids[token_name] = kind
+        value_index = self._value_ids.get(value)
+        if value_index == None:
+            value_index = len(self._values)
+            self._values.append(value)
+            self._value_ids[value] = value_index
+        self._kinds.append(kind)
+        self._lines.append(line)
+        self._starts.append(start_index)
+        self._ends.append(end_index)
+        self._value_indices.append(value_index)
+        
+    def __len__(self):
+        return len(self._kinds)
+    
+    def __getitem__(self, index):
+        last_view = self._last_view
+        if last_view != None and last_view._index == index:
+            return last_view
+        if index < 0:
+            index += len(self._kinds)
+        if index < 0 or index >= len(self._kinds):
+            raise IndexError('token index out of range')
+        self._last_view = TokenView(self, index)
+        return self._last_view
+    
+    def __iter__(self):
+        for index in xrange(len(self._kinds)):
+            yield TokenView(self, index)
+    
+    
+#########################################################################
+##   TokenView  - This class is the view of one token in a TokenBuffer
+##
+## ######################################################################
 
+class TokenView( object ):
+    __slots__ = ('_buffer', '_index')
+    
+    def __init__(self, token_buffer, index):
+        self._buffer = token_buffer
+        self._index = index
         
+    def display(self):
+        print self.get_display_string()
+        
+    def get_display_string(self):
+        token_buffer = self._buffer
+        index = self._index
+        display_string = token_buffer._names[token_buffer._kinds[index]]
+        value = token_buffer._values[token_buffer._value_indices[index]]
+        if str(value) != '':
+            display_string += '<' + str(value) + '>'
+        return display_string + '@(' + str(token_buffer._starts[index]) + ', ' + str(token_buffer._ends[index]) + ')'
+    
+    def get_line_number(self):
+        return self._buffer._lines[self._index]
+
+    def get_token_name(self):
+        token_buffer = self._buffer
+        return token_buffer._names[token_buffer._kinds[self._index]]
+
+    def get_token_value(self):
+        token_buffer = self._buffer
+        return token_buffer._values[token_buffer._value_indices[self._index]]
+    
+    def get_token_start_index(self):
+        return self._buffer._starts[self._index]
+    
+    def get_token_end_index(self):
+        return self._buffer._ends[self._index]
@@ -19,6 +19,10 @@
 from Myfunc import *
 
 class Output( object ):
+    ## True if the observer keeps what add_output gets, otherwise the parser
+    ## doesn't call add_output at all
+    tracing = False
+    
     def __init__(self):
         pass
     
@@ -54,6 +58,8 @@ class Output( object ):
 ## ######################################################################
 
 class ParserAscOutput(Output):
+    tracing = True
+    
     def __init__(self):
         self.__output_array = [];
     
@@ -84,6 +90,8 @@ class ParserAscOutput(Output):
 ## ######################################################################
 
 class ParserDotOutput(Output):
+    tracing = True
+    
     def __init__(self):
         self.__output_array = [];
         self.__output_string = ''
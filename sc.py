@@ -13,12 +13,38 @@
 ##            of a simple program
 ##            If no filename is given, you should read the program from 
 ##            standard input instead.
+##            The option "--scanner=" ("basic"|"table"|"regex") selects the
+##            scanner backend, the default is "table".
+##            The option "--symbols=" ("chained"|"flat") selects how the
+##            factory keeps its scopes, the default is "chained". "flat"
+##            looks a name up in one dictionary at any depth of nesting.
+##            The option "--cache=" directory keeps the symbol table and
+##            the abstract syntax tree of the programs that are compiled
+##            to code or interpreted, an unchanged program is then neither
+##            scanned nor parsed again.
+##            The option "--profile" prints how often every production of
+##            the parser was called, the tokens it consumed and its time
+##            to standard error when the driver ends, "--profile=json"
+##            prints the same as a JSON object.
+##            "-c --check" [filename] checks only the syntax of the program
+##            and stops after 10 errors, "--check=" N after N errors. The
+##            tokens are read one at a time and no parse trace is kept, so
+##            even huge programs are checked in little memory. It prints
+##            the errors and the tokens per second.
+##            The option "--lines" describes where in the source text an
+##            error is, with its line, column and source line, for the
+##            parse errors of "-i", "-x" and the code generator and for
+##            the errors found while interpreting or by "-x".
 #########################################################################
 
 import sys
 import os
-from Scanner import Scanner
+import time
+from Scanner import scanner_backends
+from Scanner import create_scanner
+from Token import TokenStream
 from Parser import Parser
+from Parser import check_syntax
 from Visitor import Output
 from Visitor import ParserAscOutput
 from Visitor import ParserDotOutput
@@ -29,9 +55,209 @@ from Visitor import AstDotOutput
 from Factory import ParserFactory
 from Factory import SemanticFactory
 from Factory import AstFactory
+from SymbolTable import scope_stacks
 from Interpreter import Interpreter
 from CodeGenerator import CodeGenerator
 from ImprovedCodeGenerator import ImprovedCodeGenerator
+from Cache import ParseCache
+from Profile import ParserProfile
+from LineIndex import LineIndex
+import mmap
+import atexit
+import re
+from cStringIO import StringIO
+
+
+#########################################################################
+##   read_source  - map the file into memory, the scanners index and slice
+##                  the mmap just like a string, so the text is never
+##                  copied into one large string
+## ######################################################################
+def read_source(file_name):
+    source_file = open(file_name, 'rb')
+    try:
+        #an empty file cannot be mapped
+        if os.fstat(source_file.fileno()).st_size == 0:
+            return ''
+        try:
+            return mmap.mmap(source_file.fileno(), 0, access = mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError):
+            #not a regular file, for example a pipe
+            return source_file.read()
+    finally:
+        source_file.close()
+
+
+#########################################################################
+##   read_standard_input  - read the program from standard input, every
+##                          line ends with a new line. With a stop word the
+##                          program ends before the first line that holds
+##                          only the stop word, and the rest of standard
+##                          input is left for the READ instructions.
+## ######################################################################
+def read_standard_input(stop = None):
+    try:
+        #somebody types the program, READ must still be able to ask for the input line by line
+        if stop != None and sys.stdin.isatty():
+            lines = []
+            for line in iter(sys.stdin.readline, ''):
+                if line == stop + '\n':
+                    break
+                lines.append(line)
+            input_string = ''.join(lines)
+        else:
+            input_string = sys.stdin.read()
+            if stop != None:
+                stop_line = re.compile('^' + re.escape(stop) + '(\n|\Z)', re.M).search(input_string)
+                if stop_line != None:
+                    #raw_input reads from sys.stdin, so READ gets what follows the stop word
+                    sys.stdin = StringIO(input_string[stop_line.end():])
+                    input_string = input_string[:stop_line.start()]
+        if input_string != '' and not input_string.endswith('\n'):
+            input_string += '\n'
+        return input_string
+    except KeyboardInterrupt:
+        return ''
+
+
+#########################################################################
+##   compile_program  - scan and parse the program up to the symbol table
+##                      and the abstract syntax tree. Returns the error
+##                      message of the scanner, the error message of the
+##                      parser, the symbol table and the abstract syntax
+##                      tree. Only programs without errors are cached.
+## ######################################################################
+def compile_program(input_string, line_index = None):
+    if parse_cache != None:
+        cached = parse_cache.load(input_string)
+        if cached != None:
+            ast_root, symbol_table = cached
+            return '', '', symbol_table, ast_root
+
+    #construct the object of Scanner by it's constructor
+    scanner = create_scanner(input_string, scanner_backend)
+    #produce a list of tokens by calling it's function
+    token_array = scanner.all()
+    if scanner.have_error() == True:
+        return scanner.get_error_message(), '', None, None
+
+    output = Output()
+    factory = AstFactory(output, scope_stack)
+    parser = create_parser(token_array, output, factory)
+    if line_index != None:
+        parser.set_line_index(line_index)
+    parser.parse()
+    symbol_table = factory.get_symbol_table()
+    ast_root = factory.get_ast_root()
+    if parse_cache != None and parser.get_error_message() == '':
+        parse_cache.store(input_string, ast_root, symbol_table)
+    return '', parser.get_error_message(), symbol_table, ast_root
+
+
+#########################################################################
+##   create_line_index  - the LineIndex of the source text with "--lines",
+##                        None without it
+## ######################################################################
+def create_line_index(input_string):
+    if not show_lines:
+        return None
+    return LineIndex(input_string)
+
+
+#########################################################################
+##   create_parser  - a Parser that reports to the profile of the driver,
+##                    if it has one
+## ######################################################################
+def create_parser(token_array, output, factory):
+    parser = Parser(token_array, output, factory)
+    if parse_profile != None:
+        parser.set_profile(parse_profile)
+    return parser
+
+
+#########################################################################
+##   check_program  - check the syntax of the program and print the errors
+##                    and the throughput
+## ######################################################################
+def check_program(input_string):
+    scanner = create_scanner(input_string, scanner_backend)
+    start_time = time.time()
+    error_message, token_count = check_syntax(scanner.tokens(), syntax_error_limit, parse_profile)
+    elapsed_time = max(time.time() - start_time, 1e-6)
+    if scanner.have_error():
+        print scanner.get_error_message()
+    if error_message != '':
+        print error_message
+    elif not scanner.have_error():
+        print 'syntax ok'
+    print '%d tokens in %.3f s: %.0f tokens/s' % (token_count, elapsed_time, token_count / elapsed_time)
+
+
+#########################################################################
+##   print_profile  - print the profile of all parsers to standard error,
+##                    the output of the driver itself stays as it is
+## ######################################################################
+def print_profile(json_format):
+    if json_format:
+        print >> sys.stderr, parse_profile.format_json()
+    else:
+        print >> sys.stderr, parse_profile.format_table()
+
+#the "--scanner=" option may appear anywhere, remove it before looking at the other arguments
+scanner_backend = 'table'
+for argument in sys.argv[1:]:
+    if argument.startswith('--scanner='):
+        scanner_backend = argument[len('--scanner='):]
+        sys.argv.remove(argument)
+if scanner_backend not in scanner_backends:
+    print 'error: unknown scanner \"' + scanner_backend + '\", choose one of ' + ', '.join(sorted(scanner_backends.keys()))
+    exit(-1)
+
+#the "--symbols=" option may appear anywhere as well
+scope_stack = 'chained'
+for argument in sys.argv[1:]:
+    if argument.startswith('--symbols='):
+        scope_stack = argument[len('--symbols='):]
+        sys.argv.remove(argument)
+if scope_stack not in scope_stacks:
+    print 'error: unknown symbol table \"' + scope_stack + '\", choose one of ' + ', '.join(sorted(scope_stacks.keys()))
+    exit(-1)
+
+parse_cache = None
+for argument in sys.argv[1:]:
+    if argument.startswith('--cache='):
+        parse_cache = ParseCache(argument[len('--cache='):])
+        sys.argv.remove(argument)
+
+parse_profile = None
+for argument in sys.argv[1:]:
+    if argument == '--profile' or argument == '--profile=json':
+        parse_profile = ParserProfile()
+        #the driver leaves by exit() after errors, the profile is printed anyway
+        atexit.register(print_profile, argument == '--profile=json')
+        sys.argv.remove(argument)
+
+show_lines = False
+for argument in sys.argv[1:]:
+    if argument == '--lines':
+        show_lines = True
+        sys.argv.remove(argument)
+
+#the number of errors after which "-c --check" stops, None without "--check"
+syntax_error_limit = None
+for argument in sys.argv[1:]:
+    if argument == '--check':
+        syntax_error_limit = 10
+        sys.argv.remove(argument)
+    elif argument.startswith('--check='):
+        try:
+            syntax_error_limit = int(argument[len('--check='):])
+        except ValueError:
+            syntax_error_limit = 0
+        if syntax_error_limit <= 0:
+            print 'error: "--check=" needs a number of errors greater than zero'
+            exit(-1)
+        sys.argv.remove(argument)
 
 try:
     #if the argument is not 1 or 2 or 3 then abort the program
@@ -42,35 +268,20 @@ try:
     #if there are no argument except for the name of the program, the driver is supposed to generate code for an input program
     elif len(sys.argv) == 1:
         input_string = ''
-        new_line = ''
-        while new_line != 'stop\n':
-            try:
-                input_string += new_line
-                new_line = raw_input() + '\n'
-            except (EOFError, KeyboardInterrupt):
-                break
+        input_string = read_standard_input('stop')
         
-        #construct the object of Scanner by it's constructor
-        scanner = Scanner(input_string)
-        #produce a list of tokens by calling it's function
-        token_array = scanner.all()
+        line_index = create_line_index(input_string)
+        scanner_error, parser_error, symbol_table, ast_root = compile_program(input_string, line_index)
         #if produces the error message, then display it
-        if scanner.have_error() == True:
-            print scanner.get_error_message()
+        if scanner_error != '':
+            print scanner_error
 
         else:
-            output = Output()
-            factory = AstFactory(output)
-            parser = Parser(token_array, output, factory)
-            #print 'parse start'
-            parser.parse()
             print 'parse success'
-            if parser.get_error_message() != '':
-                print parser.get_error_message()
+            if parser_error != '':
+                print parser_error
                 exit()
                 
-            symbol_table = factory.get_symbol_table()
-            ast_root = factory.get_ast_root()
             #print 'code generation start'
             if symbol_table:
                 code_generation = CodeGenerator(symbol_table, ast_root)
@@ -85,20 +296,15 @@ try:
             if len(sys.argv) == 3:
                 #Read the file
                 if os.path.exists(sys.argv[2]):
-                    f = open(sys.argv[2])
-                    input_string = f.read()
+                    input_string = read_source(sys.argv[2])
                 #if the directory of the file does not exist
                 else:
                     print 'error: The directory of the file does not exist'
             #if the second argument does not exist, it will read from standard input
             elif len(sys.argv) == 2:
-                while True:
-                    try:
-                        input_string += raw_input() + '\n'
-                    except (EOFError, KeyboardInterrupt):
-                        break
+                input_string = read_standard_input()
             #construct the object of Scanner by it's constructor
-            scanner = Scanner(input_string)
+            scanner = create_scanner(input_string, scanner_backend)
             #produce a list of tokens by calling it's function
             token_array = scanner.all()
             #display all the tokens
@@ -108,25 +314,30 @@ try:
             if scanner.have_error()== True:
                 print scanner.get_error_message()
         
+        #if the option is -c with --check, it will only check the syntax
+        elif sys.argv[1] == '-c' and syntax_error_limit != None:
+            if len(sys.argv) == 2:
+                check_program(read_standard_input())
+            elif len(sys.argv) == 3 and os.path.exists(sys.argv[2]):
+                check_program(read_source(sys.argv[2]))
+            else:
+                print 'error: The directory of the file does not exist'
+
         #if the option is -c, it will run the Parser and produce the syntax tree
         elif sys.argv[1] == '-c':
             input_string = '';
             #if the second argument doesn't exist.
             if len(sys.argv) == 2:
-                while True:
-                    try:
-                        input_string += raw_input() + '\n'
-                    except (EOFError, KeyboardInterrupt):
-                        break
+                input_string = read_standard_input()
                 
                 #construct the object of Scanner by it's constructor
-                scanner = Scanner(input_string)
-                #produce a list of tokens by calling it's function
-                token_array = scanner.all()
+                scanner = create_scanner(input_string, scanner_backend)
+                #the parser pulls the tokens lazily, they are never kept in one list
+                token_array = TokenStream(scanner.tokens())
             
                 output = ParserAscOutput()
                 factory = ParserFactory(output)
-                parser = Parser(token_array, output, factory)     
+                parser = create_parser(token_array, output, factory)     
                 print 'parse begin'
                 parser.parse()  
                 print 'parse success'
@@ -137,18 +348,14 @@ try:
             elif len(sys.argv) == 3:
                 #if the second argument is -g, it means to produce a graphic output. 
                 if sys.argv[2] == '-g': 
-                    while True:
-                        try:
-                            input_string += raw_input() + '\n'
-                        except (EOFError, KeyboardInterrupt):
-                            break
+                    input_string = read_standard_input()
                     #construct the object of Scanner by it's constructor
-                    scanner = Scanner(input_string)
-                    #produce a list of tokens by calling it's function
-                    token_array = scanner.all()
+                    scanner = create_scanner(input_string, scanner_backend)
+                    #the parser pulls the tokens lazily, they are never kept in one list
+                    token_array = TokenStream(scanner.tokens())
                     output = ParserDotOutput()
                     factory = ParserFactory(output)
-                    parser = Parser(token_array, output, factory)
+                    parser = create_parser(token_array, output, factory)
                     #print 'parser begin'
                     parser.parse()
                     #print 'parser success'
@@ -156,15 +363,14 @@ try:
                         
                 #Otherwise, it means to read from the file
                 elif os.path.exists(sys.argv[2]):
-                    f = open(sys.argv[2])
-                    input_string = f.read()
+                    input_string = read_source(sys.argv[2])
                     #construct the object of Scanner by it's constructor
-                    scanner = Scanner(input_string)
-                    #produce a list of tokens by calling it's function
-                    token_array = scanner.all()
+                    scanner = create_scanner(input_string, scanner_backend)
+                    #the parser pulls the tokens lazily, they are never kept in one list
+                    token_array = TokenStream(scanner.tokens())
                     output = ParserAscOutput()
                     factory = ParserFactory(output)
-                    parser = Parser(token_array, output, factory)
+                    parser = create_parser(token_array, output, factory)
                     parser.parse()
                     output.print_output()
                     print parser.get_error_message()
@@ -179,14 +385,13 @@ try:
                 if sys.argv[2] == '-g':
                     #judge whether the filename in the third argument is exist
                     if os.path.exists(sys.argv[3]):
-                        f = open(sys.argv[3])
-                        input_string = f.read()
+                        input_string = read_source(sys.argv[3])
                         #construct the object of Scanner by it's constructor
-                        scanner = Scanner(input_string)
-                        token_array = scanner.all()
+                        scanner = create_scanner(input_string, scanner_backend)
+                        token_array = TokenStream(scanner.tokens())
                         output = ParserDotOutput()
                         factory = ParserFactory(output)
-                        parser = Parser(token_array, output, factory)
+                        parser = create_parser(token_array, output, factory)
                         parser.parse()
                         output.print_output()
                     else:
@@ -200,14 +405,10 @@ try:
             input_string = '';
             #if the second argument doesn't exist.
             if len(sys.argv) == 2:
-                while input_string != 'stop':
-                    try:
-                        input_string += raw_input() + '\n'
-                    except (EOFError, KeyboardInterrupt):
-                        break
+                input_string = read_standard_input()
                 
                 #construct the object of Scanner by it's constructor
-                scanner = Scanner(input_string)
+                scanner = create_scanner(input_string, scanner_backend)
                 #produce a list of tokens by calling it's function
                 token_array = scanner.all()
                 #if produces the error message, then display it
@@ -217,8 +418,8 @@ try:
                 else:
                     #print 'scanner complete'
                     output = SemanticAscOutput()
-                    factory = SemanticFactory(output)
-                    parser = Parser(token_array, output, factory)
+                    factory = SemanticFactory(output, scope_stack)
+                    parser = create_parser(token_array, output, factory)
                     parser.parse()
                     output.print_output()
                     print parser.get_error_message()
@@ -227,13 +428,9 @@ try:
             elif len(sys.argv) == 3:
                 #if the second argument is -g, it means to produce a graphic output. 
                 if sys.argv[2] == '-g': 
-                    while True:
-                        try:
-                            input_string += raw_input() + '\n'
-                        except (EOFError, KeyboardInterrupt):
-                            break
+                    input_string = read_standard_input()
                     #construct the object of Scanner by it's constructor
-                    scanner = Scanner(input_string)
+                    scanner = create_scanner(input_string, scanner_backend)
                     #produce a list of tokens by calling it's function
         
                     token_array = scanner.all()
@@ -242,17 +439,16 @@ try:
                         print scanner.get_error_message()
                     else:
                         output = SemanticDotOutput()
-                        factory = SemanticFactory(output)
-                        parser = Parser(token_array, output, factory)
+                        factory = SemanticFactory(output, scope_stack)
+                        parser = create_parser(token_array, output, factory)
                         parser.parse()
                         output.print_output()
                         
                 #Otherwise, it means to read from the file
                 elif os.path.exists(sys.argv[2]):
-                    f = open(sys.argv[2])
-                    input_string = f.read()
+                    input_string = read_source(sys.argv[2])
                     #construct the object of Scanner by it's constructor
-                    scanner = Scanner(input_string)
+                    scanner = create_scanner(input_string, scanner_backend)
                     #produce a list of tokens by calling it's function
                     
                     token_array = scanner.all()
@@ -261,8 +457,8 @@ try:
                         print scanner.get_error_message()
                     else:
                         output = SemanticAscOutput()
-                        factory = SemanticFactory(output)
-                        parser = Parser(token_array, output, factory)
+                        factory = SemanticFactory(output, scope_stack)
+                        parser = create_parser(token_array, output, factory)
                         parser.parse()
                         output.print_output()
                         print parser.get_error_message()
@@ -277,10 +473,9 @@ try:
                 if sys.argv[2] == '-g':
                     #judge whether the filename in the third argument is exist
                     if os.path.exists(sys.argv[3]):
-                        f = open(sys.argv[3])
-                        input_string = f.read()
+                        input_string = read_source(sys.argv[3])
                         #construct the object of Scanner by it's constructor
-                        scanner = Scanner(input_string)
+                        scanner = create_scanner(input_string, scanner_backend)
                         #produce a list of tokens by calling it's function
                         
                         token_array = scanner.all()
@@ -289,8 +484,8 @@ try:
                             print scanner.get_error_message()
                         else:
                             output = SemanticDotOutput()
-                            factory = SemanticFactory(output)
-                            parser = Parser(token_array, output, factory)
+                            factory = SemanticFactory(output, scope_stack)
+                            parser = create_parser(token_array, output, factory)
                             parser.parse()
                             output.print_output()
                     else:
@@ -303,17 +498,11 @@ try:
         elif sys.argv[1] == '-a':
             input_string = '';
             #if the second argument doesn't exist.
-            new_line = ''
             if len(sys.argv) == 2:
-                while new_line != 'stop\n':
-                    try:
-                        input_string += new_line
-                        new_line = raw_input() + '\n'
-                    except (EOFError, KeyboardInterrupt):
-                        break
+                input_string = read_standard_input('stop')
                 
                 #construct the object of Scanner by it's constructor
-                scanner = Scanner(input_string)
+                scanner = create_scanner(input_string, scanner_backend)
                 #produce a list of tokens by calling it's function
                 token_array = scanner.all()
                 #if produces the error message, then display it
@@ -323,8 +512,8 @@ try:
                 else:
                     #print 'scanner complete'
                     output = AstAscOutput()
-                    factory = AstFactory(output)
-                    parser = Parser(token_array, output, factory)
+                    factory = AstFactory(output, scope_stack)
+                    parser = create_parser(token_array, output, factory)
                     parser.parse()
                     output.print_output()
                     print parser.get_error_message()
@@ -333,16 +522,10 @@ try:
             #if the second argument exist, it means either to read from file or produce a graphic output.
             elif len(sys.argv) == 3:
                 #if the second argument is -g, it means to produce a graphic output. 
-                new_line = ''
                 if sys.argv[2] == '-g': 
-                    while new_line != 'stop\n':
-                        try:
-                            input_string += new_line
-                            new_line = raw_input() + '\n'
-                        except (EOFError, KeyboardInterrupt):
-                            break
+                    input_string = read_standard_input('stop')
                     #construct the object of Scanner by it's constructor
-                    scanner = Scanner(input_string)
+                    scanner = create_scanner(input_string, scanner_backend)
                     #produce a list of tokens by calling it's function
         
                     token_array = scanner.all()
@@ -352,17 +535,16 @@ try:
                     else:
                         #print 'scanner complete'
                         output = AstDotOutput()
-                        factory = AstFactory(output)
-                        parser = Parser(token_array, output, factory)
+                        factory = AstFactory(output, scope_stack)
+                        parser = create_parser(token_array, output, factory)
                         parser.parse()
                         output.print_output()
                         
                 #Otherwise, it means to read from the file
                 elif os.path.exists(sys.argv[2]):
-                    f = open(sys.argv[2])
-                    input_string = f.read()
+                    input_string = read_source(sys.argv[2])
                     #construct the object of Scanner by it's constructor
-                    scanner = Scanner(input_string)
+                    scanner = create_scanner(input_string, scanner_backend)
                     #produce a list of tokens by calling it's function
                     
                     token_array = scanner.all()
@@ -372,8 +554,8 @@ try:
                     else:
                         #print 'scanner complete'
                         output = AstAscOutput()
-                        factory = AstFactory(output)
-                        parser = Parser(token_array, output, factory)
+                        factory = AstFactory(output, scope_stack)
+                        parser = create_parser(token_array, output, factory)
                         parser.parse()
                         print 'parse complete'
                         output.print_output()
@@ -389,10 +571,9 @@ try:
                 if sys.argv[2] == '-g':
                     #judge whether the filename in the third argument is exist
                     if os.path.exists(sys.argv[3]):
-                        f = open(sys.argv[3])
-                        input_string = f.read()
+                        input_string = read_source(sys.argv[3])
                         #construct the object of Scanner by it's constructor
-                        scanner = Scanner(input_string)
+                        scanner = create_scanner(input_string, scanner_backend)
                         #produce a list of tokens by calling it's function
                         
                         token_array = scanner.all()
@@ -402,8 +583,8 @@ try:
                         else:
                             #print 'scanner complete'
                             output = AstDotOutput()
-                            factory = AstFactory(output)
-                            parser = Parser(token_array, output, factory)
+                            factory = AstFactory(output, scope_stack)
+                            parser = create_parser(token_array, output, factory)
                             parser.parse()
                             output.print_output()
                     else:
@@ -416,83 +597,53 @@ try:
         #if the argument is -i, it will build and display the symbol table for the given input program.
         elif sys.argv[1] == '-i':
             input_string = ''
-            new_line = ''
             #if the second argument doesn't exist.
             if len(sys.argv) == 2:
-                while new_line != 'stop\n':
-                    try:
-                        input_string += new_line
-                        new_line = raw_input() + '\n'
-                    except (EOFError, KeyboardInterrupt):
-                        break
+                input_string = read_standard_input('stop')
                 
                 #print input_string
-                #construct the object of Scanner by it's constructor
-                scanner = Scanner(input_string)
-                #produce a list of tokens by calling it's function
-                token_array = scanner.all()
+                line_index = create_line_index(input_string)
+                scanner_error, parser_error, symbol_table, ast_root = compile_program(input_string, line_index)
                 #if produces the error message, then display it
-                if scanner.have_error() == True:
-                    print scanner.get_error_message()
+                if scanner_error != '':
+                    print scanner_error
     
                 else:
-                    #print 'scanner complete'
-                    output = Output()
-                    factory = AstFactory(output)
-                    parser = Parser(token_array, output, factory)
-                    #print 'parse start'
-                    parser.parse()
                     #print 'parse success'
-                    if parser.get_error_message() != '':
-                        print parser.get_error_message()
+                    if parser_error != '':
+                        print parser_error
                         exit()
                         
-                    symbol_table = factory.get_symbol_table()
-                    ast_root = factory.get_ast_root()
                     #print 'interpret start'
                     if symbol_table and ast_root:
                         interpreter = Interpreter(symbol_table, ast_root)
+                        interpreter.set_line_index(line_index)
                         interpreter.interpret()
                         
         #if the argument is -x, it will run the improved code generator 
         elif sys.argv[1] == '-x':
             input_string = ''
-            new_line = ''
             #if the second argument doesn't exist.
             if len(sys.argv) == 2:
-                while new_line != 'stop\n':
-                    try:
-                        input_string += new_line
-                        new_line = raw_input() + '\n'
-                    except (EOFError, KeyboardInterrupt):
-                        break
+                input_string = read_standard_input('stop')
                 
                 #print input_string
-                #construct the object of Scanner by it's constructor
-                scanner = Scanner(input_string)
-                #produce a list of tokens by calling it's function
-                token_array = scanner.all()
+                line_index = create_line_index(input_string)
+                scanner_error, parser_error, symbol_table, ast_root = compile_program(input_string, line_index)
                 #if produces the error message, then display it
-                if scanner.have_error() == True:
-                    print scanner.get_error_message()
+                if scanner_error != '':
+                    print scanner_error
     
                 else:
-                    #print 'scanner complete'
-                    output = Output()
-                    factory = AstFactory(output)
-                    parser = Parser(token_array, output, factory)
-                    #print 'parse start'
-                    parser.parse()
                     #print 'parse success'
-                    if parser.get_error_message() != '':
-                        print parser.get_error_message()
+                    if parser_error != '':
+                        print parser_error
                         exit()
                         
-                    symbol_table = factory.get_symbol_table()
-                    ast_root = factory.get_ast_root()
                     #print 'improved code generator start'
                     if symbol_table:
                         improvedCodeGenerator = ImprovedCodeGenerator(symbol_table, ast_root)
+                        improvedCodeGenerator.set_line_index(line_index)
                         improvedCodeGenerator.generate_code()
                         improvedCodeGenerator.print_code()
                     
@@ -502,30 +653,21 @@ try:
                     f = open(sys.argv[2])
                     input_string = f.read()
                     input_string += '\n'
-                    #construct the object of Scanner by it's constructor
-                    scanner = Scanner(input_string)
-                    #produce a list of tokens by calling it's function
-                    token_array = scanner.all()
+                    line_index = create_line_index(input_string)
+                    scanner_error, parser_error, symbol_table, ast_root = compile_program(input_string, line_index)
                     #if produces the error message, then display it
-                    if scanner.have_error() == True:
-                        print scanner.get_error_message()
+                    if scanner_error != '':
+                        print scanner_error
                     else:
-                        #print 'scanner complete'
-                        output = Output()
-                        factory = AstFactory(output)
-                        parser = Parser(token_array, output, factory)
-                        #print 'parse start'
-                        parser.parse()
                         #print 'parse success'
-                        if parser.get_error_message() != '':
-                            print parser.get_error_message()
+                        if parser_error != '':
+                            print parser_error
                             exit()
-                            
-                        symbol_table = factory.get_symbol_table()
-                        ast_root = factory.get_ast_root()
+
                         #print 'interpret start'
                         if symbol_table:
                             improvedCodeGenerator = ImprovedCodeGenerator(symbol_table, ast_root)
+                            improvedCodeGenerator.set_line_index(line_index)
                             improvedCodeGenerator.generate_code()
                             improvedCodeGenerator.print_code()
                         
@@ -539,27 +681,18 @@ try:
                 f = open(sys.argv[1])
                 input_string = f.read()
                 input_string += '\n'
-                #construct the object of Scanner by it's constructor
-                scanner = Scanner(input_string)
-                #produce a list of tokens by calling it's function
-                token_array = scanner.all()
+                line_index = create_line_index(input_string)
+                scanner_error, parser_error, symbol_table, ast_root = compile_program(input_string, line_index)
                 #if produces the error message, then display it
-                if scanner.have_error() == True:
-                    print scanner.get_error_message()
+                if scanner_error != '':
+                    print scanner_error
         
                 else:
-                    output = Output()
-                    factory = AstFactory(output)
-                    parser = Parser(token_array, output, factory)
-                    #print 'parse start'
-                    parser.parse()
                     #print 'parse success'
-                    if parser.get_error_message() != '':
-                        print parser.get_error_message()
+                    if parser_error != '':
+                        print parser_error
                         exit()
                         
-                    symbol_table = factory.get_symbol_table()
-                    ast_root = factory.get_ast_root()
                     #print 'code generation start'
                     if symbol_table and ast_root:
                         code_generation = CodeGenerator(symbol_table, ast_root)